@@ -1,18 +1,55 @@
 from telegram.ext import CommandHandler, MessageHandler, filters, ApplicationBuilder, CallbackQueryHandler
 from .handlers import (
     start_handler,
-    transcribe_handler,
+    transcribe_command_handler,
     configure_handler,
     config_callback_handler,
     message_handler,
     error_handler,
-    process_queue,
+    resume_jobs,
 )
 import asyncio
+import logging
 from config.bot_config import bot_config
+from bot.services.youtube_transcript_service import youtube_transcript_extractor
+from bot.utils.database import db
+from bot.utils.job_scheduler import job_scheduler
+from bot.utils.concurrency import report_pool_stats, log_pool_stats
+from config.constants import BOT_ROLE
+from .worker import run_worker
 
 
-async def setup_bot():
+async def on_startup(application):
+    # Open long-lived resources together with the application
+    # (a front end only queues jobs; worker processes run them)
+    if application.bot_data["role"] != "frontend":
+        await youtube_transcript_extractor.start()
+        await job_scheduler.start()
+        # Log how busy each pipeline stage is
+        application.bot_data["pool_stats_task"] = asyncio.create_task(report_pool_stats())
+    # Keep the settings snapshot in step with changes made by other processes
+    application.bot_data["settings_task"] = asyncio.create_task(bot_config.refresh_settings())
+    # Pick up the jobs left unfinished by the last run
+    await resume_jobs(application)
+
+
+async def on_shutdown(application):
+    # Release long-lived resources when the application stops
+    if application.bot_data["role"] != "frontend":
+        await job_scheduler.stop()
+        pool_stats_task = application.bot_data.pop("pool_stats_task", None)
+        if pool_stats_task:
+            pool_stats_task.cancel()
+        log_pool_stats()
+        await youtube_transcript_extractor.close()
+    settings_task = application.bot_data.pop("settings_task", None)
+    if settings_task:
+        settings_task.cancel()
+    db.close()
+    logging.info("Bot resources released")
+
+
+async def setup_bot(role: str = "all"):
 
     # Initialize the Telegram bot application
     application = (
@@ -21,12 +58,17 @@ async def setup_bot():
         .read_timeout(30)  # Increase timeout to 30 seconds
         .write_timeout(30)  # Increase timeout to 30 seconds
         .connect_timeout(30)  # Increase timeout to 30 seconds
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
         .build()
     )
+    # "all" runs jobs in this process, "frontend" publishes them for worker processes
+    application.bot_data["role"] = role
+    logging.info(f"Starting bot with role: {role}")
 
     # Add command handlers
     application.add_handler(CommandHandler("start", start_handler))
-    application.add_handler(CommandHandler("transcribe", transcribe_handler))
+    application.add_handler(CommandHandler("transcribe", transcribe_command_handler))
     application.add_handler(CommandHandler("configure", configure_handler))
 
     # Add callback query handler for configuration buttons
@@ -46,13 +88,15 @@ async def setup_bot():
     return application
 
 
-def run_bot():
+def run_bot(role: str = BOT_ROLE):
+    # Worker processes do not poll Telegram
+    if role == "worker":
+        run_worker()
+        return
+
     # Create and run the event loop
     loop = asyncio.get_event_loop()
-    application = loop.run_until_complete(setup_bot())
-
-    # Start the queue processor
-    loop.create_task(process_queue())
+    application = loop.run_until_complete(setup_bot(role))
 
     # Start the bot
     loop.run_until_complete(application.run_polling())
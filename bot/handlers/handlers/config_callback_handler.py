@@ -2,6 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 import logging
 from config.bot_config import bot_config
+from bot.utils.database import db
 from bot.utils.config_utils import get_current_config_status
 
 
@@ -11,6 +12,8 @@ async def config_callback_handler(update: Update, context: CallbackContext) -> N
     """
     query = update.callback_query
     user_id = query.from_user.id
+    # Settings changed here only apply to this chat
+    chat_id = query.message.chat.id
     callback_data = query.data
 
     logging.info(f"Config callback received from user {user_id}: {callback_data}")
@@ -19,15 +22,19 @@ async def config_callback_handler(update: Update, context: CallbackContext) -> N
         await query.answer()  # Acknowledge the callback query
 
         if callback_data == "toggle_auto_transcription":
-            bot_config.toggle_auto_transcription()
+            await db.run(bot_config.toggle_auto_transcription, chat_id)
             await update_config_message(query)
 
         elif callback_data == "toggle_enhanced_transcription":
-            bot_config.toggle_enhanced_transcription()
+            await db.run(bot_config.toggle_enhanced_transcription, chat_id)
             await update_config_message(query)
 
         elif callback_data == "toggle_output_text_file":
-            bot_config.toggle_output_text_file()
+            await db.run(bot_config.toggle_output_text_file, chat_id)
+            await update_config_message(query)
+
+        elif callback_data == "toggle_subtitle_file":
+            await db.run(bot_config.toggle_subtitle_file, chat_id)
             await update_config_message(query)
 
         elif callback_data == "change_transcription_speed":
@@ -35,7 +42,7 @@ async def config_callback_handler(update: Update, context: CallbackContext) -> N
 
         elif callback_data.startswith("set_speed_"):
             speed = int(callback_data.split("_")[-1])
-            bot_config.set_transcription_speed(speed)
+            await db.run(bot_config.set_transcription_speed, speed, chat_id)
             await update_config_message(query)
 
         elif callback_data == "back_to_config":
@@ -52,29 +59,36 @@ async def config_callback_handler(update: Update, context: CallbackContext) -> N
 
 
 async def update_config_message(query):
-    """Update the configuration message with current settings."""
+    """Update the configuration message with the current settings of the chat."""
+    settings = await db.run(bot_config.settings_for, query.message.chat.id)
     keyboard = [
         [
             InlineKeyboardButton(
-                f"🎯 Transcripción automática: {'ON' if bot_config.auto_transcription_enabled else 'OFF'}",
+                f"🎯 Transcripción automática: {'ON' if settings.auto_transcription_enabled else 'OFF'}",
                 callback_data="toggle_auto_transcription"
             )
         ],
         [
             InlineKeyboardButton(
-                f"✨ Transcripción mejorada: {'ON' if bot_config.enhanced_transcription_enabled else 'OFF'}",
+                f"✨ Transcripción mejorada: {'ON' if settings.enhanced_transcription_enabled else 'OFF'}",
                 callback_data="toggle_enhanced_transcription"
             )
         ],
         [
             InlineKeyboardButton(
-                f"📄 Salida como archivo: {'ON' if bot_config.output_text_file_enabled else 'OFF'}",
+                f"📄 Salida como archivo: {'ON' if settings.output_text_file_enabled else 'OFF'}",
                 callback_data="toggle_output_text_file"
             )
         ],
         [
             InlineKeyboardButton(
-                f"⚡ Velocidad: {bot_config.get_transcription_speed_text()}",
+                f"🎞️ Subtítulos SRT: {'ON' if settings.subtitle_file_enabled else 'OFF'}",
+                callback_data="toggle_subtitle_file"
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                f"⚡ Velocidad: {settings.get_transcription_speed_text()}",
                 callback_data="change_transcription_speed"
             )
         ],
@@ -87,7 +101,7 @@ async def update_config_message(query):
 
     config_message = (
         "⚙️ **Configuración del Bot**\n\n"
-        f"{get_current_config_status()}\n"
+        f"{get_current_config_status(settings)}\n"
         "Usa los botones de abajo para cambiar las configuraciones:"
     )
 
@@ -100,7 +114,7 @@ async def update_config_message(query):
 
 async def show_speed_options(query):
     """Show speed selection options."""
-    current_speed = bot_config.transcription_speed
+    current_speed = (await db.run(bot_config.settings_for, query.message.chat.id)).transcription_speed
 
     keyboard = [
         [
@@ -2,6 +2,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 import logging
 from config.bot_config import bot_config
+from bot.utils.database import db
 from bot.utils.config_utils import get_current_config_status
 
 
@@ -14,29 +15,38 @@ async def configure_handler(update: Update, context: CallbackContext) -> None:
     logging.info(f"Configure command received from user {user_id} in chat {chat_id}")
 
     try:
+        # Settings of this chat (global defaults with its own changes)
+        settings = await db.run(bot_config.settings_for, chat_id)
+
         # Create inline keyboard with configuration options
         keyboard = [
             [
                 InlineKeyboardButton(
-                    f"🎯 Transcripción automática: {'ON' if bot_config.auto_transcription_enabled else 'OFF'}",
+                    f"🎯 Transcripción automática: {'ON' if settings.auto_transcription_enabled else 'OFF'}",
                     callback_data="toggle_auto_transcription"
                 )
             ],
             [
                 InlineKeyboardButton(
-                    f"✨ Transcripción mejorada: {'ON' if bot_config.enhanced_transcription_enabled else 'OFF'}",
+                    f"✨ Transcripción mejorada: {'ON' if settings.enhanced_transcription_enabled else 'OFF'}",
                     callback_data="toggle_enhanced_transcription"
                 )
             ],
             [
                 InlineKeyboardButton(
-                    f"📄 Salida como archivo: {'ON' if bot_config.output_text_file_enabled else 'OFF'}",
+                    f"📄 Salida como archivo: {'ON' if settings.output_text_file_enabled else 'OFF'}",
                     callback_data="toggle_output_text_file"
                 )
             ],
             [
                 InlineKeyboardButton(
-                    f"⚡ Velocidad: {bot_config.get_transcription_speed_text()}",
+                    f"🎞️ Subtítulos SRT: {'ON' if settings.subtitle_file_enabled else 'OFF'}",
+                    callback_data="toggle_subtitle_file"
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    f"⚡ Velocidad: {settings.get_transcription_speed_text()}",
                     callback_data="change_transcription_speed"
                 )
             ],
@@ -49,7 +59,7 @@ async def configure_handler(update: Update, context: CallbackContext) -> None:
 
         config_message = (
             "⚙️ **Configuración del Bot**\n\n"
-            f"{get_current_config_status()}\n"
+            f"{get_current_config_status(settings)}\n"
             "Usa los botones de abajo para cambiar las configuraciones:"
         )
 
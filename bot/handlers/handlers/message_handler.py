@@ -1,48 +1,333 @@
+import json
 import logging
+from typing import Optional
 from telegram import Update
 from telegram.ext import CallbackContext
-from config.constants import YOUTUBE_REGEX
-from .transcribe_handler import transcribe_handler, video_handler, audio_handler
 import asyncio
+from config.constants import YOUTUBE_REGEX, JOB_MAX_PER_USER, JOB_QUEUE_UPDATE_INTERVAL, JOB_MAX_ATTEMPTS
+from .transcribe_handler import transcribe_handler, video_handler, audio_handler
 from config.bot_config import bot_config
+from bot.utils.transcription_utils import extract_playlist_id, estimate_job_cost, get_settings
+from config.bot_config import ChatSettings
 from bot.utils.database import db
+from bot.utils.job_scheduler import job_scheduler, JobRejectedError
+from bot.utils.job_store import job_store, JobRecord
+from bot.utils.job_broker import job_broker
+from bot.utils.user_index import user_index
 
-# Crear una cola global para los mensajes
-message_queue = asyncio.Queue()
 
-# Función para procesar los mensajes en la cola
-async def process_queue():
-    while True:
-        update, context = await message_queue.get()
-        try:
-            await process_message(update, context)
-        except Exception as e:
-            logging.error(f"Error processing message: {e}")
-        finally:
-            message_queue.task_done()
+def get_job_key(update: Update):
+    # Los trabajos se reparten por usuario (o por chat si no hay usuario)
+    return update.effective_user.id if update.effective_user else update.effective_chat.id
 
-async def message_handler(update: Update, context: CallbackContext) -> None:
-    # Añadir el mensaje a la cola
-    await message_queue.put((update, context))
 
-async def process_message(update: Update, context: CallbackContext) -> None:
-    user_id = update.effective_user.id
-    chat_id = update.effective_chat.id
-    logging.info(f"Processing message from user {user_id} in chat {chat_id}")
+def is_transcription_request(message) -> bool:
+    # Mensajes que la auto-transcripción procesaría (multimedia o enlaces de YouTube)
+    if message.video or message.audio or message.voice:
+        return True
+    text = message.text or message.caption or ""
+    return bool(YOUTUBE_REGEX.search(text) or extract_playlist_id(text))
+
+
+def get_media_size(message) -> int:
+    # Bytes que habrá que descargar (0 para enlaces de YouTube)
+    media = message.video or message.audio or message.voice
+    return (media.file_size or 0) if media else 0
+
 
-    # Save user ID on first interaction
-    if not db.is_user_registered(user_id):
-        db.add_user(user_id)
-        logging.info(f"New user registered: {user_id}")
+def format_wait(seconds: float) -> str:
+    if seconds < 60:
+        return f"~{max(seconds, 1):.0f} s"
+    return f"~{seconds / 60:.0f} min"
 
-    # Check if user is authorized
-    if not db.is_user_authorized(user_id):
+
+def format_queue_notice(position: int, wait: float) -> str:
+    return (
+        f"⏳ **En cola**: posición {position}\n"
+        f"🕒 Espera estimada: {format_wait(wait)}"
+    )
+
+
+# Mensajes para las solicitudes rechazadas por el control de admisión
+REJECTION_MESSAGES = {
+    JobRejectedError.QUEUE_FULL: (
+        "🚦 **Bot saturado**\n"
+        "⏳ Hay demasiadas solicitudes en cola.\n"
+        "💡 Inténtalo de nuevo en unos minutos."
+    ),
+    JobRejectedError.USER_LIMIT: (
+        "🚦 **Demasiadas solicitudes**\n"
+        f"📋 Ya tienes {JOB_MAX_PER_USER} transcripciones en curso o en cola.\n"
+        "💡 Espera a que terminen antes de enviar más."
+    ),
+    JobRejectedError.BYTE_BUDGET: (
+        "🚦 **Cola de descargas llena**\n"
+        "📦 Hay demasiados archivos pendientes de descarga.\n"
+        "💡 Inténtalo de nuevo en unos minutos."
+    ),
+}
+
+
+async def admit_user(update: Update) -> bool:
+    """Register the user on first contact and check that they are authorized."""
+    user_id = update.effective_user.id
+
+    # Known users are answered from memory; new ones are registered with one upsert
+    if not await user_index.admit(user_id):
         logging.warning(f"Unauthorized access attempt from user {user_id}")
         await update.message.reply_text("No estás autorizado para usar este bot.")
+        return False
+    return True
+
+
+def get_request_message(update: Update, kind: str):
+    # /transcribe puede citar el mensaje con el contenido a transcribir
+    if kind == "transcribe":
+        return update.message.reply_to_message or update.message
+    return update.message
+
+
+async def enqueue_job(
+    update: Update,
+    context: CallbackContext,
+    kind: str,
+    record: Optional[JobRecord] = None,
+    settings: Optional[ChatSettings] = None,
+) -> None:
+    """
+    Queue a transcription request for the user, or tell them why it was rejected.
+
+    The request is first saved as a persistent job, one per Telegram update, so an
+    update delivered twice is processed once and an unfinished job survives a restart.
+    The job keeps a snapshot of the chat's settings, used until it finishes.
+    The job is prioritized by its estimated cost. If it cannot start right away,
+    the user gets a notice with the queue position and estimated wait, updated
+    every ``JOB_QUEUE_UPDATE_INTERVAL`` seconds and removed when the job starts.
+
+    A front end process (``bot_data["role"] == "frontend"``) publishes the job to
+    the job broker for the worker processes instead of running it.
+
+    Args:
+        update: Telegram update with the request
+        context: Callback context
+        kind: ``message`` (auto-transcription) or ``transcribe`` (command)
+        record: Job being resumed after a restart; a new one is created if omitted
+        settings: Settings of the chat, if already resolved
+    """
+    request_message = get_request_message(update, kind)
+    description = JOB_DESCRIPTIONS[kind]
+    resumed = record is not None
+    if record is None:
+        if settings is None:
+            settings = await db.run(bot_config.settings_for, update.effective_chat.id)
+        record = await db.run(
+            job_store.create,
+            update.update_id,
+            update.effective_user.id,
+            update.effective_chat.id,
+            kind,
+            update.to_json(),
+            settings,
+        )
+        if record is None:
+            logging.info(f"Update {update.update_id} was already received, skipping")
+            return
+
+    handler = JOB_HANDLERS[kind]
+    remote = context.bot_data.get("role") == "frontend"
+    queue = job_broker if remote else job_scheduler
+    notice = None
+    tracker = None
+    started = False
+
+    async def run():
+        nonlocal started
+        started = True
+        if tracker:
+            tracker.cancel()
+        if notice:
+            await delete_queue_notice(notice)
+        await job_store.run(record, lambda: handler(update, context, record))
+
+    cost = estimate_job_cost(request_message, (await record.get_settings()).transcription_speed)
+    size = get_media_size(request_message)
+    try:
+        # Resumed jobs were admitted before the restart
+        if remote:
+            job = await db.run(
+                job_broker.submit, record, description, cost=cost, size=size, check_admission=not resumed
+            )
+        else:
+            job = job_scheduler.submit(
+                get_job_key(update), run, description, cost=cost, size=size, check_admission=not resumed
+            )
+    except JobRejectedError as e:
+        logging.warning(f"Rejected {description} from user {update.effective_user.id}: {e}")
+        await job_store.finish(record, "failed", e.reason)
+        await update.message.reply_text(REJECTION_MESSAGES[e.reason])
         return
 
-    # Check if auto-transcription is enabled
-    if bot_config.auto_transcription_enabled:
+    position, wait = await estimate_wait(queue, job)
+    if not position:
+        return
+    text = format_queue_notice(position, wait)
+    try:
+        notice = await update.message.reply_text(text)
+    except Exception as e:
+        logging.warning(f"Could not send queue notice: {e}")
+        return
+    # The job may have started while the notice was being sent
+    if started:
+        await delete_queue_notice(notice)
+        return
+
+    async def track_position():
+        nonlocal text
+        while job.state == "pending":
+            await asyncio.sleep(JOB_QUEUE_UPDATE_INTERVAL)
+            position, wait = await estimate_wait(queue, job)
+            if not position:
+                continue
+            new_text = format_queue_notice(position, wait)
+            if new_text != text:
+                try:
+                    await notice.edit_text(new_text)
+                    text = new_text
+                except Exception as e:
+                    logging.warning(f"Could not update queue notice: {e}")
+        # A worker process cannot delete the notice, so the front end does when the job is claimed
+        if remote:
+            await delete_queue_notice(notice)
+
+    tracker = asyncio.create_task(track_position())
+
+
+async def estimate_wait(queue, job):
+    # The job broker reads the database; the in-process scheduler answers from memory
+    if queue is job_broker:
+        return await db.run(job_broker.estimate_wait, job)
+    return queue.estimate_wait(job)
+
+
+async def delete_queue_notice(notice) -> None:
+    try:
+        await notice.delete()
+    except Exception as e:
+        logging.warning(f"Could not delete queue notice: {e}")
+
+
+async def message_handler(update: Update, context: CallbackContext) -> None:
+    if not await admit_user(update):
+        return
+
+    if not is_transcription_request(update.message):
+        logging.info("No media or YouTube URL found in message")
+        return
+    # Settings of the chat, resolved once and kept with the job
+    settings = await db.run(bot_config.settings_for, update.effective_chat.id)
+    if not settings.auto_transcription_enabled:
+        logging.info("Auto-transcription is disabled, skipping message processing")
+        return
+
+    # Añadir el mensaje a la cola del usuario
+    await enqueue_job(update, context, "message", settings=settings)
+
+
+async def transcribe_command_handler(update: Update, context: CallbackContext) -> None:
+    if not await admit_user(update):
+        return
+
+    # /transcribe también pasa por la cola para no bloquear el resto de actualizaciones
+    await enqueue_job(update, context, "transcribe")
+
+
+async def resume_jobs(application) -> None:
+    """
+    Queue again the jobs that were unfinished when the bot stopped.
+
+    Each job continues after its last completed stage (a downloaded file or a
+    transcript saved before the restart is reused). Jobs already started
+    ``JOB_MAX_ATTEMPTS`` times are given up, so a request that crashes the bot
+    is not retried forever. Finished jobs past their retention are deleted.
+
+    A front end only queues again the jobs it had not yet published; published
+    ones are resumed by the worker processes.
+    """
+    await db.run(job_store.prune)
+    records = await db.run(job_store.unfinished)
+    if application.bot_data.get("role") == "frontend":
+        records = [record for record in records if not record.published]
+    if not records:
+        return
+    logging.info(f"Resuming {len(records)} unfinished jobs")
+
+    for record in records:
+        restored = await restore_job(record, application)
+        if restored:
+            update, context = restored
+            await enqueue_job(update, context, record.kind, record)
+
+
+async def restore_job(record: JobRecord, application):
+    """
+    Rebuild the update and callback context of a persisted job.
+
+    A job that was started before (interrupted by a restart, or by a worker that
+    stopped) is announced to the user as resumed; one already started
+    ``JOB_MAX_ATTEMPTS`` times is marked failed instead.
+
+    Args:
+        record: The job
+        application: Application whose bot processes the job
+
+    Returns:
+        Tuple of (update, context), or None if the job cannot run
+    """
+    try:
+        update = Update.de_json(json.loads(record.payload), application.bot)
+    except Exception as e:
+        logging.error(f"Could not restore the update of job {record.update_id}: {e}")
+        await job_store.finish(record, "failed", "invalid update payload")
+        return None
+
+    if record.attempts >= JOB_MAX_ATTEMPTS:
+        logging.warning(f"Giving up job {record.update_id} after {record.attempts} attempts")
+        await job_store.finish(record, "failed", f"gave up after {record.attempts} attempts")
+        try:
+            await update.message.reply_text(
+                "❌ **No se pudo completar la transcripción**\n"
+                "🔧 La solicitud falló varias veces.\n"
+                "💡 Por favor, envíala de nuevo más tarde."
+            )
+        except Exception as e:
+            logging.warning(f"Could not notify user of job {record.update_id}: {e}")
+        return None
+
+    context = CallbackContext.from_update(update, application)
+    if record.kind == "transcribe":
+        # CommandHandler normally fills in the command arguments
+        context.args = (update.message.text or "").split()[1:]
+
+    if record.attempts:
+        logging.info(f"Resuming job {record.update_id} ({record.kind}) from state {record.state}")
+        try:
+            await update.message.reply_text(
+                "🔄 **Reanudando transcripción**\n"
+                "♻️ El bot se reinició; tu solicitud continúa donde se quedó."
+            )
+        except Exception as e:
+            logging.warning(f"Could not notify user of job {record.update_id}: {e}")
+    return update, context
+
+
+async def process_message(update: Update, context: CallbackContext, job: Optional[JobRecord] = None) -> None:
+    user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    logging.info(f"Processing message from user {user_id} in chat {chat_id}")
+
+    # Registration and authorization are checked before queueing (admit_user);
+    # the job's settings snapshot is the one auto-transcription was checked with
+    if (await get_settings(job, chat_id)).auto_transcription_enabled:
         logging.info("Auto-transcription is enabled")
 
         # Modificar el orden de verificación para priorizar contenido multimedia
@@ -50,33 +335,42 @@ async def process_message(update: Update, context: CallbackContext) -> None:
             logging.info(
                 f"Processing video message, file_id: {update.message.video.file_id}"
             )
-            await video_handler(update.message, context)
+            await video_handler(update.message, context, job)
         elif update.message.audio:
             logging.info(
                 f"Processing audio message, file_id: {update.message.audio.file_id}"
             )
-            await audio_handler(update.message, context)
+            await audio_handler(update.message, context, job)
         elif update.message.voice:
             logging.info(
                 f"Processing voice message, file_id: {update.message.voice.file_id}"
             )
-            await audio_handler(update.message, context)
+            await audio_handler(update.message, context, job)
         # Solo procesar texto si no hay contenido multimedia
         elif update.message.text or update.message.caption:
             text_to_check = update.message.text or update.message.caption
             logging.info(
                 f"Processing text/caption message: {text_to_check[:100]}..."
             )
-            # YouTube link detection
+            # YouTube link detection (transcribe_handler picks up every link and playlists)
             video_id_match = YOUTUBE_REGEX.search(text_to_check)
             if video_id_match:
                 video_url = video_id_match.group()
                 logging.info(f"YouTube URL detected: {video_url}")
                 context.args = [video_url]
-                await transcribe_handler(update, context)
+                await transcribe_handler(update, context, job)
+            elif extract_playlist_id(text_to_check):
+                logging.info("YouTube playlist URL detected")
+                context.args = []
+                await transcribe_handler(update, context, job)
             else:
                 logging.info("No YouTube URL found in message")
         else:
             logging.info(f"Unrecognized message type from user {user_id}")
     else:
         logging.info("Auto-transcription is disabled, skipping message processing")
+
+
+# Handlers that process each kind of job, and labels used in log messages
+JOB_HANDLERS = {"message": process_message, "transcribe": transcribe_handler}
+JOB_DESCRIPTIONS = {"message": "message", "transcribe": "/transcribe"}
@@ -2,6 +2,7 @@ from telegram import Update
 from telegram.ext import CallbackContext
 import logging
 from config.bot_config import bot_config
+from bot.utils.database import db
 from bot.utils.config_utils import get_current_config_status
 
 
@@ -13,15 +14,16 @@ async def start_handler(update: Update, context: CallbackContext) -> None:
     chat_id = update.effective_chat.id
     logging.info(f"Start command received from user {user_id} in chat {chat_id}")
 
-    # Log current feature configuration
+    # Log current feature configuration of this chat
+    settings = await db.run(bot_config.settings_for, chat_id)
     logging.info(
         "Current bot configuration: "
-        + f"auto_transcription={bot_config.auto_transcription_enabled}, "
-        + f"enhanced_transcription={bot_config.enhanced_transcription_enabled}"
+        + f"auto_transcription={settings.auto_transcription_enabled}, "
+        + f"enhanced_transcription={settings.enhanced_transcription_enabled}"
     )
 
     # Get current status and send welcome message
-    status_message = get_current_config_status()
+    status_message = get_current_config_status(settings)
     welcome_message = (
         "¡Hola! Soy un bot de transcripción. Puedo transcribir:\n"
         "- Videos de YouTube (usa /transcribe [YouTube URL])\n"
@@ -30,7 +32,7 @@ async def start_handler(update: Update, context: CallbackContext) -> None:
         "- Mensajes de voz\n"
         "También puedes citar cualquier mensaje con contenido multimedia y usar /transcribe para transcribirlo.\n\n"
         "Usa /configure para cambiar las configuraciones del bot.\n\n"
-        f"{get_current_config_status()}\n"
+        f"{status_message}\n"
     )
 
     try:
@@ -1,18 +1,35 @@
 import logging
+from typing import Optional
 from telegram import Update
 from telegram.ext import CallbackContext
 from bot.handlers.media import (
     youtube_handler,
+    youtube_batch_handler,
     video_handler,
     audio_handler,
 )
 from config.constants import YOUTUBE_REGEX
+from bot.utils.transcription_utils import extract_video_ids, extract_playlist_id
+from bot.utils.job_store import JobRecord
 
+# Command arguments that bypass cached YouTube results
+FORCE_REFRESH_ARGS = {"refresh", "--refresh", "-f"}
+# Command arguments that expand the playlist of a watch?v=...&list=... link
+PLAYLIST_ARGS = {"playlist", "--playlist", "-p"}
 
-async def transcribe_handler(update: Update, context: CallbackContext) -> None:
+
+async def transcribe_handler(update: Update, context: CallbackContext, job: Optional[JobRecord] = None) -> None:
     """
     Main handler for transcription requests. Supports YouTube URLs, videos, and audio messages.
     Requires user authentication.
+
+    Adding ``refresh`` to the command (e.g. ``/transcribe <url> refresh``) ignores cached
+    YouTube results, including videos recently found to have no transcript.
+
+    Messages with several YouTube links, or a playlist link, are transcribed as a batch.
+    A video link that belongs to a playlist is a single video unless ``playlist`` is added.
+
+    ``job`` is the persistent job of the request, passed on so its stages are recorded.
     """
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
@@ -21,6 +38,11 @@ async def transcribe_handler(update: Update, context: CallbackContext) -> None:
     youtube_url = None
     original_message = update.message.reply_to_message or update.message
 
+    args = context.args or []
+    force_refresh = any(arg.lower() in FORCE_REFRESH_ARGS for arg in args)
+    expand_playlist = any(arg.lower() in PLAYLIST_ARGS for arg in args)
+    url_args = [arg for arg in args if arg.lower() not in FORCE_REFRESH_ARGS | PLAYLIST_ARGS]
+
     try:
         # Check for YouTube URL in different message components
         if original_message.text:
@@ -39,20 +61,34 @@ async def transcribe_handler(update: Update, context: CallbackContext) -> None:
                 youtube_url = video_id_match.group()
                 logging.info(f"Found YouTube URL in caption: {youtube_url}")
 
-        elif context.args:
-            youtube_url = context.args[0]
+        elif url_args:
+            youtube_url = url_args[0]
             logging.info(f"Using URL from command arguments: {youtube_url}")
 
+        # Several links or a playlist are handled as one batch
+        source_text = original_message.text or original_message.caption or " ".join(url_args)
+        video_ids = extract_video_ids(source_text)
+        playlist_id = extract_playlist_id(source_text, include_watch_urls=expand_playlist)
+
         # Process media based on type
-        if youtube_url:
+        if playlist_id or len(video_ids) > 1:
+            logging.info(
+                f"Processing YouTube batch: {len(video_ids)} links"
+                f"{f', playlist {playlist_id}' if playlist_id else ''}"
+            )
+            await youtube_batch_handler(
+                update, context, video_ids, original_message, playlist_id, force_refresh, job
+            )
+
+        elif youtube_url:
             logging.info("Processing YouTube URL")
-            await youtube_handler(update, context, youtube_url, original_message)
+            await youtube_handler(update, context, youtube_url, original_message, force_refresh, job)
 
         elif original_message.video:
             logging.info(
                 f"Processing video message, file_id: {original_message.video.file_id}"
             )
-            await video_handler(original_message, context)
+            await video_handler(original_message, context, job)
 
         elif original_message.audio or original_message.voice:
             file_id = (
@@ -61,13 +97,15 @@ async def transcribe_handler(update: Update, context: CallbackContext) -> None:
                 else original_message.voice.file_id
             )
             logging.info(f"Processing audio/voice message, file_id: {file_id}")
-            await audio_handler(original_message, context)
+            await audio_handler(original_message, context, job)
 
         else:
             logging.warning(f"No valid media found in message from user {user_id}")
             await update.message.chat.send_message(
                 "Por favor, proporciona un enlace de YouTube válido, envía un video o un audio, o cita un mensaje con contenido multimedia."
             )
+            if job:
+                await job.set_state("failed")
 
     except Exception as e:
         logging.error(
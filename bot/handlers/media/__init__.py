@@ -1,3 +1,4 @@
 from .audio_handler import *
 from .video_handler import *
 from .youtube_handler import *
+from .youtube_batch_handler import *
@@ -1,3 +1,4 @@
+from typing import Optional
 from telegram import Message
 from telegram.ext import CallbackContext
 from bot.utils.transcription_utils import (
@@ -5,7 +6,11 @@ from bot.utils.transcription_utils import (
     process_media,
     compress_audio,
     get_file_size,
+    download_telegram_file,
+    media_transcriptions,
+    get_settings,
 )
+from bot.utils.job_store import JobRecord
 from config.constants import MAX_FILE_SIZE
 import tempfile
 import os
@@ -13,13 +18,14 @@ import mimetypes
 import logging
 
 
-async def audio_handler(message: Message, context: CallbackContext) -> None:
+async def audio_handler(message: Message, context: CallbackContext, job: Optional[JobRecord] = None) -> None:
     """
     Handle audio and voice message transcription requests.
 
     Args:
         message: Telegram message containing audio/voice
         context: Callback context
+        job: Persistent job of the request; its saved stages are reused when it resumes
     """
     chat_id = message.chat.id
     user_id = message.from_user.id
@@ -28,6 +34,12 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
     is_audio = bool(message.audio)
     file_id = message.audio.file_id if is_audio else message.voice.file_id
     file_size = message.audio.file_size if is_audio else message.voice.file_size
+    if job:
+        job.set_media(
+            "audio" if is_audio else "voice",
+            file_size,
+            message.audio.duration if is_audio else message.voice.duration,
+        )
 
     logging.info(
         f"Processing {'audio' if is_audio else 'voice'} message from user {user_id}, file_id: {file_id}"
@@ -53,29 +65,49 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
         f"🔄 Descargando archivo..."
     )
 
-    try:
-        # Get file from Telegram
-        file = await context.bot.get_file(file_id)
-        logging.info(f"Retrieved file info: {file.file_path}")
+    # The job's settings snapshot (speed, enhancement, output) applies throughout
+    settings = await get_settings(job, chat_id)
+
+    # Identical files (e.g. a forwarded voice note) share a single transcription
+    file_unique_id = (
+        message.audio.file_unique_id if is_audio else message.voice.file_unique_id
+    )
+    flight_key = (file_unique_id, settings.transcription_speed)
 
-        # Create temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".ogg")
-        temp_file_path = temp_file.name
-        temp_file.close()
-        logging.info(f"Created temporary file: {temp_file_path}")
+    async def transcribe_file() -> str:
+        """Download, compress and transcribe the file."""
+        temp_file_path = None
+        compressed_file_path = None
 
         try:
-            # Download audio file
-            await status_message.edit_text(
-                f"🎵 **Procesando {content_type}**\n"
-                f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
-                f"⬇️ Descargando archivo de Telegram..."
-            )
+            if job and job.has_download():
+                # Resumed job: the file was downloaded before the restart
+                temp_file_path = job.download_path
+                logging.info(f"Reusing file downloaded before restart: {temp_file_path}")
+            else:
+                # Create temporary file (a job keeps it until it finishes, for resuming)
+                if job:
+                    temp_file_path = job.work_path("download.ogg")
+                    await job.set_state("downloading")
+                else:
+                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".ogg")
+                    temp_file_path = temp_file.name
+                    temp_file.close()
+                logging.info(f"Created temporary file: {temp_file_path}")
+
+                # Download audio file
+                await status_message.edit_text(
+                    f"🎵 **Procesando {content_type}**\n"
+                    f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
+                    f"⬇️ Descargando archivo de Telegram..."
+                )
 
-            await file.download_to_drive(custom_path=temp_file_path)
-            logging.info(
-                f"Audio downloaded successfully, size: {get_file_size(temp_file_path)}"
-            )
+                await download_telegram_file(context.bot, file_id, temp_file_path)
+                logging.info(
+                    f"Audio downloaded successfully, size: {get_file_size(temp_file_path)}"
+                )
+                if job:
+                    await job.save_download(temp_file_path)
 
             # Compress audio
             await status_message.edit_text(
@@ -87,7 +119,7 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
             compressed_file_path = tempfile.NamedTemporaryFile(
                 delete=False, suffix=".ogg"
             ).name
-            await compress_audio(temp_file_path, compressed_file_path)
+            await compress_audio(temp_file_path, compressed_file_path, speed=flight_key[1])
             logging.info(
                 f"Audio compressed, new size: {get_file_size(compressed_file_path)}"
             )
@@ -101,47 +133,65 @@ async def audio_handler(message: Message, context: CallbackContext) -> None:
             )
 
             logging.info("Starting transcription process")
-            transcription = await transcribe_audio(compressed_file_path)
-            logging.info(f"Transcription completed, length: {len(transcription)} chars")
+            # The audio was sped up, so timestamps are scaled back to the original timeline
+            return await transcribe_audio(compressed_file_path, time_scale=flight_key[1])
 
-            # Update with success
-            await status_message.edit_text(
-                f"🎵 **¡Transcripción completada!**\n"
-                f"📊 {len(transcription):,} caracteres transcritos\n"
-                f"⚡ Procesando resultado final..."
-            )
+        finally:
+            # Cleanup temporary files (a job removes its download when it finishes)
+            for file_path in [None if job else temp_file_path, compressed_file_path]:
+                if file_path:
+                    try:
+                        os.unlink(file_path)
+                        logging.info(f"Removed temporary file: {file_path}")
+                    except Exception as e:
+                        logging.error(
+                            f"Error removing temporary file {file_path}: {str(e)}"
+                        )
 
-            # Process transcription
-            await process_media(message, transcription, message, content_type="audio", status_message=status_message)
-
-        except Exception as e:
-            logging.error(f"Error processing audio file: {str(e)}", exc_info=True)
-            try:
-                # Delete status message and send error
-                await status_message.delete()
-                await message.reply_text(
-                    f"🎵 **Error procesando {content_type}**\n"
-                    f"❌ Error durante el procesamiento\n"
-                    f"🔧 Por favor, intenta nuevamente más tarde."
-                )
-            except Exception:
-                # Fallback if status message can't be deleted
-                await message.reply_text(
-                    "❌ Ocurrió un error al procesar la transcripción del audio."
+    try:
+        # A resumed job may already have its transcript
+        transcription = job.transcript if job else None
+        if transcription is not None:
+            logging.info(f"Job {job.update_id} was transcribed before the restart, skipping transcription")
+        else:
+            if media_transcriptions.is_in_flight(flight_key):
+                logging.info(f"Same file {file_unique_id} is already being transcribed, waiting")
+                await status_message.edit_text(
+                    f"🎵 **Procesando {content_type}**\n"
+                    f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
+                    f"⏳ Este archivo ya se está transcribiendo, esperando resultado..."
                 )
-            raise
 
-        finally:
-            # Cleanup temporary files
-            for file_path in [temp_file_path, compressed_file_path]:
-                try:
-                    os.unlink(file_path)
-                    logging.info(f"Removed temporary file: {file_path}")
-                except Exception as e:
-                    logging.error(
-                        f"Error removing temporary file {file_path}: {str(e)}"
-                    )
+            transcription = await media_transcriptions.do(flight_key, transcribe_file)
+            if job:
+                await job.save_transcript(transcription)
+        logging.info(f"Transcription completed, length: {len(transcription)} chars")
+
+        # Update with success
+        await status_message.edit_text(
+            f"🎵 **¡Transcripción completada!**\n"
+            f"📊 {len(transcription):,} caracteres transcritos\n"
+            f"⚡ Procesando resultado final..."
+        )
+
+        # Process transcription
+        await process_media(
+            message, transcription, message, content_type="audio", status_message=status_message, job=job, settings=settings
+        )
 
     except Exception as e:
-        logging.error(f"Error in audio handler: {str(e)}", exc_info=True)
+        logging.error(f"Error processing audio file: {str(e)}", exc_info=True)
+        try:
+            # Delete status message and send error
+            await status_message.delete()
+            await message.reply_text(
+                f"🎵 **Error procesando {content_type}**\n"
+                f"❌ Error durante el procesamiento\n"
+                f"🔧 Por favor, intenta nuevamente más tarde."
+            )
+        except Exception:
+            # Fallback if status message can't be deleted
+            await message.reply_text(
+                "❌ Ocurrió un error al procesar la transcripción del audio."
+            )
         raise
@@ -1,6 +1,7 @@
 import tempfile
 import os
 import logging
+from typing import Optional
 from telegram import Message
 from telegram.ext import CallbackContext
 from bot.utils.transcription_utils import (
@@ -9,22 +10,29 @@ from bot.utils.transcription_utils import (
     compress_audio,
     extract_audio,
     get_file_size,
+    download_telegram_file,
+    media_transcriptions,
+    get_settings,
 )
+from bot.utils.job_store import JobRecord
 from config.constants import MAX_FILE_SIZE
 
 
-async def video_handler(message: Message, context: CallbackContext) -> None:
+async def video_handler(message: Message, context: CallbackContext, job: Optional[JobRecord] = None) -> None:
     """
     Handle video message transcription requests.
 
     Args:
         message: Telegram message containing video
         context: Callback context
+        job: Persistent job of the request; its saved stages are reused when it resumes
     """
     chat_id = message.chat.id
     user_id = message.from_user.id
     file_id = message.video.file_id
     file_size = message.video.file_size
+    if job:
+        job.set_media("video", file_size, message.video.duration)
 
     logging.info(f"Processing video from user {user_id}, file_id: {file_id}")
     logging.info(f"Video file size: {file_size} bytes")
@@ -49,65 +57,112 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
         f"🔄 Descargando archivo..."
     )
 
-    # Create temporary files
-    temp_file_path = None
-    audio_file_path = None
-    compressed_file_path = None
+    # The job's settings snapshot (speed, enhancement, output) applies throughout
+    settings = await get_settings(job, chat_id)
 
-    try:
-        # Get video file from Telegram
-        file = await context.bot.get_file(file_id)
-        logging.info(f"Retrieved file info: {file.file_path}")
-
-        # Create temporary files
-        temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
-        audio_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name
-        compressed_file_path = tempfile.NamedTemporaryFile(
-            delete=False, suffix=".ogg"
-        ).name
-
-        # Download video
-        await status_message.edit_text(
-            f"🎬 **Procesando video**\n"
-            f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
-            f"⬇️ Descargando archivo de Telegram..."
-        )
+    # Identical videos (e.g. the same forward sent twice) share a single transcription
+    flight_key = (message.video.file_unique_id, settings.transcription_speed)
 
-        await file.download_to_drive(custom_path=temp_file_path)
-        logging.info(
-            f"Video downloaded successfully, size: {get_file_size(temp_file_path)}"
-        )
+    async def transcribe_file() -> str:
+        """Download the video, extract and compress its audio and transcribe it."""
+        temp_file_path = None
+        audio_file_path = None
+        compressed_file_path = None
 
-        # Extract audio from video
-        await status_message.edit_text(
-            f"🎬 **Procesando video**\n"
-            f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
-            f"🎵 Extrayendo audio del video..."
-        )
+        try:
+            # Create temporary files
+            audio_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name
+            compressed_file_path = tempfile.NamedTemporaryFile(
+                delete=False, suffix=".ogg"
+            ).name
+
+            if job and job.has_download():
+                # Resumed job: the video was downloaded before the restart
+                temp_file_path = job.download_path
+                logging.info(f"Reusing video downloaded before restart: {temp_file_path}")
+            else:
+                # A job keeps the downloaded video until it finishes, for resuming
+                if job:
+                    temp_file_path = job.work_path("download.mp4")
+                    await job.set_state("downloading")
+                else:
+                    temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4").name
+
+                # Download video
+                await status_message.edit_text(
+                    f"🎬 **Procesando video**\n"
+                    f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
+                    f"⬇️ Descargando archivo de Telegram..."
+                )
+
+                await download_telegram_file(context.bot, file_id, temp_file_path)
+                logging.info(
+                    f"Video downloaded successfully, size: {get_file_size(temp_file_path)}"
+                )
+                if job:
+                    await job.save_download(temp_file_path)
+
+            # Extract audio from video
+            await status_message.edit_text(
+                f"🎬 **Procesando video**\n"
+                f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
+                f"🎵 Extrayendo audio del video..."
+            )
 
-        await extract_audio(temp_file_path, audio_file_path)
-        logging.info(f"Audio extracted, size: {get_file_size(audio_file_path)}")
+            await extract_audio(temp_file_path, audio_file_path)
+            logging.info(f"Audio extracted, size: {get_file_size(audio_file_path)}")
 
-        # Compress extracted audio
-        await status_message.edit_text(
-            f"🎬 **Procesando video**\n"
-            f"📊 Audio extraído: {get_file_size(audio_file_path)}\n"
-            f"🗜️ Comprimiendo audio para transcripción..."
-        )
+            # Compress extracted audio
+            await status_message.edit_text(
+                f"🎬 **Procesando video**\n"
+                f"📊 Audio extraído: {get_file_size(audio_file_path)}\n"
+                f"🗜️ Comprimiendo audio para transcripción..."
+            )
 
-        await compress_audio(audio_file_path, compressed_file_path)
-        logging.info(f"Audio compressed, size: {get_file_size(compressed_file_path)}")
+            await compress_audio(audio_file_path, compressed_file_path, speed=flight_key[1])
+            logging.info(f"Audio compressed, size: {get_file_size(compressed_file_path)}")
 
-        # Transcribe audio
-        await status_message.edit_text(
-            f"🎬 **Transcribiendo video**\n"
-            f"📊 Audio comprimido: {get_file_size(compressed_file_path)}\n"
-            f"🤖 Procesando con OpenAI Whisper...\n"
-            f"⏳ Esto puede tomar unos momentos..."
-        )
+            # Transcribe audio
+            await status_message.edit_text(
+                f"🎬 **Transcribiendo video**\n"
+                f"📊 Audio comprimido: {get_file_size(compressed_file_path)}\n"
+                f"🤖 Procesando con OpenAI Whisper...\n"
+                f"⏳ Esto puede tomar unos momentos..."
+            )
+
+            logging.info("Starting transcription process")
+            # The audio was sped up, so timestamps are scaled back to the original timeline
+            return await transcribe_audio(compressed_file_path, time_scale=flight_key[1])
+
+        finally:
+            # Cleanup temporary files (a job removes its download when it finishes)
+            for file_path in [None if job else temp_file_path, audio_file_path, compressed_file_path]:
+                if file_path:
+                    try:
+                        os.unlink(file_path)
+                        logging.info(f"Removed temporary file: {file_path}")
+                    except Exception as e:
+                        logging.error(
+                            f"Error removing temporary file {file_path}: {str(e)}"
+                        )
 
-        logging.info("Starting transcription process")
-        transcription = await transcribe_audio(compressed_file_path)
+    try:
+        # A resumed job may already have its transcript
+        transcription = job.transcript if job else None
+        if transcription is not None:
+            logging.info(f"Job {job.update_id} was transcribed before the restart, skipping transcription")
+        else:
+            if media_transcriptions.is_in_flight(flight_key):
+                logging.info(f"Same video {flight_key[0]} is already being transcribed, waiting")
+                await status_message.edit_text(
+                    f"🎬 **Procesando video**\n"
+                    f"📊 Tamaño: {file_size/1024/1024:.1f} MB\n"
+                    f"⏳ Este video ya se está transcribiendo, esperando resultado..."
+                )
+
+            transcription = await media_transcriptions.do(flight_key, transcribe_file)
+            if job:
+                await job.save_transcript(transcription)
         logging.info(f"Transcription completed, length: {len(transcription)} chars")
 
         # Update with success
@@ -118,7 +173,9 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
         )
 
         # Process transcription
-        await process_media(message, transcription, message, content_type="video", status_message=status_message)
+        await process_media(
+            message, transcription, message, content_type="video", status_message=status_message, job=job, settings=settings
+        )
 
     except Exception as e:
         logging.error(f"Error processing video: {str(e)}", exc_info=True)
@@ -136,15 +193,3 @@ async def video_handler(message: Message, context: CallbackContext) -> None:
                 "❌ Ocurrió un error al procesar la transcripción del video."
             )
         raise
-
-    finally:
-        # Cleanup temporary files
-        for file_path in [temp_file_path, audio_file_path, compressed_file_path]:
-            if file_path:
-                try:
-                    os.unlink(file_path)
-                    logging.info(f"Removed temporary file: {file_path}")
-                except Exception as e:
-                    logging.error(
-                        f"Error removing temporary file {file_path}: {str(e)}"
-                    )
@@ -0,0 +1,277 @@
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from typing import List, Optional
+from telegram import Update
+from telegram.ext import CallbackContext
+from bot.services.openai_service import openai_service
+from bot.services.youtube_transcript_service import youtube_transcript_extractor
+from bot.utils.transcription_utils import process_media, get_settings
+from bot.utils.job_store import JobRecord
+from bot.utils.transcript_segments import Transcript, write_srt
+from config.bot_config import ChatSettings
+from config.constants import (
+    YOUTUBE_BATCH_CONCURRENCY,
+    YOUTUBE_BATCH_MAX_VIDEOS,
+    YOUTUBE_BATCH_ARCHIVE_THRESHOLD,
+    YOUTUBE_BATCH_PROGRESS_INTERVAL,
+)
+
+
+class BatchProgress:
+    """
+    Single status message summarizing every video of a batch.
+
+    Telegram rate-limits message edits, so updates are throttled to one every
+    ``interval`` seconds; ``refresh(force=True)`` always shows the latest state.
+    """
+
+    ICONS = {"pending": "⏳", "running": "🔄", "done": "✅", "partial": "⚠️", "failed": "❌"}
+
+    def __init__(self, status_message, video_ids: List[str], interval: float = YOUTUBE_BATCH_PROGRESS_INTERVAL):
+        """
+        Args:
+            status_message: Telegram message to edit
+            video_ids: Videos of the batch, in delivery order
+            interval: Minimum seconds between edits
+        """
+        self.status_message = status_message
+        self.video_ids = video_ids
+        self.interval = interval
+        self.states = ["pending"] * len(video_ids)
+        self.details = [""] * len(video_ids)
+        self.finished = False
+        self._last_edit = 0.0
+        self._lock = asyncio.Lock()
+
+    def set(self, index: int, state: str, details: str = "") -> None:
+        """Record the state of one video."""
+        self.states[index] = state
+        self.details[index] = details
+
+    async def refresh(self, force: bool = False) -> None:
+        """Edit the status message, unless an edit happened less than ``interval`` seconds ago."""
+        if not force and (self._lock.locked() or time.monotonic() - self._last_edit < self.interval):
+            return
+        async with self._lock:
+            self._last_edit = time.monotonic()
+            try:
+                await self.status_message.edit_text(self.render())
+            except Exception as e:
+                logging.warning(f"Error updating batch status message: {e}")
+
+    def render(self) -> str:
+        """Build the status message text."""
+        total = len(self.video_ids)
+        counts = " · ".join(
+            f"{icon} {self.states.count(state)}" for state, icon in self.ICONS.items() if state in self.states
+        )
+        title = (
+            f"🎬 **Lote de YouTube completado** ({total} videos)"
+            if self.finished
+            else f"🎬 **Procesando {total} videos de YouTube**"
+        )
+        lines = [title, counts]
+        for number, (video_id, state, details) in enumerate(zip(self.video_ids, self.states, self.details), 1):
+            line = f"{number}. {self.ICONS[state]} `{video_id}`"
+            lines.append(f"{line} — {details}" if details else line)
+        return "\n".join(lines)
+
+
+async def youtube_batch_handler(
+    update: Update,
+    context: CallbackContext,
+    video_ids: List[str],
+    original_message,
+    playlist_id: Optional[str] = None,
+    force_refresh: bool = False,
+    job: Optional[JobRecord] = None,
+) -> None:
+    """
+    Transcribe several YouTube videos (every link of a message and/or a playlist) at once.
+
+    Videos go through the normal extractor (cache, negative cache, strategy race),
+    ``YOUTUBE_BATCH_CONCURRENCY`` at a time, with one aggregated progress message.
+    Up to ``YOUTUBE_BATCH_ARCHIVE_THRESHOLD`` transcripts are delivered in order as
+    regular transcriptions; larger batches are sent as a single zip archive.
+
+    Args:
+        update: Telegram update object
+        context: Callback context
+        video_ids: IDs of the linked videos, in message order
+        original_message: Original message containing the links
+        playlist_id: Optional playlist whose videos are added after the linked ones
+        force_refresh: Ignore cached results and extract the transcripts again
+        job: Persistent job of the request; a resumed batch extracts again (from the cache)
+    """
+    user_id = update.effective_user.id
+    settings = await get_settings(job, update.effective_chat.id)
+    status_message = None
+
+    if playlist_id:
+        logging.info(f"Expanding playlist {playlist_id} for user {user_id}")
+        status_message = await update.message.chat.send_message(
+            f"📃 **Cargando lista de reproducción**\n"
+            f"📝 ID: `{playlist_id}`"
+        )
+        try:
+            playlist_video_ids = await youtube_transcript_extractor.get_playlist_video_ids(
+                playlist_id, YOUTUBE_BATCH_MAX_VIDEOS
+            )
+        except Exception as e:
+            logging.error(f"Could not expand playlist {playlist_id}: {str(e)}")
+            playlist_video_ids = []
+        video_ids = list(dict.fromkeys(video_ids + playlist_video_ids))
+
+    if not video_ids:
+        text = (
+            f"📃 **Lista de reproducción vacía o no disponible**\n"
+            f"📝 ID: `{playlist_id}`\n"
+            f"💡 Comprueba que la lista sea pública."
+        )
+        if status_message:
+            await status_message.edit_text(text)
+        else:
+            await update.message.chat.send_message(text)
+        return
+
+    skipped = len(video_ids) - YOUTUBE_BATCH_MAX_VIDEOS
+    video_ids = video_ids[:YOUTUBE_BATCH_MAX_VIDEOS]
+    if skipped > 0:
+        logging.warning(f"Batch for user {user_id} truncated to {YOUTUBE_BATCH_MAX_VIDEOS} videos ({skipped} skipped)")
+        await update.message.chat.send_message(
+            f"⚠️ Se procesarán solo los primeros {YOUTUBE_BATCH_MAX_VIDEOS} videos ({skipped} omitidos)."
+        )
+
+    archive = len(video_ids) > YOUTUBE_BATCH_ARCHIVE_THRESHOLD
+    logging.info(
+        f"Processing batch of {len(video_ids)} YouTube videos for user {user_id} "
+        f"(concurrency: {YOUTUBE_BATCH_CONCURRENCY}, delivery: {'archive' if archive else 'messages'})"
+    )
+
+    if status_message is None:
+        status_message = await update.message.chat.send_message(
+            f"🎬 **Procesando {len(video_ids)} videos de YouTube**"
+        )
+    progress = BatchProgress(status_message, video_ids)
+    if job:
+        await job.set_state("transcribing")
+    await progress.refresh(force=True)
+
+    semaphore = asyncio.Semaphore(YOUTUBE_BATCH_CONCURRENCY)
+    # Enhancement happens here only for archives; messages go through process_media
+    enhance = archive and settings.enhanced_transcription_enabled
+
+    async def extract(index: int, video_id: str):
+        """Extract one video and return (transcript, text to deliver)."""
+        async with semaphore:
+            progress.set(index, "running")
+            await progress.refresh()
+            unavailable = False
+
+            async def status_callback(strategy_num, strategy_name, total_strategies, status, details=""):
+                nonlocal unavailable
+                if status == "trying":
+                    progress.set(index, "running", strategy_name)
+                    await progress.refresh()
+                elif status == "unavailable":
+                    unavailable = True
+
+            try:
+                transcript = await youtube_transcript_extractor.extract_transcript_with_status(
+                    video_id, status_callback, force_refresh=force_refresh
+                )
+            except Exception as e:
+                logging.error(f"Unexpected error extracting YouTube video {video_id} in batch: {str(e)}")
+                transcript = None
+
+            if not transcript:
+                progress.set(index, "failed", "sin transcripción" if unavailable else "estrategias agotadas")
+                await progress.refresh()
+                return None, None
+
+            text = transcript
+            if enhance:
+                progress.set(index, "running", "mejorando con IA")
+                await progress.refresh()
+                try:
+                    text = await openai_service.post_process_transcription(transcript)
+                except Exception as e:
+                    logging.error(f"Error in transcription enhancement for {video_id}: {e}")
+
+            state = "partial" if getattr(transcript, "partial", False) else "done"
+            progress.set(index, state, f"{len(text):,} caracteres")
+            await progress.refresh()
+            return transcript, text
+
+    results = await asyncio.gather(*(extract(index, video_id) for index, video_id in enumerate(video_ids)))
+    progress.finished = True
+    await progress.refresh(force=True)
+
+    succeeded = sum(1 for transcript, _ in results if transcript)
+    if job:
+        job.set_media("youtube_batch")
+        job.transcript_chars = sum(len(transcript) for transcript, _ in results if transcript)
+    logging.info(f"Batch for user {user_id} finished: {succeeded}/{len(video_ids)} transcripts")
+    if not succeeded:
+        if job:
+            await job.set_state("failed")
+        return
+
+    if job:
+        await job.set_state("delivering")
+
+    if archive:
+        await send_batch_archive(update.message, video_ids, results, settings)
+        return
+
+    for number, (video_id, (transcript, _)) in enumerate(zip(video_ids, results), 1):
+        if not transcript:
+            continue
+        await update.message.chat.send_message(
+            f"🎬 **Video {number}/{len(video_ids)}**: https://youtu.be/{video_id}"
+        )
+        await process_media(update.message, transcript, original_message, content_type="youtube", settings=settings)
+
+
+async def send_batch_archive(message, video_ids: List[str], results: list, settings: ChatSettings) -> None:
+    """
+    Send the transcripts of a batch as one zip archive, one file per video in batch order.
+
+    Args:
+        message: Telegram message whose chat receives the archive
+        video_ids: Videos of the batch
+        results: (transcript, text) per video; (None, None) for failed ones
+        settings: Settings of the batch (subtitle files are added if enabled)
+    """
+    width = len(str(len(video_ids)))
+    subtitles = settings.subtitle_file_enabled
+    temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".zip").name
+    try:
+        with zipfile.ZipFile(temp_file_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for number, (video_id, (transcript, text)) in enumerate(zip(video_ids, results), 1):
+                if not transcript:
+                    continue
+                name = f"{number:0{width}d}_{video_id}"
+                archive.writestr(f"{name}.txt", text)
+                if subtitles and isinstance(transcript, Transcript) and transcript.has_timestamps:
+                    with archive.open(f"{name}.srt", "w") as binary, io.TextIOWrapper(binary, encoding="utf-8") as f:
+                        write_srt(transcript, f)
+
+        succeeded = sum(1 for transcript, _ in results if transcript)
+        with open(temp_file_path, "rb") as file:
+            await message.chat.send_document(
+                document=file,
+                filename="transcripciones_youtube.zip",
+                caption=f"📦 {succeeded}/{len(video_ids)} transcripciones de YouTube.",
+            )
+        logging.info(f"Batch archive sent ({succeeded} transcripts)")
+    finally:
+        try:
+            os.unlink(temp_file_path)
+        except Exception as e:
+            logging.error(f"Error al eliminar el archivo temporal: {e}")
@@ -1,14 +1,19 @@
 from typing import Optional
 from telegram import Update
 from telegram.ext import CallbackContext
-from bot.services.youtube_transcript_service import YouTubeTranscriptExtractor
+from bot.services.youtube_transcript_service import youtube_transcript_extractor
 from bot.utils.transcription_utils import extract_video_id, process_media
+from bot.utils.job_store import JobRecord
 import logging
-import asyncio
 
 
 async def youtube_handler(
-    update: Update, context: CallbackContext, youtube_url: str, original_message
+    update: Update,
+    context: CallbackContext,
+    youtube_url: str,
+    original_message,
+    force_refresh: bool = False,
+    job: Optional[JobRecord] = None,
 ) -> None:
     """
     Enhanced YouTube video transcription handler with multiple service fallback.
@@ -18,6 +23,8 @@ async def youtube_handler(
         context: Callback context
         youtube_url: URL of the YouTube video
         original_message: Original message containing the URL
+        force_refresh: Ignore cached results and extract the transcript again
+        job: Persistent job of the request; a transcript it saved is reused when it resumes
     """
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
@@ -32,6 +39,8 @@ async def youtube_handler(
         return
 
     logging.info(f"Processing YouTube video {video_id} for user {user_id}")
+    if job:
+        job.set_media("youtube")
 
     # Send initial message with video ID info
     status_message = await update.message.chat.send_message(
@@ -40,12 +49,15 @@ async def youtube_handler(
         f"🔄 Iniciando extracción con múltiples estrategias..."
     )
 
-    try:
-        # Initialize enhanced extractor with callback for status updates
-        extractor = YouTubeTranscriptExtractor()
+    # Set when the extractor reports that every strategy failed or the deadline expired
+    exhausted_details = ""
+    # Set when the video is already known to have no transcript
+    known_unavailable = False
 
+    try:
         # Create callback function to update user on progress
         async def status_callback(strategy_num, strategy_name, total_strategies, status, details=""):
+            nonlocal exhausted_details, known_unavailable
             try:
                 if status == "trying":
                     await status_message.edit_text(
@@ -55,6 +67,8 @@ async def youtube_handler(
                         f"🔄 {details if details else 'Extrayendo transcripción...'}"
                     )
                 elif status == "success":
+                    if job:
+                        job.set_strategy(strategy_name)
                     await status_message.edit_text(
                         f"🎬 **Video de YouTube procesado**\n"
                         f"📝 ID: `{video_id}`\n"
@@ -63,6 +77,7 @@ async def youtube_handler(
                         f"🔄 Procesando transcripción..."
                     )
                 elif status == "failed":
+                    # No artificial delay here: strategies race and the next update follows quickly
                     if strategy_num < total_strategies:
                         await status_message.edit_text(
                             f"🎬 **Procesando video de YouTube**\n"
@@ -70,22 +85,47 @@ async def youtube_handler(
                             f"❌ Estrategia {strategy_num} falló: {strategy_name}\n"
                             f"🔄 Probando siguiente estrategia..."
                         )
-                        # Small delay to show the failure message
-                        await asyncio.sleep(0.5)
+                elif status == "exhausted":
+                    exhausted_details = details
+                elif status == "unavailable":
+                    known_unavailable = True
             except Exception as e:
                 logging.warning(f"Error updating status message: {e}")
 
-        # Extract transcript with status updates
-        transcription = await extractor.extract_transcript_with_status(video_id, status_callback)
+        # A resumed job may already have its transcript
+        transcription = job.transcript if job else None
+        if transcription is None:
+            if job:
+                await job.set_state("transcribing")
+            # Extract transcript with status updates
+            transcription = await youtube_transcript_extractor.extract_transcript_with_status(
+                video_id, status_callback, force_refresh=force_refresh
+            )
+            if transcription and job:
+                await job.save_transcript(transcription)
+
+        if not transcription and known_unavailable:
+            logging.info(f"Video {video_id} is known to have no transcript, skipping extraction")
+            await status_message.edit_text(
+                f"🎬 **Video sin transcripción**\n"
+                f"📝 ID: `{video_id}`\n"
+                f"❌ Este video no tiene subtítulos disponibles (comprobado recientemente)\n"
+                f"🔁 Usa `/transcribe {youtube_url} refresh` para volver a intentarlo."
+            )
+            if job:
+                await job.set_state("failed")
+            return
 
         if not transcription:
             logging.error(f"All transcript extraction methods failed for video {video_id}")
             await status_message.edit_text(
                 f"🎬 **Error procesando video**\n"
                 f"📝 ID: `{video_id}`\n"
-                f"❌ **Todas las estrategias fallaron**\n"
+                f"❌ **Todas las estrategias agotadas{' ' + exhausted_details if exhausted_details else ''}**\n"
                 f"💡 El video podría no tener subtítulos o estar restringido geográficamente."
             )
+            if job:
+                await job.set_state("failed")
             return
 
         logging.info(f"Transcription extracted successfully, length: {len(transcription)} chars")
@@ -100,13 +140,15 @@ async def youtube_handler(
 
         # Process the transcription with final status update
         await process_media(
-            update.message, transcription, original_message, content_type="youtube", status_message=status_message
+            update.message, transcription, original_message, content_type="youtube", status_message=status_message, job=job
         )
 
         logging.info(f"Enhanced YouTube transcription completed for video {video_id}")
 
     except Exception as e:
         logging.error(f"Unexpected error processing YouTube video {video_id}: {str(e)}")
+        if job:
+            await job.set_state("failed")
         try:
             # Delete status message and send error
             await status_message.delete()
@@ -1,6 +1,11 @@
+import asyncio
 import logging
 from openai import OpenAI
 from config.bot_config import bot_config
+from bot.utils.transcript_normalizer import normalize_segments
+from bot.utils.transcript_segments import Transcript
+from bot.utils.concurrency import openai_pool
+from bot.utils.job_store import current_job
 import os
 
 
@@ -8,36 +13,51 @@ class OpenAIService:
     def __init__(self):
         self.client = OpenAI(api_key=bot_config.openai_api_key)
 
-    async def transcribe_audio(self, file_path: str) -> str:
+    async def transcribe_audio(self, file_path: str, time_scale: float = 1.0) -> Transcript:
         """
         Transcribe an audio file using OpenAI's Whisper model.
 
         Args:
             file_path: Path to the audio file to transcribe
+            time_scale: Factor applied to segment timestamps (the speed-up applied to the audio)
 
         Returns:
-            str: The transcribed text
+            Transcript: The transcribed text with segment timestamps
         """
         try:
             logging.info(f"Starting audio transcription for file: {file_path}")
             file_size = os.path.getsize(file_path)
             logging.info(f"File size: {file_size} bytes")
 
-            with open(file_path, "rb") as audio_file:
-                logging.info("Sending request to OpenAI Whisper API")
-                transcription = self.client.audio.transcriptions.create(
-                    model="whisper-1", file=audio_file
-                )
+            logging.info("Sending request to OpenAI Whisper API")
+            async with openai_pool:
+                # The client is synchronous; run it off the event loop
+                transcription = await asyncio.to_thread(self._create_transcription, file_path)
+
+            segments = getattr(transcription, "segments", None)
+            transcript = (
+                normalize_segments(segments, time_scale=time_scale)
+                if segments
+                else Transcript(transcription.text)
+            )
 
             logging.info(
-                f"Transcription completed successfully, length: {len(transcription.text)} chars"
+                f"Transcription completed successfully, length: {len(transcript)} chars, "
+                f"{transcript.segment_count} segments"
             )
-            return transcription.text
+            return transcript
 
         except Exception as e:
             logging.error(f"Error in audio transcription: {str(e)}", exc_info=True)
             raise
 
+    def _create_transcription(self, file_path: str):
+        """Send an audio file to Whisper (blocking)."""
+        with open(file_path, "rb") as audio_file:
+            return self.client.audio.transcriptions.create(
+                model="whisper-1", file=audio_file, response_format="verbose_json"
+            )
+
     async def post_process_transcription(self, transcription: str) -> str:
         """
         Post-process transcription using GPT model for improved quality.
@@ -63,16 +83,23 @@ class OpenAIService:
             7. Preserve all original sentence breaks and paragraph structure."""
 
             logging.info("Sending request to GPT model")
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": transcription},
-                ],
-                temperature=0.0,
-            )
+            async with openai_pool:
+                response = await asyncio.to_thread(
+                    self.client.chat.completions.create,
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": transcription},
+                    ],
+                    temperature=0.0,
+                )
 
             improved_text = response.choices[0].message.content
+            # Count the tokens towards the usage of the job being run, if any
+            job = current_job.get()
+            usage = getattr(response, "usage", None)
+            if job and usage:
+                job.add_openai_tokens(usage.total_tokens)
             logging.info(
                 f"Post-processing complete, new length: {len(improved_text)} chars"
             )
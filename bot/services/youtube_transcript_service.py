@@ -1,11 +1,69 @@
 import os
 import aiohttp
 import asyncio
-from typing import Optional, List, Dict, Any
-from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, VideoUnavailable
+from typing import Optional, List, Dict, Any, Tuple
+from youtube_transcript_api import YouTubeTranscriptApi, NoTranscriptFound, VideoUnavailable, TranscriptsDisabled
 from youtube_transcript_api.proxies import WebshareProxyConfig, GenericProxyConfig
 import logging
+import math
 import random
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from config.constants import (
+    YOUTUBE_STRATEGY_CONCURRENCY,
+    YOUTUBE_STRATEGY_HEDGE_DELAY,
+    STRATEGY_STATS_DECAY,
+    STRATEGY_STATS_HALF_LIFE,
+    STRATEGY_EXPLORATION_RATE,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_ERROR_RATE,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_COOLDOWN,
+    TRANSCRIPT_SERVICE_RATE_LIMITS,
+    DEFAULT_SERVICE_RATE_LIMIT,
+    YOUTUBE_API_THREADS,
+    YOUTUBE_EXTRACTION_DEADLINE,
+    STRATEGY_TIMEOUT_MIN,
+    STRATEGY_TIMEOUT_MAX,
+    STRATEGY_TIMEOUT_P95_MARGIN,
+    STRATEGY_LATENCY_SAMPLES,
+    KOME_AI_PAGE_CONCURRENCY,
+    KOME_AI_MAX_PAGES,
+)
+from bot.utils.database import db
+from bot.utils.transcript_cache import transcript_cache
+from bot.utils.single_flight import SingleFlight
+from bot.utils.circuit_breaker import CircuitBreaker
+from bot.utils.rate_limiter import RateLimiter
+from bot.utils.concurrency import transcript_service_pool
+from bot.utils.transcript_normalizer import normalize_caption_blob, normalize_segments, normalize_text
+
+
+class ServiceUnavailableError(Exception):
+    """
+    Raised by a strategy when its service fails (error status, timeout, network error).
+
+    Strategies return None when the service works but has no transcript for the
+    video, so only real service failures count against its circuit breaker.
+    """
+
+
+class TranscriptUnavailableError(Exception):
+    """
+    Raised by a strategy when YouTube itself reports that the video has no transcript
+    (captions disabled, no transcript found, video unavailable).
+
+    The service worked, so this counts as a healthy call; the reason is kept in the
+    negative cache so repeated requests for the video fail fast.
+    """
 
 
 class YouTubeTranscriptExtractor:
@@ -14,9 +72,67 @@ class YouTubeTranscriptExtractor:
     Implements robust geolocation bypass using multiple strategies.
 
     This is the centralized service used by both the bot handler and the comprehensive tests.
+    All strategies share one pooled HTTP session; call ``start()``/``close()`` to manage it
+    (it is also created lazily on first use).
     """
 
-    def __init__(self):
+    # Strategy names for better user feedback
+    STRATEGY_DISPLAY_NAMES = {
+        '_extract_with_savesubs': 'SaveSubs',
+        '_extract_with_youtube_transcript_io': 'YouTube Transcript.io',
+        '_extract_with_notegpt': 'NoteGPT',
+        '_extract_with_tactiq': 'Tactiq',
+        '_extract_with_kome_ai': 'Kome.ai',
+        '_extract_with_anthiago': 'Anthiago',
+        '_extract_with_yescribe': 'YeScribe',
+        '_extract_with_youtube_transcript_api_proxy': 'YouTube API (Proxy)',
+        '_extract_with_youtube_transcript_api_direct': 'YouTube API (Direct)',
+    }
+
+    # Host contacted by the youtube_transcript_api strategies (for rate limiting)
+    YOUTUBE_HOST = 'www.youtube.com'
+
+    # Video entries of a playlist page
+    PLAYLIST_VIDEO_REGEX = re.compile(r'"playlistVideoRenderer":\{"videoId":"([\w\-]{11})"')
+
+    # Language codes accepted as the preferred language by youtube_transcript_api
+    YOUTUBE_API_LANGUAGES = ['en', 'en-US']
+
+    # Language preferred by the strategies, also part of the cache key
+    PREFERRED_LANGUAGE = 'en'
+
+    # Neutral estimates used for strategies without (recent) statistics
+    PRIOR_SUCCESS_RATE = 0.5
+    PRIOR_LATENCY = 5.0
+    MIN_SUCCESS_RATE = 0.02
+    # Per-attempt overhead, so services that fail instantly still rank as dead
+    MIN_LATENCY = 1.0
+    # Latency samples needed before a strategy's timeout follows its p95
+    MIN_LATENCY_SAMPLES = 5
+
+    def __init__(
+        self,
+        max_concurrency: int = YOUTUBE_STRATEGY_CONCURRENCY,
+        hedge_delay: float = YOUTUBE_STRATEGY_HEDGE_DELAY,
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of strategies running at the same time (1 = sequential)
+            hedge_delay: Seconds to wait for running strategies before launching the next one
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.hedge_delay = max(0.0, hedge_delay)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._in_flight = SingleFlight("YouTube extraction")
+        # Blocking youtube_transcript_api calls run on a bounded pool (created lazily),
+        # with one API client per proxy configuration
+        self._ytt_executor: Optional[ThreadPoolExecutor] = None
+        self._ytt_apis: Dict[bool, YouTubeTranscriptApi] = {}
+        # Recent response times per strategy (keyed by method name), used to derive its timeout
+        self._latencies: Dict[str, deque] = {}
+        # Request budget per service host, shared by every extraction
+        self.rate_limiter = RateLimiter(TRANSCRIPT_SERVICE_RATE_LIMITS, DEFAULT_SERVICE_RATE_LIMIT)
+
         self.strategies = [
             self._extract_with_savesubs,
             self._extract_with_youtube_transcript_io,
@@ -29,6 +145,19 @@ class YouTubeTranscriptExtractor:
             self._extract_with_youtube_transcript_api_direct,
         ]
 
+        # One circuit breaker per strategy, keyed by method name
+        self.circuit_breakers = {
+            strategy.__name__: CircuitBreaker(
+                self._get_strategy_display_name(strategy),
+                failure_threshold=CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                error_rate_threshold=CIRCUIT_BREAKER_ERROR_RATE,
+                window_size=CIRCUIT_BREAKER_WINDOW,
+                min_calls=CIRCUIT_BREAKER_MIN_CALLS,
+                cooldown=CIRCUIT_BREAKER_COOLDOWN,
+            )
+            for strategy in self.strategies
+        }
+
         # Service configurations
         self.notegpt_config = {
             'url': 'https://notegpt.io/api/v2/video-transcript',
@@ -149,6 +278,65 @@ class YouTubeTranscriptExtractor:
             }
         }
 
+    async def start(self) -> None:
+        """Open the pooled HTTP session shared by all strategies."""
+        if self._session and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        # Services must not see each other's cookies, so the shared session keeps none;
+        # strategies that need cookies send them per request
+        self._session = aiohttp.ClientSession(
+            connector=connector, cookie_jar=aiohttp.DummyCookieJar()
+        )
+        logging.info(
+            f"Transcript HTTP session started (pool: {HTTP_POOL_LIMIT}, per host: {HTTP_POOL_LIMIT_PER_HOST})"
+        )
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session and the YouTube API thread pool."""
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logging.info("Transcript HTTP session closed")
+        self._session = None
+
+        if self._ytt_executor:
+            # Calls already running cannot be interrupted; let them finish in the background
+            self._ytt_executor.shutdown(wait=False, cancel_futures=True)
+            self._ytt_executor = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, starting it if needed."""
+        if not self._session or self._session.closed:
+            await self.start()
+        return self._session
+
+    @asynccontextmanager
+    async def _request(self, method: str, url: str, **kwargs):
+        """
+        Send a request through the shared session once the host's rate budget allows it.
+
+        A 429 response blocks further requests to the host for its ``Retry-After``.
+        Requests in flight across all services are bounded by the transcript service pool.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Extra arguments for ``aiohttp.ClientSession.request``
+        """
+        await self.rate_limiter.acquire(url)
+        session = await self._get_session()
+        async with transcript_service_pool:
+            async with session.request(method, url, **kwargs) as response:
+                if response.status == 429:
+                    self.rate_limiter.retry_after(url, response.headers.get('Retry-After'))
+                yield response
+
     def _get_random_user_agent(self) -> str:
         """Get a random user agent for request rotation."""
         user_agents = [
@@ -168,50 +356,49 @@ class YouTubeTranscriptExtractor:
         try:
             url = f'https://www.savesubs.com/api/subtitle/{video_id}'
 
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                headers = {
-                    'accept': 'application/json, text/plain, */*',
-                    'accept-language': 'en-US,en;q=0.9,es;q=0.8',
-                    'referer': 'https://www.savesubs.com/',
-                    'user-agent': self._get_random_user_agent(),
-                }
-
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-
-                        # Parse the response format
-                        if isinstance(data, dict) and 'result' in data:
-                            subtitle_tracks = data.get('result', [])
-
-                            # Look for English subtitles first
-                            for track in subtitle_tracks:
-                                if track.get('language', '').lower() in ['en', 'english', 'en-us']:
-                                    content = track.get('content', '')
-                                    if content:
-                                        # Clean up the content (remove timestamps, etc.)
-                                        import re
-                                        cleaned = re.sub(r'^\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}$', '', content, flags=re.MULTILINE)
-                                        cleaned = re.sub(r'^\d+$', '', cleaned, flags=re.MULTILINE)
-                                        cleaned = '\n'.join(line.strip() for line in cleaned.split('\n') if line.strip())
-                                        return cleaned
-
-                            # If no English, try first available
-                            if subtitle_tracks:
-                                content = subtitle_tracks[0].get('content', '')
+            timeout = aiohttp.ClientTimeout(total=10)
+
+            headers = {
+                'accept': 'application/json, text/plain, */*',
+                'accept-language': 'en-US,en;q=0.9,es;q=0.8',
+                'referer': 'https://www.savesubs.com/',
+                'user-agent': self._get_random_user_agent(),
+            }
+
+            async with self._request('GET', url, headers=headers, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+
+                    # Parse the response format
+                    if isinstance(data, dict) and 'result' in data:
+                        subtitle_tracks = data.get('result', [])
+
+                        # Look for English subtitles first
+                        for track in subtitle_tracks:
+                            if track.get('language', '').lower() in ['en', 'english', 'en-us']:
+                                content = track.get('content', '')
                                 if content:
-                                    import re
-                                    cleaned = re.sub(r'^\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}$', '', content, flags=re.MULTILINE)
-                                    cleaned = re.sub(r'^\d+$', '', cleaned, flags=re.MULTILINE)
-                                    cleaned = '\n'.join(line.strip() for line in cleaned.split('\n') if line.strip())
-                                    return cleaned
+                                    # Clean up the content (remove timestamps, indices, markup)
+                                    return normalize_caption_blob(content)
+
+                        # If no English, try first available
+                        if subtitle_tracks:
+                            content = subtitle_tracks[0].get('content', '')
+                            if content:
+                                return normalize_caption_blob(content)
 
+                if response.status != 200:
                     logging.warning(f"Savesubs returned status {response.status} for video {video_id}")
-                    return None
+                    raise ServiceUnavailableError(f"Savesubs returned status {response.status}")
 
+                logging.warning(f"Savesubs: No subtitles found for video {video_id}")
+                return None
+
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logging.warning(f"Savesubs extraction failed for video {video_id}: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"Savesubs: {str(e)}") from e
 
     async def _extract_with_youtube_transcript_io(self, video_id: str) -> Optional[str]:
         """
@@ -242,87 +429,84 @@ class YouTubeTranscriptExtractor:
             # Add referer header specific to the video being processed
             headers['referer'] = f'https://www.youtube-transcript.io/videos?id={video_id}'
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.youtube_transcript_io_config['url'],
-                    json=payload,
-                    headers=headers
-                ) as response:
+            async with self._request(
+                'POST',
+                self.youtube_transcript_io_config['url'],
+                json=payload,
+                headers=headers,
+                timeout=timeout,
+            ) as response:
 
-                    if response.status == 401:
-                        logging.warning("YouTube-Transcript.io: Authentication failed (401). Token may be expired.")
-                        return None
+                if response.status == 401:
+                    logging.warning("YouTube-Transcript.io: Authentication failed (401). Token may be expired.")
+                    raise ServiceUnavailableError(f"YouTube-Transcript.io returned status {response.status}")
 
-                    if response.status == 403:
-                        logging.warning("YouTube-Transcript.io: Access forbidden (403). May need valid x-is-human validation.")
-                        return None
+                if response.status == 403:
+                    logging.warning("YouTube-Transcript.io: Access forbidden (403). May need valid x-is-human validation.")
+                    raise ServiceUnavailableError(f"YouTube-Transcript.io returned status {response.status}")
 
-                    if response.status != 200:
-                        response_text = await response.text()
-                        logging.warning(f"YouTube-Transcript.io API returned status {response.status}: {response_text}")
-                        return None
-
-                    try:
-                        data = await response.json()
-                    except Exception as json_error:
-                        logging.error(f"Failed to parse YouTube-Transcript.io response as JSON: {json_error}")
-                        return None
-
-                    # Check if we have successful results
-                    success_results = data.get('success', [])
-                    if not success_results:
-                        failed_results = data.get('failed', [])
-                        if failed_results:
-                            logging.warning(f"YouTube-Transcript.io: Video processing failed: {failed_results}")
-                        else:
-                            logging.warning("YouTube-Transcript.io: No successful results and no failed results")
-                        return None
+                if response.status != 200:
+                    response_text = await response.text()
+                    logging.warning(f"YouTube-Transcript.io API returned status {response.status}: {response_text}")
+                    raise ServiceUnavailableError(f"YouTube-Transcript.io returned status {response.status}")
 
-                    # Get the first successful result
-                    result = success_results[0]
-                    tracks = result.get('tracks', [])
+                try:
+                    data = await response.json()
+                except Exception as json_error:
+                    logging.error(f"Failed to parse YouTube-Transcript.io response as JSON: {json_error}")
+                    raise ServiceUnavailableError(f"YouTube-Transcript.io returned invalid JSON: {json_error}")
+
+                # Check if we have successful results
+                success_results = data.get('success', [])
+                if not success_results:
+                    failed_results = data.get('failed', [])
+                    if failed_results:
+                        logging.warning(f"YouTube-Transcript.io: Video processing failed: {failed_results}")
+                    else:
+                        logging.warning("YouTube-Transcript.io: No successful results and no failed results")
+                    return None
 
-                    if not tracks:
-                        logging.warning("YouTube-Transcript.io: No transcript tracks found")
-                        return None
+                # Get the first successful result
+                result = success_results[0]
+                tracks = result.get('tracks', [])
 
-                    # Get the best available track (prefer first language available)
-                    track = tracks[0]
-                    transcript_segments = track.get('transcript', [])
+                if not tracks:
+                    logging.warning("YouTube-Transcript.io: No transcript tracks found")
+                    return None
 
-                    if not transcript_segments:
-                        logging.warning("YouTube-Transcript.io: No transcript segments found")
-                        return None
+                # Get the best available track (prefer first language available)
+                track = tracks[0]
+                transcript_segments = track.get('transcript', [])
 
-                    # Extract text from transcript segments with timing information
-                    text_segments = []
-                    for segment in transcript_segments:
-                        text = segment.get('text', '').strip()
-                        if text:
-                            text_segments.append(text)
+                if not transcript_segments:
+                    logging.warning("YouTube-Transcript.io: No transcript segments found")
+                    return None
 
-                    if text_segments:
-                        transcript = ' '.join(text_segments)
+                # Extract text from transcript segments with timing information
+                transcript = normalize_segments(transcript_segments)
 
-                        # Get additional metadata if available
-                        title = result.get('title', 'Unknown')
-                        microformat = result.get('microformat', {})
-                        duration = microformat.get('playerMicroformatRenderer', {}).get('lengthSeconds', 'Unknown')
+                if transcript:
+                    # Get additional metadata if available
+                    title = result.get('title', 'Unknown')
+                    microformat = result.get('microformat', {})
+                    duration = microformat.get('playerMicroformatRenderer', {}).get('lengthSeconds', 'Unknown')
 
-                        logging.info(f"YouTube-Transcript.io: Successfully extracted {len(transcript)} chars from '{title}' (duration: {duration}s)")
-                        logging.info(f"YouTube-Transcript.io: Track language: {track.get('language', 'unknown')}")
+                    logging.info(f"YouTube-Transcript.io: Successfully extracted {len(transcript)} chars from '{title}' (duration: {duration}s)")
+                    logging.info(f"YouTube-Transcript.io: Track language: {track.get('language', 'unknown')}")
 
-                        return transcript
+                    return transcript
 
-                    logging.warning("YouTube-Transcript.io: No valid text segments found")
-                    return None
+                logging.warning("YouTube-Transcript.io: No valid text segments found")
+                return None
 
+        except ServiceUnavailableError:
+            raise
         except asyncio.TimeoutError:
             logging.error("YouTube-Transcript.io: Request timed out")
-            return None
+            raise ServiceUnavailableError("YouTube-Transcript.io: request timed out")
         except Exception as e:
             logging.error(f"YouTube-Transcript.io extraction failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"YouTube-Transcript.io: {str(e)}") from e
 
     async def _extract_with_notegpt(self, video_id: str) -> Optional[str]:
         """
@@ -338,47 +522,50 @@ class YouTubeTranscriptExtractor:
 
             timeout = aiohttp.ClientTimeout(total=10)  # Reduced timeout for faster testing
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
-                    self.notegpt_config['url'],
-                    params=payload,
-                    headers=self.notegpt_config['headers']
-                ) as response:
+            async with self._request(
+                'GET',
+                self.notegpt_config['url'],
+                params=payload,
+                headers=self.notegpt_config['headers'],
+                timeout=timeout,
+            ) as response:
 
-                    if response.status != 200:
-                        logging.warning(f"NoteGPT API returned status {response.status}")
-                        return None
+                if response.status != 200:
+                    logging.warning(f"NoteGPT API returned status {response.status}")
+                    raise ServiceUnavailableError(f"NoteGPT returned status {response.status}")
 
-                    data = await response.json()
+                data = await response.json()
 
-                    if data.get('code') != 100000:
-                        logging.warning(f"NoteGPT API error: {data.get('message', 'Unknown error')}")
-                        return None
-
-                    # Extract transcript from response
-                    transcripts = data.get('data', {}).get('transcripts', {})
-
-                    # Try English first, then auto-generated, then any available
-                    for lang_code in ['en', 'en_auto']:
-                        if lang_code in transcripts:
-                            transcript_data = transcripts[lang_code]
-
-                            # Try custom format first (longer segments), then default
-                            for format_type in ['custom', 'default', 'auto']:
-                                if format_type in transcript_data:
-                                    segments = transcript_data[format_type]
-                                    if segments:
-                                        text = ' '.join([segment.get('text', '') for segment in segments])
-                                        if text and text.strip() != 'No text':
-                                            logging.info(f"NoteGPT: Successfully extracted {len(text)} chars using {lang_code}.{format_type}")
-                                            return text.strip()
-
-                    logging.warning("NoteGPT: No valid transcript data found")
+                if data.get('code') != 100000:
+                    logging.warning(f"NoteGPT API error: {data.get('message', 'Unknown error')}")
                     return None
 
+                # Extract transcript from response
+                transcripts = data.get('data', {}).get('transcripts', {})
+
+                # Try English first, then auto-generated, then any available
+                for lang_code in ['en', 'en_auto']:
+                    if lang_code in transcripts:
+                        transcript_data = transcripts[lang_code]
+
+                        # Try custom format first (longer segments), then default
+                        for format_type in ['custom', 'default', 'auto']:
+                            if format_type in transcript_data:
+                                segments = transcript_data[format_type]
+                                if segments:
+                                    text = normalize_segments(segments)
+                                    if text:
+                                        logging.info(f"NoteGPT: Successfully extracted {len(text)} chars using {lang_code}.{format_type}")
+                                        return text
+
+                logging.warning("NoteGPT: No valid transcript data found")
+                return None
+
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logging.error(f"NoteGPT extraction failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"NoteGPT: {str(e)}") from e
 
     async def _extract_with_tactiq(self, video_id: str) -> Optional[str]:
         """
@@ -394,97 +581,146 @@ class YouTubeTranscriptExtractor:
 
             timeout = aiohttp.ClientTimeout(total=10)  # Reduced timeout for faster testing
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.tactiq_config['url'],
-                    json=payload,
-                    headers=self.tactiq_config['headers']
-                ) as response:
+            async with self._request(
+                'POST',
+                self.tactiq_config['url'],
+                json=payload,
+                headers=self.tactiq_config['headers'],
+                timeout=timeout,
+            ) as response:
 
-                    if response.status != 200:
-                        logging.warning(f"Tactiq API returned status {response.status}")
-                        return None
+                if response.status != 200:
+                    logging.warning(f"Tactiq API returned status {response.status}")
+                    raise ServiceUnavailableError(f"Tactiq returned status {response.status}")
 
-                    data = await response.json()
+                data = await response.json()
 
-                    # Extract captions from response
-                    captions = data.get('captions', [])
-                    if not captions:
-                        logging.warning("Tactiq: No captions found in response")
-                        return None
-
-                    # Filter out "No text" entries and combine
-                    text_segments = []
-                    for caption in captions:
-                        text = caption.get('text', '').strip()
-                        if text and text != 'No text':
-                            text_segments.append(text)
-
-                    if text_segments:
-                        transcript = ' '.join(text_segments)
-                        logging.info(f"Tactiq: Successfully extracted {len(transcript)} chars")
-                        return transcript
-
-                    logging.warning("Tactiq: No valid text segments found")
+                # Extract captions from response
+                captions = data.get('captions', [])
+                if not captions:
+                    logging.warning("Tactiq: No captions found in response")
                     return None
 
+                # Filter out "No text" entries and combine
+                transcript = normalize_segments(captions)
+
+                if transcript:
+                    logging.info(f"Tactiq: Successfully extracted {len(transcript)} chars")
+                    return transcript
+
+                logging.warning("Tactiq: No valid text segments found")
+                return None
+
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
             logging.error(f"Tactiq extraction failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"Tactiq: {str(e)}") from e
 
     async def _extract_with_kome_ai(self, video_id: str) -> Optional[str]:
         """
         Extract transcript using Kome.ai service.
         This service provides clean transcript extraction with duration info.
+
+        Long transcripts are paginated (``<url>++<page>``). After the first page the
+        remaining ones are fetched concurrently, ``KOME_AI_PAGE_CONCURRENCY`` at a time,
+        and stitched back in order. When a page fails or the page cap is reached, the
+        pages obtained so far are returned with ``partial`` set on the transcript.
         """
         try:
-            youtube_url = f"https://youtu.be/{video_id}"
-            payload = {
-                'video_id': f"{youtube_url}++0",
-                'format': True
-            }
+            first_page, has_more = await self._fetch_kome_ai_page(video_id, 0)
+            if not first_page:
+                logging.warning("Kome.ai: No transcript found in response")
+                return None
 
-            timeout = aiohttp.ClientTimeout(total=15)  # Increased timeout for this service
+            pages = [first_page]
+            partial = False
+            while has_more:
+                if len(pages) >= KOME_AI_MAX_PAGES:
+                    logging.warning(f"Kome.ai: Stopping at the page limit ({KOME_AI_MAX_PAGES})")
+                    partial = True
+                    break
+
+                # The page count is unknown, so pages past the end of a window are discarded
+                window = range(len(pages), min(len(pages) + KOME_AI_PAGE_CONCURRENCY, KOME_AI_MAX_PAGES))
+                results = await asyncio.gather(
+                    *(self._fetch_kome_ai_page(video_id, page) for page in window),
+                    return_exceptions=True,
+                )
+                for page, result in zip(window, results):
+                    if isinstance(result, BaseException):
+                        logging.warning(f"Kome.ai: Page {page} failed: {result}")
+                        partial, has_more = True, False
+                        break
+                    text, has_more = result
+                    if not text:
+                        logging.warning(f"Kome.ai: Page {page} came back empty")
+                        partial, has_more = has_more, False
+                        break
+                    pages.append(text)
+                    if not has_more:
+                        break
+
+            transcript = normalize_text("\n".join(pages))
+            transcript.partial = partial
+
+            logging.info(
+                f"Kome.ai: Successfully extracted {len(transcript)} chars from {len(pages)} page(s)"
+                f"{' (partial)' if partial else ''}"
+            )
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.kome_ai_config['url'],
-                    json=payload,
-                    headers=self.kome_ai_config['headers']
-                ) as response:
+            return transcript
+
+        except ServiceUnavailableError:
+            raise
+        except asyncio.TimeoutError:
+            logging.error("Kome.ai: Request timed out")
+            raise ServiceUnavailableError("Kome.ai: request timed out")
+        except Exception as e:
+            logging.error(f"Kome.ai extraction failed: {str(e)}")
+            raise ServiceUnavailableError(f"Kome.ai: {str(e)}") from e
 
-                    if response.status != 200:
-                        response_text = await response.text()
-                        logging.warning(f"Kome.ai API returned status {response.status}: {response_text}")
-                        return None
+    async def _fetch_kome_ai_page(self, video_id: str, page: int) -> Tuple[str, bool]:
+        """
+        Fetch one page of a Kome.ai transcript.
 
-                    try:
-                        data = await response.json()
-                    except Exception as json_error:
-                        logging.error(f"Failed to parse Kome.ai response as JSON: {json_error}")
-                        return None
+        Args:
+            video_id: YouTube video ID
+            page: Page number (0 for the first page)
 
-                    # Extract transcript from response
-                    transcript = data.get('transcript', '').strip()
+        Returns:
+            Tuple of (raw page text, whether more pages follow)
+        """
+        payload = {
+            'video_id': f"https://youtu.be/{video_id}++{page}",
+            'format': True
+        }
 
-                    if not transcript:
-                        logging.warning("Kome.ai: No transcript found in response")
-                        return None
+        timeout = aiohttp.ClientTimeout(total=15)  # Increased timeout for this service
 
-                    # Get additional metadata if available
-                    length = data.get('length', 'Unknown')
-                    has_more = data.get('hasMore', False)
+        async with self._request(
+            'POST',
+            self.kome_ai_config['url'],
+            json=payload,
+            headers=self.kome_ai_config['headers'],
+            timeout=timeout,
+        ) as response:
 
-                    logging.info(f"Kome.ai: Successfully extracted {len(transcript)} chars (length: {length}, has_more: {has_more})")
+            if response.status != 200:
+                response_text = await response.text()
+                logging.warning(f"Kome.ai API returned status {response.status}: {response_text}")
+                raise ServiceUnavailableError(f"Kome.ai returned status {response.status}")
 
-                    return transcript
+            try:
+                data = await response.json()
+            except Exception as json_error:
+                logging.error(f"Failed to parse Kome.ai response as JSON: {json_error}")
+                raise ServiceUnavailableError(f"Kome.ai returned invalid JSON: {json_error}")
 
-        except asyncio.TimeoutError:
-            logging.error("Kome.ai: Request timed out")
-            return None
-        except Exception as e:
-            logging.error(f"Kome.ai extraction failed: {str(e)}")
-            return None
+            text = data.get('transcript') or ''
+            has_more = bool(data.get('hasMore', False))
+            logging.debug(f"Kome.ai: Page {page}: {len(text)} chars (length: {data.get('length', 'Unknown')}, has_more: {has_more})")
+            return text, has_more
 
     async def _extract_with_anthiago(self, video_id: str) -> Optional[str]:
         """
@@ -504,72 +740,62 @@ class YouTubeTranscriptExtractor:
 
             timeout = aiohttp.ClientTimeout(total=15)  # Increased timeout for this service
 
-            # Prepare cookies
-            cookies = aiohttp.CookieJar()
-            for name, value in self.anthiago_config['cookies'].items():
-                cookies.update_cookies({name: value})
+            async with self._request(
+                'GET',
+                self.anthiago_config['url'],
+                params=params,
+                headers=self.anthiago_config['headers'],
+                cookies=self.anthiago_config['cookies'],
+                timeout=timeout,
+            ) as response:
+
+                if response.status != 200:
+                    response_text = await response.text()
+                    logging.warning(f"Anthiago API returned status {response.status}: {response_text}")
+                    raise ServiceUnavailableError(f"Anthiago returned status {response.status}")
+
+                try:
+                    data = await response.json()
+                except Exception as json_error:
+                    logging.error(f"Failed to parse Anthiago response as JSON: {json_error}")
+                    raise ServiceUnavailableError(f"Anthiago returned invalid JSON: {json_error}")
 
-            async with aiohttp.ClientSession(timeout=timeout, cookie_jar=cookies) as session:
-                async with session.get(
-                    self.anthiago_config['url'],
-                    params=params,
-                    headers=self.anthiago_config['headers']
-                ) as response:
+                # Check API response status
+                if data.get('status') != 'ok':
+                    logging.warning(f"Anthiago API returned error status: {data.get('status')}")
+                    return None
 
-                    if response.status != 200:
-                        response_text = await response.text()
-                        logging.warning(f"Anthiago API returned status {response.status}: {response_text}")
-                        return None
+                # Extract subtitles from response
+                subtitles = data.get('subtitles', [])
 
-                    try:
-                        data = await response.json()
-                    except Exception as json_error:
-                        logging.error(f"Failed to parse Anthiago response as JSON: {json_error}")
-                        return None
-
-                    # Check API response status
-                    if data.get('status') != 'ok':
-                        logging.warning(f"Anthiago API returned error status: {data.get('status')}")
-                        return None
-
-                    # Extract subtitles from response
-                    subtitles = data.get('subtitles', [])
-
-                    if not subtitles:
-                        logging.warning("Anthiago: No subtitles found in response")
-                        return None
-
-                    # Process subtitles and combine text
-                    text_segments = []
-                    for subtitle in subtitles:
-                        text = subtitle.get('f', '').strip()
-                        if text:
-                            # Decode HTML entities like &gt; and &#39;
-                            import html
-                            text = html.unescape(text)
-                            text_segments.append(text)
-
-                    if text_segments:
-                        transcript = ' '.join(text_segments)
-
-                        # Get additional metadata if available
-                        title = data.get('title', 'Unknown')
-                        url_base = data.get('urlBase', '')
-                        premium = data.get('premium', False)
-
-                        logging.info(f"Anthiago: Successfully extracted {len(transcript)} chars from '{title}' (premium: {premium})")
-
-                        return transcript
-
-                    logging.warning("Anthiago: No valid text segments found")
+                if not subtitles:
+                    logging.warning("Anthiago: No subtitles found in response")
                     return None
 
+                # Combine subtitle text, decoding HTML entities like &gt; and &#39;
+                transcript = normalize_segments(subtitles, key='f')
+
+                if transcript:
+                    # Get additional metadata if available
+                    title = data.get('title', 'Unknown')
+                    url_base = data.get('urlBase', '')
+                    premium = data.get('premium', False)
+
+                    logging.info(f"Anthiago: Successfully extracted {len(transcript)} chars from '{title}' (premium: {premium})")
+
+                    return transcript
+
+                logging.warning("Anthiago: No valid text segments found")
+                return None
+
+        except ServiceUnavailableError:
+            raise
         except asyncio.TimeoutError:
             logging.error("Anthiago: Request timed out")
-            return None
+            raise ServiceUnavailableError("Anthiago: request timed out")
         except Exception as e:
             logging.error(f"Anthiago extraction failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"Anthiago: {str(e)}") from e
 
     async def _extract_with_yescribe(self, video_id: str) -> Optional[str]:
         """
@@ -587,75 +813,72 @@ class YouTubeTranscriptExtractor:
 
             timeout = aiohttp.ClientTimeout(total=20)  # Increased timeout for this service
 
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    self.yescribe_config['url'],
-                    json=payload,
-                    headers=self.yescribe_config['headers']
-                ) as response:
+            async with self._request(
+                'POST',
+                self.yescribe_config['url'],
+                json=payload,
+                headers=self.yescribe_config['headers'],
+                timeout=timeout,
+            ) as response:
 
-                    if response.status != 200:
-                        response_text = await response.text()
-                        logging.warning(f"YeScribe API returned status {response.status}: {response_text}")
-                        return None
+                if response.status != 200:
+                    response_text = await response.text()
+                    logging.warning(f"YeScribe API returned status {response.status}: {response_text}")
+                    raise ServiceUnavailableError(f"YeScribe returned status {response.status}")
 
-                    try:
-                        data = await response.json()
-                    except Exception as json_error:
-                        logging.error(f"Failed to parse YeScribe response as JSON: {json_error}")
-                        return None
-
-                    # Check API response code
-                    if data.get('code') != 200:
-                        msg = data.get('msg', 'Unknown error')
-                        logging.warning(f"YeScribe API returned error: {msg}")
-                        return None
-
-                    # Extract data from response
-                    response_data = data.get('data', {})
-
-                    if not response_data:
-                        logging.warning("YeScribe: No data found in response")
-                        return None
-
-                    # Extract transcript segments
-                    transcript_segments = response_data.get('tranScript', [])
-
-                    if not transcript_segments:
-                        logging.warning("YeScribe: No transcript segments found")
-                        return None
-
-                    # Process transcript segments and combine text
-                    text_segments = []
-                    for segment in transcript_segments:
-                        text = segment.get('text', '').strip()
-                        if text:
-                            text_segments.append(text)
-
-                    if text_segments:
-                        transcript = ' '.join(text_segments)
-
-                        # Get additional metadata
-                        title = response_data.get('title', 'Unknown')
-                        author = response_data.get('author', 'Unknown')
-                        length = response_data.get('length', 0)
-                        video_duration = response_data.get('videoDuration', '00:00')
-                        publish_date = response_data.get('publishDate', '')
-
-                        logging.info(f"YeScribe: Successfully extracted {len(transcript)} chars from '{title}' by {author} (duration: {video_duration})")
-                        logging.info(f"YeScribe: Video length: {length}s, published: {publish_date}")
-
-                        return transcript
-
-                    logging.warning("YeScribe: No valid text segments found")
+                try:
+                    data = await response.json()
+                except Exception as json_error:
+                    logging.error(f"Failed to parse YeScribe response as JSON: {json_error}")
+                    raise ServiceUnavailableError(f"YeScribe returned invalid JSON: {json_error}")
+
+                # Check API response code
+                if data.get('code') != 200:
+                    msg = data.get('msg', 'Unknown error')
+                    logging.warning(f"YeScribe API returned error: {msg}")
                     return None
 
+                # Extract data from response
+                response_data = data.get('data', {})
+
+                if not response_data:
+                    logging.warning("YeScribe: No data found in response")
+                    return None
+
+                # Extract transcript segments
+                transcript_segments = response_data.get('tranScript', [])
+
+                if not transcript_segments:
+                    logging.warning("YeScribe: No transcript segments found")
+                    return None
+
+                # Process transcript segments and combine text
+                transcript = normalize_segments(transcript_segments)
+
+                if transcript:
+                    # Get additional metadata
+                    title = response_data.get('title', 'Unknown')
+                    author = response_data.get('author', 'Unknown')
+                    length = response_data.get('length', 0)
+                    video_duration = response_data.get('videoDuration', '00:00')
+                    publish_date = response_data.get('publishDate', '')
+
+                    logging.info(f"YeScribe: Successfully extracted {len(transcript)} chars from '{title}' by {author} (duration: {video_duration})")
+                    logging.info(f"YeScribe: Video length: {length}s, published: {publish_date}")
+
+                    return transcript
+
+                logging.warning("YeScribe: No valid text segments found")
+                return None
+
+        except ServiceUnavailableError:
+            raise
         except asyncio.TimeoutError:
             logging.error("YeScribe: Request timed out")
-            return None
+            raise ServiceUnavailableError("YeScribe: request timed out")
         except Exception as e:
             logging.error(f"YeScribe extraction failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"YeScribe: {str(e)}") from e
 
     async def _extract_with_youtube_transcript_api_proxy(self, video_id: str) -> Optional[str]:
         """
@@ -663,82 +886,140 @@ class YouTubeTranscriptExtractor:
         Uses the current proxy setup as fallback.
         """
         try:
-            # Initialize with proxy configuration if available
-            proxy_config = None
-
-            if os.getenv("WEBSHARE_USERNAME") and os.getenv("WEBSHARE_PASSWORD"):
-                proxy_config = WebshareProxyConfig(
-                    proxy_username=os.getenv("WEBSHARE_USERNAME"),
-                    proxy_password=os.getenv("WEBSHARE_PASSWORD"),
-                    filter_ip_locations=["us", "ca", "gb", "de", "fr", "nl", "sg", "au"],
-                )
-            elif os.getenv("HTTP_PROXY") or os.getenv("HTTPS_PROXY"):
-                proxy_config = GenericProxyConfig(
-                    http_url=os.getenv("HTTP_PROXY", ""),
-                    https_url=os.getenv("HTTPS_PROXY", ""),
-                )
-
-            ytt_api = YouTubeTranscriptApi(proxy_config=proxy_config)
-
-            # Get available transcripts
-            transcript_list = ytt_api.list(video_id)
-
-            # Try to get English transcript first, fall back to first available
-            transcript = next(
-                (t for t in transcript_list if t.language_code in ["en", "en-US"]),
-                next(iter(transcript_list), None),
-            )
-
-            if not transcript:
+            text = await self._run_youtube_transcript_api(video_id, use_proxy=True)
+            if not text:
                 return None
 
-            # Fetch transcript
-            fetched_transcript = transcript.fetch()
-            text = " ".join([entry.text for entry in fetched_transcript])
-
             logging.info(f"YouTube Transcript API (proxy): Successfully extracted {len(text)} chars")
             return text
 
-        except (NoTranscriptFound, VideoUnavailable) as e:
+        except (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable) as e:
             logging.warning(f"YouTube Transcript API (proxy): {str(e)}")
-            return None
+            raise TranscriptUnavailableError(type(e).__name__) from e
         except Exception as e:
             logging.error(f"YouTube Transcript API (proxy) failed: {str(e)}")
-            return None
+            raise ServiceUnavailableError(f"YouTube Transcript API (proxy): {str(e)}") from e
 
     async def _extract_with_youtube_transcript_api_direct(self, video_id: str) -> Optional[str]:
         """
         Extract using YouTubeTranscriptApi without proxy as last resort.
         """
         try:
-            ytt_api = YouTubeTranscriptApi()
-
-            # Get available transcripts
-            transcript_list = ytt_api.list(video_id)
-
-            # Try to get English transcript first, fall back to first available
-            transcript = next(
-                (t for t in transcript_list if t.language_code in ["en", "en-US"]),
-                next(iter(transcript_list), None),
-            )
-
-            if not transcript:
+            text = await self._run_youtube_transcript_api(video_id, use_proxy=False)
+            if not text:
                 return None
 
-            # Fetch transcript
-            fetched_transcript = transcript.fetch()
-            text = " ".join([entry.text for entry in fetched_transcript])
-
             logging.info(f"YouTube Transcript API (direct): Successfully extracted {len(text)} chars")
             return text
 
-        except (NoTranscriptFound, VideoUnavailable) as e:
+        except (NoTranscriptFound, TranscriptsDisabled, VideoUnavailable) as e:
             logging.warning(f"YouTube Transcript API (direct): {str(e)}")
-            return None
+            raise TranscriptUnavailableError(type(e).__name__) from e
         except Exception as e:
             logging.error(f"YouTube Transcript API (direct) failed: {str(e)}")
+            raise ServiceUnavailableError(f"YouTube Transcript API (direct): {str(e)}") from e
+
+    async def _run_youtube_transcript_api(self, video_id: str, use_proxy: bool) -> Optional[str]:
+        """
+        Run the blocking youtube_transcript_api lookup on the thread pool.
+
+        Args:
+            video_id: YouTube video ID
+            use_proxy: Whether to use the configured proxy
+
+        Returns:
+            Transcript text or None if the video has no transcript
+        """
+        ytt_api = self._get_youtube_transcript_api(use_proxy)
+        await self.rate_limiter.acquire(self.YOUTUBE_HOST)
+
+        if not self._ytt_executor:
+            self._ytt_executor = ThreadPoolExecutor(
+                max_workers=YOUTUBE_API_THREADS, thread_name_prefix="youtube-transcript-api"
+            )
+        loop = asyncio.get_running_loop()
+        async with transcript_service_pool:
+            return await loop.run_in_executor(
+                self._ytt_executor, self._fetch_youtube_transcript, ytt_api, video_id
+            )
+
+    def _get_youtube_transcript_api(self, use_proxy: bool) -> YouTubeTranscriptApi:
+        """Get the shared YouTubeTranscriptApi client, with or without proxy."""
+        ytt_api = self._ytt_apis.get(use_proxy)
+        if ytt_api is None:
+            proxy_config = self._get_proxy_config() if use_proxy else None
+            ytt_api = self._ytt_apis[use_proxy] = YouTubeTranscriptApi(proxy_config=proxy_config)
+        return ytt_api
+
+    def _get_proxy_config(self):
+        """Build the proxy configuration from the environment, if any."""
+        if os.getenv("WEBSHARE_USERNAME") and os.getenv("WEBSHARE_PASSWORD"):
+            return WebshareProxyConfig(
+                proxy_username=os.getenv("WEBSHARE_USERNAME"),
+                proxy_password=os.getenv("WEBSHARE_PASSWORD"),
+                filter_ip_locations=["us", "ca", "gb", "de", "fr", "nl", "sg", "au"],
+            )
+        if os.getenv("HTTP_PROXY") or os.getenv("HTTPS_PROXY"):
+            return GenericProxyConfig(
+                http_url=os.getenv("HTTP_PROXY", ""),
+                https_url=os.getenv("HTTPS_PROXY", ""),
+            )
+        return None
+
+    def _fetch_youtube_transcript(self, ytt_api: YouTubeTranscriptApi, video_id: str) -> Optional[str]:
+        """
+        List the transcripts of a video and fetch the preferred one (runs in a worker thread).
+
+        The listing already tells which languages exist, so the preferred language is
+        fetched directly instead of probing languages one request at a time.
+        """
+        transcript_list = ytt_api.list(video_id)
+
+        # Try to get English transcript first, fall back to first available
+        try:
+            transcript = transcript_list.find_transcript(self.YOUTUBE_API_LANGUAGES)
+        except NoTranscriptFound:
+            transcript = next(iter(transcript_list), None)
+
+        if not transcript:
             return None
 
+        fetched_transcript = transcript.fetch()
+        return normalize_segments(fetched_transcript)
+
+    async def get_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+        """
+        Get the video IDs of a YouTube playlist from its public page.
+
+        Only the videos embedded in the first page load are available (about 100).
+
+        Args:
+            playlist_id: YouTube playlist ID
+            limit: Maximum number of video IDs to return
+
+        Returns:
+            Video IDs in playlist order, without duplicates
+        """
+        url = f"https://{self.YOUTUBE_HOST}/playlist?list={playlist_id}"
+        headers = {
+            'user-agent': self._get_random_user_agent(),
+            'accept-language': 'en-US,en;q=0.9',
+        }
+        try:
+            async with self._request('GET', url, headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as response:
+                if response.status != 200:
+                    raise ServiceUnavailableError(f"YouTube playlist page returned status {response.status}")
+                page = await response.text()
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logging.error(f"Failed to load playlist {playlist_id}: {str(e)}")
+            raise ServiceUnavailableError(f"YouTube playlist: {str(e)}") from e
+
+        video_ids = list(dict.fromkeys(self.PLAYLIST_VIDEO_REGEX.findall(page)))[:limit]
+        logging.info(f"Playlist {playlist_id}: {len(video_ids)} videos")
+        return video_ids
+
     async def extract_transcript(self, video_id: str) -> Optional[str]:
         """
         Extract transcript using all available strategies with fallback.
@@ -751,74 +1032,350 @@ class YouTubeTranscriptExtractor:
         """
         return await self.extract_transcript_with_status(video_id, None)
 
-    async def extract_transcript_with_status(self, video_id: str, status_callback=None) -> Optional[str]:
+    async def extract_transcript_with_status(
+        self,
+        video_id: str,
+        status_callback=None,
+        deadline: float = YOUTUBE_EXTRACTION_DEADLINE,
+        force_refresh: bool = False,
+    ) -> Optional[str]:
         """
-        Extract transcript using all available strategies with fallback and optional status updates.
+        Extract transcript racing the available strategies with optional status updates.
+
+        Cached transcripts are returned right away without running any strategy, and
+        concurrent requests for the same video share a single extraction (only the
+        first caller receives status updates). Otherwise strategies are ranked by expected time-to-success from the recorded
+        statistics and launched in that order. Up to ``max_concurrency`` of them run at the
+        same time: a new one is started whenever a running strategy fails, or when the
+        running ones have not finished after ``hedge_delay`` seconds. The first non-empty
+        transcript wins and the remaining strategies are cancelled. A partial transcript
+        (e.g. pages missing) does not end the race; it is returned, uncached, only if no
+        strategy produces a complete one.
+
+        The whole extraction is bounded by ``deadline``. Each strategy gets a timeout
+        derived from its recent p95 latency, capped by its share of the remaining budget.
+        When every strategy failed or the deadline expired, an "exhausted" status is
+        reported with the elapsed time. Videos known to have no transcript (YouTube said
+        so, or every strategy ran without finding one) are remembered for a short TTL;
+        repeated requests within it report an "unavailable" status without running any
+        strategy, unless ``force_refresh`` is set.
 
         Args:
             video_id: YouTube video ID
             status_callback: Optional callback function for status updates
                            Should accept (strategy_num, strategy_name, total_strategies, status, details)
+            deadline: Overall time budget in seconds
+            force_refresh: Ignore cached results (positive and negative) and extract again
 
         Returns:
             Extracted transcript text or None if all strategies fail
         """
-        logging.info(f"Starting transcript extraction for video {video_id}")
-
-        # Strategy names for better user feedback
-        strategy_names = {
-            '_extract_with_savesubs': 'SaveSubs',
-            '_extract_with_youtube_transcript_io': 'YouTube Transcript.io',
-            '_extract_with_notegpt': 'NoteGPT',
-            '_extract_with_tactiq': 'Tactiq',
-            '_extract_with_kome_ai': 'Kome.ai',
-            '_extract_with_anthiago': 'Anthiago',
-            '_extract_with_yescribe': 'YeScribe',
-            '_extract_with_youtube_transcript_api_proxy': 'YouTube API (Proxy)',
-            '_extract_with_youtube_transcript_api_direct': 'YouTube API (Direct)',
-        }
+        if force_refresh:
+            logging.info(f"Forced refresh requested for video {video_id}")
+            transcript_cache.clear_unavailable(video_id)
+        else:
+            cached = await transcript_cache.get(video_id, self.PREFERRED_LANGUAGE)
+            if cached:
+                return cached
+
+            unavailable_reason = transcript_cache.get_unavailable(video_id)
+            if unavailable_reason:
+                if status_callback:
+                    await status_callback(0, "", len(self.strategies), "unavailable", unavailable_reason)
+                return None
 
-        for i, strategy in enumerate(self.strategies, 1):
-            try:
-                strategy_name = strategy_names.get(strategy.__name__, strategy.__name__)
+        return await self._in_flight.do(
+            video_id, lambda: self._run_strategies(video_id, status_callback, deadline)
+        )
+
+    async def _run_strategies(
+        self, video_id: str, status_callback=None, deadline: float = YOUTUBE_EXTRACTION_DEADLINE
+    ) -> Optional[str]:
+        """Race the ranked strategies for a video within the deadline and cache the winning transcript."""
+        logging.info(
+            f"Starting transcript extraction for video {video_id} "
+            f"(concurrency: {self.max_concurrency}, hedge delay: {self.hedge_delay}s, deadline: {deadline:.0f}s)"
+        )
+
+        total_strategies = len(self.strategies)
+        pending = list(enumerate(await self._rank_strategies(), 1))
+        running: Dict[asyncio.Task, tuple] = {}
+        started_at = time.monotonic()
+        deadline_at = started_at + deadline
+        deadline_reached = False
+        # Evidence that the video itself has no transcript (for the negative cache)
+        unavailable_reason = None
+        strategies_skipped = 0
+        empty_answers = 0
+        # Longest partial transcript seen, returned only if no strategy gets a complete one
+        partial_result = None
+        partial_source = None
 
-                if status_callback:
-                    await status_callback(i, strategy_name, len(self.strategies), "trying")
+        try:
+            while pending or running:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    deadline_reached = True
+                    break
+
+                if pending and len(running) < self.max_concurrency:
+                    strategy_num, strategy = pending.pop(0)
+                    strategy_name = self._get_strategy_display_name(strategy)
+
+                    if not self.circuit_breakers[strategy.__name__].allow_request():
+                        logging.info(f"Skipping strategy {strategy_num}: {strategy_name} (circuit open)")
+                        strategies_skipped += 1
+                        continue
+
+                    timeout, budget_capped = self._get_strategy_timeout(
+                        strategy.__name__, remaining, len(pending) + 1
+                    )
+                    logging.info(
+                        f"Trying strategy {strategy_num}/{total_strategies}: {strategy_name} "
+                        f"(timeout: {timeout:.1f}s)"
+                    )
+                    task = asyncio.create_task(asyncio.wait_for(strategy(video_id), timeout))
+                    running[task] = (
+                        strategy_num, strategy_name, strategy.__name__, time.monotonic(), timeout, budget_capped
+                    )
 
-                logging.info(f"Trying strategy {i}/{len(self.strategies)}: {strategy_name}")
+                    if status_callback:
+                        await status_callback(
+                            strategy_num, strategy_name, total_strategies, "trying",
+                            self._describe_running(running)
+                        )
+
+                    # Without a hedge delay the first strategies are all started at once
+                    if self.hedge_delay <= 0:
+                        continue
+
+                # Hedge only while another strategy could still be launched; never wait past the deadline
+                can_hedge = bool(pending) and len(running) < self.max_concurrency
+                done, _ = await asyncio.wait(
+                    running.keys(),
+                    timeout=min(self.hedge_delay, remaining) if can_hedge else remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    if can_hedge:
+                        logging.info(f"No strategy finished within {self.hedge_delay}s, hedging with the next one")
+                    continue
 
-                # Add delay between attempts to avoid rate limiting
-                if i > 1:
-                    delay = random.uniform(0.5, 1.5)
-                    logging.info(f"Waiting {delay:.1f}s before next strategy...")
-                    await asyncio.sleep(delay)
+                for task in sorted(done, key=lambda t: running[t][0]):
+                    strategy_num, strategy_name, strategy_key, launched_at, timeout, budget_capped = running.pop(task)
+                    latency = time.monotonic() - launched_at
+                    breaker = self.circuit_breakers[strategy_key]
 
-                result = await strategy(video_id)
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        logging.error(f"Strategy {strategy_num} ({strategy_name}) timed out after {timeout:.1f}s")
+                        if budget_capped:
+                            # Cut short by the deadline budget, not by the service being slow
+                            breaker.release()
+                        else:
+                            breaker.record_failure()
+                            db.record_strategy_result(strategy_key, False, latency, STRATEGY_STATS_DECAY)
+                        if status_callback:
+                            await status_callback(
+                                strategy_num, strategy_name, total_strategies, "failed", f"Sin respuesta en {timeout:.0f} s"
+                            )
+                        continue
+                    except TranscriptUnavailableError as e:
+                        logging.warning(f"Strategy {strategy_num} ({strategy_name}): video has no transcript ({e})")
+                        # The service is healthy and the video is to blame, so neither the
+                        # breaker nor the ranking statistics count this against the strategy
+                        breaker.record_success()
+                        unavailable_reason = str(e)
+                        if status_callback:
+                            await status_callback(strategy_num, strategy_name, total_strategies, "failed", "Sin transcripción")
+                        continue
+                    except Exception as e:
+                        logging.error(f"Strategy {strategy_num} ({strategy_name}) failed: {str(e)}")
+                        breaker.record_failure()
+                        db.record_strategy_result(strategy_key, False, latency, STRATEGY_STATS_DECAY)
+                        if status_callback:
+                            await status_callback(
+                                strategy_num, strategy_name, total_strategies, "failed", f"Error: {str(e)[:50]}"
+                            )
+                        continue
+
+                    # The service answered, even if it had no transcript for this video
+                    breaker.record_success()
+                    self._latencies.setdefault(
+                        strategy_key, deque(maxlen=STRATEGY_LATENCY_SAMPLES)
+                    ).append(latency)
+                    success = bool(result and len(result.strip()) > 0)
+                    db.record_strategy_result(strategy_key, success, latency, STRATEGY_STATS_DECAY)
+
+                    if success and getattr(result, "partial", False):
+                        logging.warning(
+                            f"Strategy {strategy_num} ({strategy_name}) returned a partial transcript "
+                            f"({len(result)} chars), trying the remaining strategies"
+                        )
+                        if partial_result is None or len(result) > len(partial_result):
+                            partial_result = result
+                            partial_source = (strategy_num, strategy_name)
+                        if status_callback:
+                            await status_callback(
+                                strategy_num, strategy_name, total_strategies, "failed",
+                                f"Transcripción parcial ({len(result):,} caracteres)"
+                            )
+                        continue
+
+                    if success:
+                        if status_callback:
+                            details = f"{len(result):,} caracteres extraídos"
+                            await status_callback(strategy_num, strategy_name, total_strategies, "success", details)
+
+                        logging.info(f"Success with strategy {strategy_num}: {strategy_name}")
+                        await transcript_cache.put(video_id, self.PREFERRED_LANGUAGE, result)
+                        return result
+
+                    logging.warning(f"Strategy {strategy_num} ({strategy_name}) returned no content")
+                    empty_answers += 1
 
-                if result and len(result.strip()) > 0:
                     if status_callback:
-                        details = f"{len(result):,} caracteres extraídos"
-                        await status_callback(i, strategy_name, len(self.strategies), "success", details)
+                        await status_callback(strategy_num, strategy_name, total_strategies, "failed", "Sin contenido")
+
+        finally:
+            await self._cancel_strategies(running)
+
+        elapsed = time.monotonic() - started_at
+        if partial_result is not None:
+            # Better than nothing, but not cached so the next request tries for the full transcript
+            strategy_num, strategy_name = partial_source
+            logging.warning(
+                f"No complete transcript for video {video_id} in {elapsed:.1f}s, "
+                f"using partial result from strategy {strategy_num}: {strategy_name}"
+            )
+            if status_callback:
+                details = f"{len(partial_result):,} caracteres extraídos (transcripción parcial)"
+                await status_callback(strategy_num, strategy_name, total_strategies, "success", details)
+            return partial_result
+
+        if deadline_reached:
+            logging.error(f"Extraction deadline of {deadline:.0f}s reached for video {video_id}")
+        else:
+            logging.error(f"All extraction strategies failed for video {video_id} in {elapsed:.1f}s")
+
+        # A full run where services answered "no transcript" says something about the video;
+        # timeouts, skipped strategies or outages alone do not
+        if unavailable_reason is None and empty_answers and not deadline_reached and not strategies_skipped:
+            unavailable_reason = "AllStrategiesFailed"
+        if unavailable_reason:
+            transcript_cache.mark_unavailable(video_id, unavailable_reason)
+
+        if status_callback:
+            details = f"en {elapsed:.1f} s"
+            if deadline_reached:
+                details += " (límite de tiempo alcanzado)"
+            await status_callback(0, "", total_strategies, "exhausted", details)
+        return None
 
-                    logging.info(f"Success with strategy {i}: {strategy_name}")
-                    return result
+    async def _cancel_strategies(self, running: Dict[asyncio.Task, tuple]) -> None:
+        """Cancel strategies that lost the race and wait for them to unwind."""
+        if not running:
+            return
 
-                logging.warning(f"Strategy {i} ({strategy_name}) returned no content")
+        losers = [running[task][1] for task in running if not task.done()]
+        for task, (_, _, strategy_key, *_) in running.items():
+            task.cancel()
+            # Cancelled calls say nothing about the service health
+            self.circuit_breakers[strategy_key].release()
 
-                if status_callback:
-                    await status_callback(i, strategy_name, len(self.strategies), "failed", "Sin contenido")
+        # Gathering also retrieves exceptions of strategies that finished alongside the winner
+        await asyncio.gather(*running, return_exceptions=True)
+        if losers:
+            logging.info(f"Cancelled {len(losers)} pending strategies: {', '.join(losers)}")
 
-            except Exception as e:
-                logging.error(f"Strategy {i} ({strategy.__name__}) failed: {str(e)}")
+    def _get_strategy_timeout(self, strategy_key: str, remaining: float, strategies_left: int) -> tuple:
+        """
+        Compute the timeout of a strategy about to be launched.
 
-                if status_callback:
-                    strategy_name = strategy_names.get(strategy.__name__, strategy.__name__)
-                    await status_callback(i, strategy_name, len(self.strategies), "failed", f"Error: {str(e)[:50]}")
+        The base timeout is the strategy's recent p95 latency times a safety margin
+        (STRATEGY_TIMEOUT_MAX until enough samples exist). It is capped by the share
+        of the remaining deadline budget left for each wave of strategies.
 
-                continue
+        Args:
+            strategy_key: Method name of the strategy
+            remaining: Seconds left before the deadline
+            strategies_left: Strategies still to run, including this one
 
-        logging.error(f"All extraction strategies failed for video {video_id}")
-        return None
+        Returns:
+            Tuple of (timeout in seconds, whether the budget made it shorter than the base)
+        """
+        samples = self._latencies.get(strategy_key)
+        if samples and len(samples) >= self.MIN_LATENCY_SAMPLES:
+            ordered = sorted(samples)
+            p95 = ordered[math.ceil(0.95 * len(ordered)) - 1]
+            base = min(max(p95 * STRATEGY_TIMEOUT_P95_MARGIN, STRATEGY_TIMEOUT_MIN), STRATEGY_TIMEOUT_MAX)
+        else:
+            base = STRATEGY_TIMEOUT_MAX
+
+        # Strategies run in waves of max_concurrency, each wave gets an equal share
+        waves = strategies_left / min(self.max_concurrency, strategies_left)
+        budget = min(max(remaining / waves, STRATEGY_TIMEOUT_MIN), remaining)
+        return min(base, budget), budget < base
+
+    async def _rank_strategies(self) -> List:
+        """
+        Order strategies by expected time-to-success.
+
+        The expected cost of trying a strategy first is its average latency divided
+        by its success rate. Statistics that have not been refreshed lately drift back
+        towards a neutral prior, and with probability STRATEGY_EXPLORATION_RATE a random
+        strategy is promoted to the front so recovered services get noticed.
+        """
+        stats = await db.run(db.get_strategy_stats)
+        now = time.time()
+
+        def expected_time(item) -> tuple:
+            index, strategy = item
+            entry = stats.get(strategy.__name__)
+            if not entry or entry["success_rate"] is None:
+                return (self.PRIOR_LATENCY / self.PRIOR_SUCCESS_RATE, index)
+
+            weight = 0.5 ** ((now - entry["updated_at"]) / STRATEGY_STATS_HALF_LIFE)
+            success_rate = self.PRIOR_SUCCESS_RATE + weight * (entry["success_rate"] - self.PRIOR_SUCCESS_RATE)
+            latency = self.PRIOR_LATENCY + weight * (entry["avg_latency"] - self.PRIOR_LATENCY)
+            return (max(latency, self.MIN_LATENCY) / max(success_rate, self.MIN_SUCCESS_RATE), index)
+
+        ranked = [strategy for _, strategy in sorted(enumerate(self.strategies), key=expected_time)]
+
+        if len(ranked) > 1 and random.random() < STRATEGY_EXPLORATION_RATE:
+            explored = ranked.pop(random.randrange(1, len(ranked)))
+            ranked.insert(0, explored)
+            logging.info(f"Exploring strategy {self._get_strategy_display_name(explored)} first")
+
+        logging.info(
+            f"Strategy order: {', '.join(self._get_strategy_display_name(s) for s in ranked)}"
+        )
+        return ranked
+
+    def _get_strategy_display_name(self, strategy) -> str:
+        """Get the user-facing name of a strategy method."""
+        return self.STRATEGY_DISPLAY_NAMES.get(strategy.__name__, strategy.__name__)
+
+    def _describe_running(self, running: Dict[asyncio.Task, tuple]) -> str:
+        """Build the status detail listing the strategies currently in flight."""
+        names = [info[1] for info in sorted(running.values())]
+        if len(names) == 1:
+            return "Extrayendo transcripción..."
+        return f"En curso: {', '.join(names)}"
+
+    def get_circuit_breaker_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the circuit breaker state of every strategy.
+
+        Returns:
+            Dictionary mapping strategy display names to breaker state and counters
+        """
+        return {
+            breaker.name: breaker.get_stats()
+            for breaker in self.circuit_breakers.values()
+        }
 
     def get_strategy_methods(self) -> Dict[str, callable]:
         """
@@ -847,3 +1404,7 @@ class YouTubeTranscriptExtractor:
             List of strategy names
         """
         return list(self.get_strategy_methods().keys())
+
+
+# Create a global instance of YouTubeTranscriptExtractor
+youtube_transcript_extractor = YouTubeTranscriptExtractor()
@@ -0,0 +1,131 @@
+import logging
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker guarding calls to an external service.
+
+    The breaker opens after ``failure_threshold`` consecutive failures, or when
+    the error rate over the last ``window_size`` calls reaches
+    ``error_rate_threshold``. While open, calls are rejected instantly. After
+    ``cooldown`` seconds a single probe call is let through (half-open): a
+    success closes the breaker again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        error_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 10,
+        cooldown: float = 60.0,
+    ):
+        """
+        Args:
+            name: Service name used in logs and stats
+            failure_threshold: Consecutive failures that open the breaker
+            error_rate_threshold: Error rate over the window that opens the breaker
+            window_size: Number of recent calls considered for the error rate
+            min_calls: Minimum calls in the window before the error rate applies
+            cooldown: Seconds to stay open before letting a probe through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected_calls = 0
+        self._window = deque(maxlen=window_size)
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Check whether a call may go through, claiming the probe slot if half-open."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.rejected_calls += 1
+                return False
+            self._transition(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected_calls += 1
+                return False
+            self._probe_in_flight = True
+            logging.info(f"Circuit breaker {self.name}: letting a probe request through")
+
+        return True
+
+    def record_success(self) -> None:
+        """Record a call that reached a healthy service."""
+        self._window.append(True)
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a call that failed because of the service."""
+        self._window.append(False)
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN:
+            self._transition(self.OPEN)
+        elif self.state == self.CLOSED and self._should_trip():
+            self._transition(self.OPEN)
+
+    def release(self) -> None:
+        """Forget a call that ended without an outcome (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the current state and counters of the breaker."""
+        calls = len(self._window)
+        errors = calls - sum(self._window)
+        stats = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "error_rate": errors / calls if calls else 0.0,
+            "recent_calls": calls,
+            "rejected_calls": self.rejected_calls,
+        }
+        if self.state == self.OPEN:
+            stats["retry_in"] = max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+        return stats
+
+    def _should_trip(self) -> bool:
+        """Check the consecutive-failure and error-rate thresholds."""
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return False
+        return (calls - sum(self._window)) / calls >= self.error_rate_threshold
+
+    def _transition(self, state: str) -> None:
+        """Move to a new state and log the change."""
+        previous, self.state = self.state, state
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            logging.warning(
+                f"Circuit breaker {self.name}: {previous} -> open "
+                f"({self.consecutive_failures} consecutive failures), "
+                f"skipping for {self.cooldown:.0f}s"
+            )
+        elif state == self.CLOSED:
+            self._window.clear()
+            logging.info(f"Circuit breaker {self.name}: {previous} -> closed")
+        else:
+            logging.info(f"Circuit breaker {self.name}: {previous} -> {state}")
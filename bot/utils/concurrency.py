@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List
+from config.constants import (
+    FFMPEG_CONCURRENCY,
+    TELEGRAM_DOWNLOAD_CONCURRENCY,
+    OPENAI_CONCURRENCY,
+    TRANSCRIPT_SERVICE_CONCURRENCY,
+    POOL_STATS_INTERVAL,
+)
+
+
+class StagePool:
+    """
+    Concurrency limit for one stage of the pipeline (ffmpeg, downloads, API calls).
+
+    Use as ``async with pool:`` around the work. Besides bounding how many run at
+    once, the pool records how busy it is: slots in use, callers waiting, and the
+    share of its capacity used since the last report.
+    """
+
+    def __init__(self, name: str, limit: int):
+        """
+        Args:
+            name: Stage name used in stats and log messages
+            limit: Maximum number of concurrent holders
+        """
+        self.name = name
+        self.limit = max(1, limit)
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.peak = 0
+        self.completed = 0
+        # Since the last reset: holder-seconds of work and seconds spent waiting for a slot
+        self._busy_time = 0.0
+        self._wait_time = 0.0
+        self._acquired = 0
+        self._period_start = time.monotonic()
+        self._active_since: Dict[int, float] = {}
+
+    async def __aenter__(self) -> "StagePool":
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        now = time.monotonic()
+        self._wait_time += now - queued_at
+        self._acquired += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self._active_since[id(asyncio.current_task())] = now
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        started = self._active_since.pop(id(asyncio.current_task()), None)
+        if started is not None:
+            self._busy_time += time.monotonic() - max(started, self._period_start)
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    def get_stats(self, reset: bool = False) -> Dict[str, Any]:
+        """
+        Get the utilisation of the pool.
+
+        Args:
+            reset: Start a new measurement period after reading
+
+        Returns:
+            Dict with limit, active, waiting, peak, completed, utilisation (0-1 share of
+            the capacity used during the period) and average wait for a slot in seconds
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._period_start, 1e-9)
+        # Work still running counts up to now
+        running = sum(now - max(started, self._period_start) for started in self._active_since.values())
+        stats = {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "peak": self.peak,
+            "completed": self.completed,
+            "utilisation": min((self._busy_time + running) / (self.limit * elapsed), 1.0),
+            "avg_wait": self._wait_time / self._acquired if self._acquired else 0.0,
+        }
+        if reset:
+            self._busy_time = 0.0
+            self._wait_time = 0.0
+            self._acquired = 0
+            self.peak = self.active
+            self._period_start = now
+        return stats
+
+
+def get_pool_stats(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Get the utilisation of every stage pool, keyed by stage name."""
+    return {pool.name: pool.get_stats(reset) for pool in STAGE_POOLS}
+
+
+def log_pool_stats(reset: bool = False) -> None:
+    """Log one line with the utilisation of every stage pool."""
+    summary = ", ".join(
+        f"{name} {stats['utilisation']:.0%} ({stats['active']}/{stats['limit']} active, "
+        f"{stats['waiting']} waiting, peak {stats['peak']}, avg wait {stats['avg_wait']:.1f}s)"
+        for name, stats in get_pool_stats(reset).items()
+    )
+    logging.info(f"Stage pools: {summary}")
+
+
+async def report_pool_stats(interval: float = POOL_STATS_INTERVAL) -> None:
+    """Log the stage pool utilisation every ``interval`` seconds (run as a background task)."""
+    while True:
+        await asyncio.sleep(interval)
+        if any(pool._acquired or pool.active for pool in STAGE_POOLS):
+            log_pool_stats(reset=True)
+
+
+# Create the global stage pools: ffmpeg is CPU-bound, the others wait on the network
+ffmpeg_pool = StagePool("ffmpeg", FFMPEG_CONCURRENCY or os.cpu_count() or 1)
+download_pool = StagePool("telegram_download", TELEGRAM_DOWNLOAD_CONCURRENCY)
+openai_pool = StagePool("openai", OPENAI_CONCURRENCY)
+transcript_service_pool = StagePool("transcript_services", TRANSCRIPT_SERVICE_CONCURRENCY)
+
+STAGE_POOLS: List[StagePool] = [ffmpeg_pool, download_pool, openai_pool, transcript_service_pool]
@@ -1,12 +1,38 @@
+import asyncio
+import functools
+import os
 import sqlite3
 import logging
-from typing import Set
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from config.constants import DB_BUSY_TIMEOUT, DB_CACHE_SIZE, DB_WRITE_BATCH_INTERVAL, DB_WRITE_BATCH_SIZE
+
+
+def _on_db_thread(method):
+    """Run a Database method on the database thread, waiting for its result."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._pid == os.getpid() and threading.get_ident() == self._thread_id:
+            return method(self, *args, **kwargs)
+        return self._submit(method, self, *args, **kwargs).result()
+
+    return wrapper
 
 
 class Database:
     """
     Database handler for bot settings and user management.
     Implements SQLite storage for persistent data.
+
+    All queries run on one dedicated thread over a single long-lived connection
+    in WAL mode, so readers never wait for writers and commits do not fsync.
+    Methods can be called from any thread, waiting for their result; async code
+    awaits them with ``run`` so the event loop is not blocked. Frequent writes
+    whose result nobody waits for (strategy statistics, cache access times) are
+    batched and committed together.
     """
 
     def __init__(self, db_path: str = "bot_data.db"):
@@ -18,57 +44,181 @@ class Database:
         """
         self.db_path = db_path
         logging.info(f"Initializing database at {db_path}")
+        self._start()
         self._init_db()
 
-    def _init_db(self):
-        """Initialize database tables and default settings."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
+    def _start(self):
+        """Start the database thread (again in a forked process, where the parent's is gone)."""
+        self._pid = os.getpid()
+        self._thread_id = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="database", initializer=self._register_thread
+        )
+        self._pending: List[Tuple[str, tuple]] = []
+        # (day, user_id) -> [jobs, audio_seconds, characters, openai_tokens] not yet written
+        self._usage: Dict[Tuple[str, str], List[float]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
 
-                # Create tables
-                logging.info("Creating database tables if they don't exist")
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS settings (
-                        key TEXT PRIMARY KEY,
-                        value INTEGER
-                    )
-                """
-                )
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS users (
-                        user_id TEXT PRIMARY KEY,
-                        authorized INTEGER DEFAULT 0
-                    )
-                """
-                )
+    def _register_thread(self):
+        self._thread_id = threading.get_ident()
 
-                # Insert default settings
-                default_settings = [
-                    ("auto_transcription_enabled", 1),
-                    ("enhanced_transcription_enabled", 0),
-                    ("output_text_file_enabled", 0),
-                    ("auto_summarize_enabled", 0),
-                    ("transcription_speed", 1),
-                ]
+    def _submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue a call on the database thread."""
+        if self._pid != os.getpid():
+            self._start()
+        return self._executor.submit(func, *args, **kwargs)
 
-                logging.info("Inserting default settings")
-                cursor.executemany(
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """The connection of the database thread, opened on first use."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT)
+            # WAL lets readers (other processes included) run alongside the writer, and
+            # NORMAL synchronous mode only syncs at checkpoints instead of every commit
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE}")
+            self._conn = conn
+        return self._conn
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a database method, or a function calling several, without blocking the event loop.
+
+        Example: ``await db.run(db.is_user_authorized, user_id)``
+
+        Args:
+            func: Callable to run on the database thread
+            args: Positional arguments for func
+            kwargs: Keyword arguments for func
+
+        Returns:
+            The result of func
+        """
+        return await asyncio.wrap_future(self._submit(func, *args, **kwargs))
+
+    def _defer(self, sql: str, params: tuple):
+        """
+        Queue a write to be committed with others in one transaction.
+
+        Pending writes are committed after ``DB_WRITE_BATCH_INTERVAL`` seconds, or
+        right away once ``DB_WRITE_BATCH_SIZE`` are queued. Callers do not wait.
+        """
+        with self._pending_lock:
+            self._pending.append((sql, params))
+            pending = len(self._pending)
+        self._schedule_flush(pending)
+
+    def _schedule_flush(self, pending: int):
+        """Commit the queued writes soon, or now if ``pending`` reached the batch size."""
+        with self._pending_lock:
+            flush_now = pending >= DB_WRITE_BATCH_SIZE
+            schedule = not self._flush_scheduled and not flush_now
+            self._flush_scheduled = self._flush_scheduled or schedule
+        if flush_now:
+            self._submit(self._flush_pending)
+        elif schedule:
+            timer = threading.Timer(DB_WRITE_BATCH_INTERVAL, self._submit, (self._flush_pending,))
+            timer.daemon = True
+            timer.start()
+
+    def _flush_pending(self):
+        """Commit the queued writes and usage counters (on the database thread)."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+            usage, self._usage = self._usage, {}
+            self._flush_scheduled = False
+        if not pending and not usage:
+            return
+        try:
+            with self._connection as conn:
+                for sql, params in pending:
+                    conn.execute(sql, params)
+                # One upsert per user and day, however many events were counted
+                conn.executemany(
                     """
-                    INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
+                    INSERT INTO usage_counters (day, user_id, jobs, audio_seconds, characters, openai_tokens)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(day, user_id) DO UPDATE SET
+                        jobs = jobs + excluded.jobs,
+                        audio_seconds = audio_seconds + excluded.audio_seconds,
+                        characters = characters + excluded.characters,
+                        openai_tokens = openai_tokens + excluded.openai_tokens
                 """,
-                    default_settings,
+                    [(day, user_id, *counters) for (day, user_id), counters in usage.items()],
                 )
+            logging.debug(f"Committed {len(pending)} batched writes and {len(usage)} usage counters")
+        except Exception as e:
+            logging.error(f"Error committing {len(pending)} batched writes: {e}")
 
-                conn.commit()
-                logging.info("Database initialized successfully")
+    @_on_db_thread
+    def flush(self):
+        """Commit the queued writes now."""
+        self._flush_pending()
+
+    @_on_db_thread
+    def close(self):
+        """Commit the queued writes and close the connection (reopened if used again)."""
+        self._flush_pending()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            logging.info(f"Closed database {self.db_path}")
+
+    @_on_db_thread
+    def _init_db(self):
+        """Bring the schema up to date by applying the pending migrations in order."""
+        try:
+            with self._connection as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at REAL
+                    )
+                """
+                )
+            current = self._schema_version()
+            for version, description, migrate in MIGRATIONS:
+                if version > current:
+                    self._apply_migration(version, description, migrate)
+            logging.info(f"Database initialized successfully (schema version {self._schema_version()})")
 
         except Exception as e:
             logging.error(f"Database initialization failed: {str(e)}", exc_info=True)
             raise
 
+    def _schema_version(self) -> int:
+        """Version of the last applied migration (0 for a new database)."""
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+    def _apply_migration(self, version: int, description: str, migrate: Callable):
+        """Apply one migration and record it, atomically."""
+        cursor = self._connection.cursor()
+        # The write lock makes processes starting together apply each migration once
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if self._schema_version() >= version:
+                cursor.execute("COMMIT")
+                return
+            migrate(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, time.time()),
+            )
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        logging.info(f"Applied database migration {version}: {description}")
+
+    @_on_db_thread
     def get_setting(self, key: str) -> bool:
         """
         Get boolean setting value from database.
@@ -80,17 +230,18 @@ class Database:
             bool: Setting value
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
                 result = cursor.fetchone()
                 value = bool(result[0]) if result else False
-                logging.info(f"Retrieved setting {key}={value}")
+                logging.debug(f"Retrieved setting {key}={value}")
                 return value
         except Exception as e:
             logging.error(f"Error getting setting {key}: {str(e)}")
             return False
 
+    @_on_db_thread
     def get_int_setting(self, key: str) -> int:
         """
         Get integer setting value from database.
@@ -102,17 +253,92 @@ class Database:
             int: Setting value
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
                 result = cursor.fetchone()
                 value = int(result[0]) if result else 1
-                logging.info(f"Retrieved int setting {key}={value}")
+                logging.debug(f"Retrieved int setting {key}={value}")
                 return value
         except Exception as e:
             logging.error(f"Error getting int setting {key}: {str(e)}")
             return 1
 
+    @_on_db_thread
+    def get_all_settings(self) -> Dict[str, int]:
+        """
+        Get every setting in a single query.
+
+        Returns:
+            Dict mapping each setting key to its stored value (empty on error)
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT key, value FROM settings")
+                settings = {key: int(value) for key, value in cursor.fetchall()}
+                logging.debug(f"Retrieved {len(settings)} settings")
+                return settings
+        except Exception as e:
+            logging.error(f"Error getting settings: {str(e)}")
+            return {}
+
+    @_on_db_thread
+    def get_chat_settings(self, chat_id: int) -> Dict[str, int]:
+        """
+        Get every setting of a chat in a single query: the global values with the chat's overrides.
+
+        Args:
+            chat_id: Telegram chat ID
+
+        Returns:
+            Dict mapping each setting key to its value for the chat (empty on error)
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT settings.key, COALESCE(chat_settings.value, settings.value)
+                    FROM settings
+                    LEFT JOIN chat_settings
+                        ON chat_settings.key = settings.key AND chat_settings.chat_id = ?
+                """,
+                    (chat_id,),
+                )
+                settings = {key: int(value) for key, value in cursor.fetchall()}
+                logging.debug(f"Retrieved {len(settings)} settings for chat {chat_id}")
+                return settings
+        except Exception as e:
+            logging.error(f"Error getting settings of chat {chat_id}: {str(e)}")
+            return {}
+
+    @_on_db_thread
+    def set_chat_setting(self, chat_id: int, key: str, value: int):
+        """
+        Override a setting for one chat.
+
+        Args:
+            chat_id: Telegram chat ID
+            key: Setting key to override
+            value: New value (booleans are stored as 0 or 1)
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO chat_settings (chat_id, key, value) VALUES (?, ?, ?)
+                """,
+                    (chat_id, key, int(value)),
+                )
+                conn.commit()
+                logging.info(f"Updated setting {key}={value} for chat {chat_id}")
+        except Exception as e:
+            logging.error(f"Error setting {key}={value} for chat {chat_id}: {str(e)}")
+            raise
+
+    @_on_db_thread
     def set_setting(self, key: str, value: bool):
         """
         Set boolean setting value in database.
@@ -122,7 +348,7 @@ class Database:
             value: New boolean value
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
@@ -136,6 +362,7 @@ class Database:
             logging.error(f"Error setting {key}={value}: {str(e)}")
             raise
 
+    @_on_db_thread
     def set_int_setting(self, key: str, value: int):
         """
         Set integer setting value in database.
@@ -145,7 +372,7 @@ class Database:
             value: New integer value
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
@@ -159,6 +386,7 @@ class Database:
             logging.error(f"Error setting int {key}={value}: {str(e)}")
             raise
 
+    @_on_db_thread
     def toggle_setting(self, key: str) -> bool:
         """Toggle a boolean setting and return its new value."""
         try:
@@ -170,10 +398,11 @@ class Database:
             logging.error(f"Error toggling setting {key}: {e}")
             return False
 
+    @_on_db_thread
     def get_authorized_users(self) -> Set[str]:
         """Get the set of authorized user IDs."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT user_id FROM users WHERE authorized = 1")
                 return {row[0] for row in cursor.fetchall()}
@@ -181,25 +410,83 @@ class Database:
             logging.error(f"Error getting authorized users: {e}")
             return set()
 
+    @_on_db_thread
+    def get_users(self) -> Dict[str, bool]:
+        """Get every known user ID and whether it is authorized, in a single query."""
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT user_id, authorized FROM users")
+                return {row[0]: row[1] == 1 for row in cursor.fetchall()}
+        except Exception as e:
+            logging.error(f"Error getting users: {e}")
+            return {}
+
+    @_on_db_thread
     def add_authorized_user(self, user_id: str):
         """Add a user ID to the authorized users list."""
+        self.add_authorized_users([user_id])
+
+    @_on_db_thread
+    def add_authorized_users(self, user_ids: List[str]):
+        """
+        Authorize user IDs in a single transaction.
+
+        Users who registered before being authorized are authorized as well.
+
+        Args:
+            user_ids: User IDs to authorize
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO users (user_id, authorized) VALUES (?, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET authorized = 1
+                """,
+                    [(user_id,) for user_id in user_ids],
+                )
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Error adding authorized users {', '.join(user_ids)}: {e}")
+
+    @_on_db_thread
+    def register_user(self, user_id: str) -> Optional[bool]:
+        """
+        Register a user if new, and tell whether they are authorized, in one statement.
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Whether the user is authorized, or None if the database could not be read
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                # The no-op update makes RETURNING answer for existing users too
                 cursor.execute(
                     """
-                    INSERT OR IGNORE INTO users (user_id, authorized) VALUES (?, 1)
+                    INSERT INTO users (user_id) VALUES (?)
+                    ON CONFLICT(user_id) DO UPDATE SET authorized = authorized
+                    RETURNING authorized
                 """,
                     (user_id,),
                 )
+                # Fetch every row so the statement completes before the commit
+                (authorized,) = cursor.fetchall()[0]
                 conn.commit()
+                return authorized == 1
         except Exception as e:
-            logging.error(f"Error adding authorized user {user_id}: {e}")
+            logging.error(f"Error registering user {user_id}: {e}")
+            return None
 
+    @_on_db_thread
     def add_user(self, user_id: str):
         """Add a user ID to the users list."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     """
@@ -211,10 +498,11 @@ class Database:
         except Exception as e:
             logging.error(f"Error adding user {user_id}: {e}")
 
+    @_on_db_thread
     def is_user_registered(self, user_id: str) -> bool:
         """Check if a user is registered."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,))
                 return cursor.fetchone() is not None
@@ -222,10 +510,11 @@ class Database:
             logging.error(f"Error checking if user {user_id} is registered: {e}")
             return False
 
+    @_on_db_thread
     def is_user_authorized(self, user_id: str) -> bool:
         """Check if a user is authorized."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     "SELECT authorized FROM users WHERE user_id = ?", (user_id,)
@@ -236,6 +525,774 @@ class Database:
             logging.error(f"Error checking if user {user_id} is authorized: {e}")
             return False
 
+    def record_strategy_result(
+        self, strategy: str, success: bool, latency: float, decay: float
+    ):
+        """
+        Record the outcome of a transcript strategy call.
+
+        Success rate and latency are kept as exponentially weighted moving
+        averages so recent behaviour outweighs old history.
+
+        Args:
+            strategy: Strategy identifier
+            success: Whether the strategy returned a transcript
+            latency: Duration of the call in seconds
+            decay: Weight of the new sample in the moving averages (0-1)
+
+        The result is committed in the background with the next batch of writes.
+        """
+        # Called for every strategy attempt, so the write is batched with others
+        self._defer(
+            """
+            INSERT INTO strategy_stats
+                (strategy, attempts, successes, success_rate, avg_latency, updated_at)
+            VALUES (?, 1, ?, ?, ?, ?)
+            ON CONFLICT(strategy) DO UPDATE SET
+                attempts = attempts + 1,
+                successes = successes + excluded.successes,
+                success_rate = success_rate + ? * (excluded.success_rate - success_rate),
+                avg_latency = avg_latency + ? * (excluded.avg_latency - avg_latency),
+                updated_at = excluded.updated_at
+        """,
+            (strategy, int(success), float(success), latency, time.time(), decay, decay),
+        )
+        logging.debug(
+            f"Recorded strategy result {strategy}: success={success}, latency={latency:.2f}s"
+        )
+
+    @_on_db_thread
+    def get_strategy_stats(self) -> Dict[str, Dict[str, float]]:
+        """Get the recorded statistics of every transcript strategy."""
+        self._flush_pending()
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT strategy, attempts, successes, success_rate, avg_latency, updated_at
+                    FROM strategy_stats
+                """
+                )
+                return {
+                    row[0]: {
+                        "attempts": row[1],
+                        "successes": row[2],
+                        "success_rate": row[3],
+                        "avg_latency": row[4],
+                        "updated_at": row[5],
+                    }
+                    for row in cursor.fetchall()
+                }
+        except Exception as e:
+            logging.error(f"Error getting strategy stats: {e}")
+            return {}
+
+    @_on_db_thread
+    def get_cached_transcript(
+        self, video_id: str, language: str, min_created_at: float
+    ) -> Optional[Tuple[bytes, float]]:
+        """
+        Get a cached transcript payload and mark it as recently used.
+
+        Args:
+            video_id: YouTube video ID
+            language: Transcript language
+            min_created_at: Entries created before this timestamp are expired
+
+        Returns:
+            Tuple of (compressed payload, created_at) or None if not cached
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT payload, created_at FROM transcript_cache
+                    WHERE video_id = ? AND language = ? AND created_at >= ?
+                """,
+                    (video_id, language, min_created_at),
+                )
+                result = cursor.fetchone()
+            if result:
+                # Reads should not wait for a commit; the access time is batched
+                self._defer(
+                    """
+                    UPDATE transcript_cache SET last_access = ?
+                    WHERE video_id = ? AND language = ?
+                """,
+                    (time.time(), video_id, language),
+                )
+            return result
+        except Exception as e:
+            logging.error(f"Error reading cached transcript {video_id}/{language}: {e}")
+            return None
+
+    @_on_db_thread
+    def put_cached_transcript(self, video_id: str, language: str, payload: bytes):
+        """
+        Store a transcript payload.
+
+        Args:
+            video_id: YouTube video ID
+            language: Transcript language
+            payload: Compressed transcript
+        """
+        try:
+            now = time.time()
+            with self._connection as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO transcript_cache
+                        (video_id, language, payload, size, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    (video_id, language, payload, len(payload), now, now),
+                )
+        except Exception as e:
+            logging.error(f"Error caching transcript {video_id}/{language}: {e}")
+
+    @_on_db_thread
+    def prune_transcript_cache(self, max_total_size: int, min_created_at: float):
+        """
+        Remove expired cached transcripts, then evict entries beyond the size budget.
+
+        The least recently used entries are evicted first, until the total payload
+        size fits in max_total_size.
+
+        Args:
+            max_total_size: Byte budget for all cached payloads
+            min_created_at: Entries created before this timestamp are expired
+        """
+        # Eviction is by access time, so apply the batched access times first
+        self._flush_pending()
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM transcript_cache WHERE created_at < ?",
+                    (min_created_at,),
+                )
+                expired = cursor.rowcount
+                cursor.execute(
+                    """
+                    DELETE FROM transcript_cache WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, SUM(size) OVER (
+                                ORDER BY last_access DESC, rowid DESC
+                            ) AS running_size
+                            FROM transcript_cache
+                        )
+                        WHERE running_size > ?
+                    )
+                """,
+                    (max_total_size,),
+                )
+                evicted = cursor.rowcount
+            if expired or evicted:
+                logging.info(f"Pruned cached transcripts: {expired} expired, {evicted} over the size budget")
+        except Exception as e:
+            logging.error(f"Error pruning the transcript cache: {e}")
+
+    def add_usage(
+        self, user_id: str, jobs: int = 0, audio_seconds: float = 0.0, characters: int = 0, openai_tokens: int = 0
+    ):
+        """
+        Add to the usage counters of a user for the current day (UTC).
+
+        Counts are summed in memory and written in batches with the other
+        background writes, one row update per user and day. Callers do not wait.
+
+        Args:
+            user_id: User the usage belongs to
+            jobs: Finished jobs
+            audio_seconds: Seconds of audio transcribed
+            characters: Characters of transcript produced
+            openai_tokens: Tokens used by OpenAI chat completions
+        """
+        key = (time.strftime("%Y-%m-%d", time.gmtime()), str(user_id))
+        with self._pending_lock:
+            counters = self._usage.setdefault(key, [0, 0.0, 0, 0])
+            for index, amount in enumerate((jobs, audio_seconds, characters, openai_tokens)):
+                counters[index] += amount
+            pending = len(self._pending) + len(self._usage)
+        self._schedule_flush(pending)
+
+    @_on_db_thread
+    def get_usage(self, min_day: str, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Get the usage counters per user since a day, summed over the days.
+
+        Args:
+            min_day: First day included (YYYY-MM-DD, UTC)
+            user_id: Only this user (default: every user)
+
+        Returns:
+            Dict mapping each user ID to its jobs, audio_seconds, characters and openai_tokens
+        """
+        self._flush_pending()
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT user_id, SUM(jobs), SUM(audio_seconds), SUM(characters), SUM(openai_tokens)
+                    FROM usage_counters
+                    WHERE day >= ? AND (? IS NULL OR user_id = ?)
+                    GROUP BY user_id
+                """,
+                    (min_day, user_id, user_id),
+                )
+                return {
+                    row[0]: {
+                        "jobs": row[1],
+                        "audio_seconds": row[2],
+                        "characters": row[3],
+                        "openai_tokens": row[4],
+                    }
+                    for row in cursor.fetchall()
+                }
+        except Exception as e:
+            logging.error(f"Error getting usage counters: {e}")
+            return {}
+
+    def add_job_history(self, entry: Dict[str, Any]):
+        """
+        Record a finished job in the job history; written with the next batch of writes.
+
+        Args:
+            entry: Values of the job_history columns (missing ones are left empty)
+        """
+        unknown = set(entry) - JOB_HISTORY_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown job history columns: {', '.join(sorted(unknown))}")
+        columns = ", ".join(entry)
+        placeholders = ", ".join("?" for _ in entry)
+        self._defer(f"INSERT INTO job_history ({columns}) VALUES ({placeholders})", tuple(entry.values()))
+
+    @_on_db_thread
+    def get_job_history(
+        self, min_finished_at: float, user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the jobs finished since a timestamp, oldest first.
+
+        Args:
+            min_finished_at: Jobs finished before this timestamp are left out
+            user_id: Only the jobs of this user (default: every user)
+
+        Returns:
+            Rows of the job history
+        """
+        self._flush_pending()
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                if user_id is None:
+                    cursor.execute(
+                        "SELECT * FROM job_history WHERE finished_at >= ? ORDER BY finished_at",
+                        (min_finished_at,),
+                    )
+                else:
+                    cursor.execute(
+                        """
+                        SELECT * FROM job_history WHERE user_id = ? AND finished_at >= ?
+                        ORDER BY finished_at
+                    """,
+                        (user_id, min_finished_at),
+                    )
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logging.error(f"Error getting job history: {e}")
+            return []
+
+    @_on_db_thread
+    def add_job(
+        self, update_id: int, user_id: str, chat_id: int, kind: str, payload: str, settings: Optional[str] = None
+    ) -> bool:
+        """
+        Record a new queued job for a Telegram update.
+
+        Args:
+            update_id: Telegram update ID, unique per job
+            user_id: User the job belongs to
+            chat_id: Chat the result is delivered to
+            kind: Handler that processes the update ("message" or "transcribe")
+            payload: The update serialized as JSON
+            settings: Settings of the chat when the job was accepted, serialized as JSON
+
+        Returns:
+            bool: False if a job for this update already exists
+        """
+        try:
+            now = time.time()
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO jobs
+                        (update_id, user_id, chat_id, kind, payload, settings, state, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?)
+                """,
+                    (update_id, user_id, chat_id, kind, payload, settings, now, now),
+                )
+                conn.commit()
+                return cursor.rowcount == 1
+        except Exception as e:
+            logging.error(f"Error adding job for update {update_id}: {e}")
+            # Without the table the job cannot be deduplicated, but it can still run
+            return True
+
+    @_on_db_thread
+    def update_job(self, update_id: int, **fields: Any):
+        """
+        Update columns of a job (state, download_path, transcript, result, error, attempts).
+
+        Args:
+            update_id: Telegram update ID of the job
+            fields: Columns to set
+        """
+        unknown = set(fields) - JOB_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown job columns: {', '.join(sorted(unknown))}")
+        try:
+            fields["updated_at"] = time.time()
+            assignments = ", ".join(f"{column} = ?" for column in fields)
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"UPDATE jobs SET {assignments} WHERE update_id = ?",
+                    (*fields.values(), update_id),
+                )
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Error updating job {update_id}: {e}")
+
+    @_on_db_thread
+    def get_unfinished_jobs(self) -> List[Dict[str, Any]]:
+        """Get every job that is neither done nor failed, oldest first."""
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute(
+                    """
+                    SELECT * FROM jobs WHERE state NOT IN ('done', 'failed')
+                    ORDER BY created_at
+                """
+                )
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logging.error(f"Error getting unfinished jobs: {e}")
+            return []
+
+    @_on_db_thread
+    def delete_finished_jobs(self, min_updated_at: float) -> int:
+        """
+        Delete done and failed jobs last updated before a timestamp.
+
+        Args:
+            min_updated_at: Finished jobs updated before this timestamp are deleted
+
+        Returns:
+            int: Number of deleted jobs
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    DELETE FROM jobs
+                    WHERE state IN ('done', 'failed') AND updated_at < ?
+                """,
+                    (min_updated_at,),
+                )
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Error deleting finished jobs: {e}")
+            return 0
+
+    @_on_db_thread
+    def publish_job(self, update_id: int, priority: float, cost: float, size: int):
+        """
+        Make a job available to worker processes.
+
+        Args:
+            update_id: Telegram update ID of the job
+            priority: Lower is claimed first
+            cost: Estimated processing time in seconds
+            size: Bytes the job will download
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE jobs SET priority = ?, cost = ?, size = ?, updated_at = ?
+                    WHERE update_id = ?
+                """,
+                    (priority, cost, size, time.time(), update_id),
+                )
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Error publishing job {update_id}: {e}")
+            raise
+
+    @_on_db_thread
+    def claim_job(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically assign the best published job to a worker.
+
+        The job with the lowest priority among unclaimed, unfinished jobs is taken,
+        skipping users who already have a job claimed, so each user has at most one
+        job running across all workers.
+
+        Args:
+            worker_id: Identity of the claiming worker
+
+        Returns:
+            The claimed job row, or None if there is nothing to claim
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                # Take the write lock before reading, so two workers never claim the same job
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.execute(
+                        """
+                        SELECT * FROM jobs
+                        WHERE priority IS NOT NULL AND worker IS NULL
+                            AND state NOT IN ('done', 'failed')
+                            AND user_id NOT IN (
+                                SELECT user_id FROM jobs
+                                WHERE worker IS NOT NULL AND state NOT IN ('done', 'failed')
+                            )
+                        ORDER BY priority
+                        LIMIT 1
+                    """
+                    )
+                    row = cursor.fetchone()
+                    if row:
+                        cursor.execute(
+                            "UPDATE jobs SET worker = ?, claimed_at = ? WHERE update_id = ?",
+                            (worker_id, time.time(), row["update_id"]),
+                        )
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                return dict(row) if row else None
+        except Exception as e:
+            logging.error(f"Error claiming a job for worker {worker_id}: {e}")
+            return None
+
+    @_on_db_thread
+    def get_published_jobs(self) -> List[Dict[str, Any]]:
+        """Get the unfinished published jobs (claimed or not) with their cost and size."""
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
+                cursor.execute(
+                    """
+                    SELECT update_id, user_id, state, priority, cost, size, worker, claimed_at
+                    FROM jobs
+                    WHERE priority IS NOT NULL AND state NOT IN ('done', 'failed')
+                """
+                )
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logging.error(f"Error getting published jobs: {e}")
+            return []
+
+    @_on_db_thread
+    def heartbeat_worker(self, worker_id: str, slots: int):
+        """Record that a worker process is alive and how many jobs it runs at once."""
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT OR REPLACE INTO job_workers (worker_id, slots, heartbeat)
+                    VALUES (?, ?, ?)
+                """,
+                    (worker_id, slots, time.time()),
+                )
+                conn.commit()
+        except Exception as e:
+            logging.error(f"Error recording heartbeat of worker {worker_id}: {e}")
+
+    @_on_db_thread
+    def get_worker_slots(self, min_heartbeat: float) -> int:
+        """Get the total job slots of the workers alive since a timestamp."""
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT COALESCE(SUM(slots), 0) FROM job_workers WHERE heartbeat >= ?",
+                    (min_heartbeat,),
+                )
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logging.error(f"Error getting worker slots: {e}")
+            return 0
+
+    @_on_db_thread
+    def release_worker_jobs(self, min_heartbeat: float, worker_id: Optional[str] = None) -> int:
+        """
+        Return the unfinished jobs of stopped or dead workers to the queue.
+
+        Args:
+            min_heartbeat: Workers without a heartbeat since this timestamp are dead
+            worker_id: Also release the jobs of this worker and forget it (it is stopping)
+
+        Returns:
+            int: Number of released jobs
+        """
+        try:
+            with self._connection as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM job_workers WHERE heartbeat < ? OR worker_id = ?",
+                    (min_heartbeat, worker_id),
+                )
+                cursor.execute(
+                    """
+                    UPDATE jobs SET worker = NULL, claimed_at = NULL
+                    WHERE worker IS NOT NULL AND state NOT IN ('done', 'failed')
+                        AND worker NOT IN (SELECT worker_id FROM job_workers)
+                """
+                )
+                released = cursor.rowcount
+                conn.commit()
+                return released
+        except Exception as e:
+            logging.error(f"Error releasing jobs of stopped workers: {e}")
+            return 0
+
+
+def _add_column(cursor, table: str, name: str, definition: str):
+    """Add a column to a table unless it already has it."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    if name not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def _migrate_initial_schema(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id TEXT PRIMARY KEY,
+            authorized INTEGER DEFAULT 0
+        )
+    """
+    )
+
+    # Insert default settings
+    default_settings = [
+        ("auto_transcription_enabled", 1),
+        ("enhanced_transcription_enabled", 0),
+        ("output_text_file_enabled", 0),
+        ("auto_summarize_enabled", 0),
+        ("transcription_speed", 1),
+    ]
+
+    cursor.executemany(
+        """
+        INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
+    """,
+        default_settings,
+    )
+
+
+def _migrate_strategy_stats(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS strategy_stats (
+            strategy TEXT PRIMARY KEY,
+            attempts INTEGER DEFAULT 0,
+            successes INTEGER DEFAULT 0,
+            success_rate REAL,
+            avg_latency REAL,
+            updated_at REAL
+        )
+    """
+    )
+
+
+def _migrate_transcript_cache(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS transcript_cache (
+            video_id TEXT,
+            language TEXT,
+            payload BLOB,
+            size INTEGER,
+            created_at REAL,
+            last_access REAL,
+            PRIMARY KEY (video_id, language)
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_transcript_cache_last_access
+        ON transcript_cache (last_access)
+    """
+    )
+
+
+def _migrate_subtitle_file_setting(cursor):
+    cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('subtitle_file_enabled', 0)")
+
+
+def _migrate_jobs(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            update_id INTEGER PRIMARY KEY,
+            user_id TEXT,
+            chat_id INTEGER,
+            kind TEXT,
+            payload TEXT,
+            state TEXT,
+            download_path TEXT,
+            transcript BLOB,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER DEFAULT 0,
+            created_at REAL,
+            updated_at REAL
+        )
+    """
+    )
+
+
+def _migrate_job_broker(cursor):
+    _add_column(cursor, "jobs", "priority", "REAL")
+    _add_column(cursor, "jobs", "cost", "REAL")
+    _add_column(cursor, "jobs", "size", "INTEGER DEFAULT 0")
+    _add_column(cursor, "jobs", "worker", "TEXT")
+    _add_column(cursor, "jobs", "claimed_at", "REAL")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_workers (
+            worker_id TEXT PRIMARY KEY,
+            slots INTEGER,
+            heartbeat REAL
+        )
+    """
+    )
+
+
+def _migrate_chat_settings(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chat_settings (
+            chat_id INTEGER,
+            key TEXT,
+            value INTEGER,
+            PRIMARY KEY (chat_id, key)
+        )
+    """
+    )
+    # Settings snapshot kept with each job
+    _add_column(cursor, "jobs", "settings", "TEXT")
+
+
+def _migrate_job_indexes(cursor):
+    # Unfinished jobs (resume, broker queue) and finished jobs by age (pruning)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_updated_at ON jobs (state, updated_at)")
+    # Jobs claimed per user (one running job per user across workers)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_worker ON jobs (user_id, worker)")
+
+
+def _migrate_job_history_and_usage(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_history (
+            update_id INTEGER,
+            user_id TEXT,
+            chat_id INTEGER,
+            kind TEXT,
+            media_type TEXT,
+            input_bytes INTEGER,
+            audio_seconds REAL,
+            transcript_chars INTEGER,
+            output_chars INTEGER,
+            queued_seconds REAL,
+            download_seconds REAL,
+            transcribe_seconds REAL,
+            post_process_seconds REAL,
+            deliver_seconds REAL,
+            total_seconds REAL,
+            strategy TEXT,
+            attempts INTEGER,
+            outcome TEXT,
+            error TEXT,
+            created_at REAL,
+            finished_at REAL
+        )
+    """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_history_finished_at ON job_history (finished_at)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_job_history_user_finished_at ON job_history (user_id, finished_at)"
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usage_counters (
+            day TEXT,
+            user_id TEXT,
+            jobs INTEGER DEFAULT 0,
+            audio_seconds REAL DEFAULT 0,
+            characters INTEGER DEFAULT 0,
+            openai_tokens INTEGER DEFAULT 0,
+            PRIMARY KEY (day, user_id)
+        )
+    """
+    )
+
+
+# Schema migrations: (version, description, function applying it to a cursor), in order.
+# Version 1 is the schema from before this series of changes. Migrations must be
+# idempotent, since databases created before they were versioned may already have
+# some of their tables or columns. Append new ones at the end; never change a
+# migration that has been released.
+MIGRATIONS = [
+    (1, "initial schema", _migrate_initial_schema),
+    (2, "strategy statistics", _migrate_strategy_stats),
+    (3, "transcript cache", _migrate_transcript_cache),
+    (4, "subtitle file setting", _migrate_subtitle_file_setting),
+    (5, "jobs", _migrate_jobs),
+    (6, "job broker", _migrate_job_broker),
+    (7, "chat settings", _migrate_chat_settings),
+    (8, "job indexes", _migrate_job_indexes),
+    (9, "job history and usage counters", _migrate_job_history_and_usage),
+]
+
+# Columns of the jobs table that update_job may set
+JOB_COLUMNS = {"state", "download_path", "transcript", "result", "error", "attempts"}
+
+# Columns of the job_history table
+JOB_HISTORY_COLUMNS = {
+    "update_id", "user_id", "chat_id", "kind", "media_type", "input_bytes", "audio_seconds",
+    "transcript_chars", "output_chars", "queued_seconds", "download_seconds", "transcribe_seconds",
+    "post_process_seconds", "deliver_seconds", "total_seconds", "strategy", "attempts", "outcome",
+    "error", "created_at", "finished_at",
+}
 
 # Create a global instance of Database
 db = Database()
@@ -0,0 +1,180 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from bot.utils.database import db
+from bot.utils.job_scheduler import JobRejectedError
+from bot.utils.job_store import JobRecord, JobStore, job_store
+from config.constants import (
+    JOB_AGING_RATE,
+    JOB_DEFAULT_COST,
+    JOB_QUEUE_LIMIT,
+    JOB_MAX_PER_USER,
+    JOB_PENDING_BYTES_BUDGET,
+    JOB_WORKER_TIMEOUT,
+)
+
+
+class BrokerJob:
+    """Job published to the broker, as followed by the front end that queued it."""
+
+    def __init__(self, update_id: int, key: str, cost: float, priority: float):
+        self.update_id = update_id
+        self.key = key
+        self.cost = cost
+        self.priority = priority
+        # pending until a worker claims it, then running, then done
+        self.state = "pending"
+
+
+class JobBroker:
+    """
+    Job queue shared between processes through the jobs table.
+
+    A front end process publishes jobs; worker processes (on this host, or on others
+    sharing the database file) claim them atomically and process them. Jobs are
+    claimed in the same order as ``JobScheduler`` runs them (estimated cost plus
+    aging, one running job per user across all workers) and admission is bounded by
+    the same limits.
+
+    Workers send a heartbeat while they run. A worker that stops or dies (no
+    heartbeat for ``worker_timeout`` seconds) gets its unfinished jobs returned to
+    the queue, where another worker resumes them from their last completed stage.
+    """
+
+    def __init__(
+        self,
+        database=db,
+        store: JobStore = job_store,
+        aging_rate: float = JOB_AGING_RATE,
+        max_pending: int = JOB_QUEUE_LIMIT,
+        max_per_user: int = JOB_MAX_PER_USER,
+        max_bytes: int = JOB_PENDING_BYTES_BUDGET,
+        worker_timeout: float = JOB_WORKER_TIMEOUT,
+    ):
+        """
+        Args:
+            database: Database holding the jobs table
+            store: Store the claimed jobs belong to
+            aging_rate: Seconds of estimated cost forgiven per second a job waits
+            max_pending: Maximum number of unclaimed jobs
+            max_per_user: Maximum number of unfinished jobs per user
+            max_bytes: Maximum download size of all unfinished jobs
+            worker_timeout: Seconds without a heartbeat after which a worker is dead
+        """
+        self.database = database
+        self.store = store
+        self.aging_rate = max(0.0, aging_rate)
+        self.max_pending = max(1, max_pending)
+        self.max_per_user = max(1, max_per_user)
+        self.max_bytes = max_bytes
+        self.worker_timeout = worker_timeout
+
+    def submit(
+        self,
+        record: JobRecord,
+        description: str = "",
+        cost: float = JOB_DEFAULT_COST,
+        size: int = 0,
+        check_admission: bool = True,
+    ) -> BrokerJob:
+        """
+        Publish a persisted job for the workers.
+
+        Args:
+            record: The job
+            description: Label used in log messages
+            cost: Estimated processing time in seconds
+            size: Bytes the job will download
+            check_admission: Apply the queue limits
+
+        Returns:
+            Handle to follow the job
+
+        Raises:
+            JobRejectedError: If the job is not admitted
+        """
+        if check_admission:
+            self._check_admission(self.database.get_published_jobs(), record.user_id, size)
+
+        cost = max(0.0, cost)
+        # Wall-clock time, since jobs are compared across processes
+        priority = cost + self.aging_rate * time.time()
+        self.database.publish_job(record.update_id, priority, cost, size)
+        logging.info(
+            f"Job broker: published {description or 'job'} {record.update_id} for {record.user_id} "
+            f"(estimated cost: {cost:.0f}s)"
+        )
+        return BrokerJob(record.update_id, record.user_id, cost, priority)
+
+    def _check_admission(self, jobs: List[Dict[str, Any]], key: str, size: int) -> None:
+        """Raise JobRejectedError if a new job of the user cannot be admitted."""
+        pending = sum(1 for job in jobs if job["worker"] is None)
+        if pending >= self.max_pending:
+            raise JobRejectedError(JobRejectedError.QUEUE_FULL, f"queue full ({pending} pending jobs)")
+        user_jobs = sum(1 for job in jobs if job["user_id"] == key)
+        if user_jobs >= self.max_per_user:
+            raise JobRejectedError(JobRejectedError.USER_LIMIT, f"{user_jobs} jobs queued or running for {key}")
+        pending_bytes = sum(job["size"] or 0 for job in jobs)
+        if size and pending_bytes + size > self.max_bytes:
+            raise JobRejectedError(
+                JobRejectedError.BYTE_BUDGET,
+                f"download budget exceeded ({pending_bytes + size} of {self.max_bytes} bytes)",
+            )
+
+    def estimate_wait(self, job: BrokerJob) -> Tuple[int, float]:
+        """
+        Estimate how long a published job will wait for a worker, and refresh its state.
+
+        Args:
+            job: A job returned by ``submit``
+
+        Returns:
+            Tuple of (position in the queue, estimated seconds until it starts);
+            (0, 0) if it can start right away or is no longer pending
+        """
+        jobs = self.database.get_published_jobs()
+        own = next((queued for queued in jobs if queued["update_id"] == job.update_id), None)
+        if own is None:
+            job.state = "done"
+        elif own["worker"] is not None:
+            job.state = "running"
+        if job.state != "pending":
+            return 0, 0.0
+
+        now = time.time()
+        ahead = [
+            queued["cost"] or 0.0
+            for queued in jobs
+            if queued["worker"] is None and queued["priority"] < job.priority
+        ]
+        claimed = [queued for queued in jobs if queued["worker"] is not None]
+        remaining = {
+            queued["user_id"]: max((queued["cost"] or 0.0) - (now - queued["claimed_at"]), 0.0) for queued in claimed
+        }
+        slots = max(self.database.get_worker_slots(now - self.worker_timeout), 1)
+        if not ahead and len(claimed) < slots and job.key not in remaining:
+            return 0, 0.0
+        # A user's own running job must finish first, whatever the other workers do
+        wait = max((sum(ahead) + sum(remaining.values())) / slots, remaining.get(job.key, 0.0))
+        return len(ahead) + 1, wait
+
+    def claim(self, worker_id: str) -> Optional[JobRecord]:
+        """Take the best published job for a worker, or None if there is none."""
+        row = self.database.claim_job(worker_id)
+        return JobRecord(self.store, row) if row else None
+
+    def heartbeat(self, worker_id: str, slots: int) -> None:
+        """Record that a worker is alive, and requeue the jobs of dead workers."""
+        self.database.heartbeat_worker(worker_id, slots)
+        released = self.database.release_worker_jobs(time.time() - self.worker_timeout)
+        if released:
+            logging.warning(f"Job broker: requeued {released} jobs of workers that stopped responding")
+
+    def release(self, worker_id: str) -> None:
+        """Return the unfinished jobs of a stopping worker to the queue."""
+        released = self.database.release_worker_jobs(time.time() - self.worker_timeout, worker_id)
+        logging.info(f"Job broker: worker {worker_id} left, {released} unfinished jobs requeued")
+
+
+# Create a global instance of JobBroker
+job_broker = JobBroker()
@@ -0,0 +1,287 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+from config.constants import (
+    JOB_WORKERS,
+    JOB_AGING_RATE,
+    JOB_DEFAULT_COST,
+    JOB_QUEUE_LIMIT,
+    JOB_MAX_PER_USER,
+    JOB_PENDING_BYTES_BUDGET,
+)
+
+
+class JobRejectedError(Exception):
+    """
+    Raised by ``JobScheduler.submit`` when a job is not admitted.
+
+    ``reason`` is one of ``QUEUE_FULL``, ``USER_LIMIT`` or ``BYTE_BUDGET``.
+    """
+
+    QUEUE_FULL = "queue_full"
+    USER_LIMIT = "user_limit"
+    BYTE_BUDGET = "byte_budget"
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class Job:
+    """Unit of work queued for a user."""
+
+    def __init__(
+        self, key: Hashable, func: Callable[[], Awaitable[None]], description: str, cost: float, priority: float, size: int
+    ):
+        self.key = key
+        self.func = func
+        self.description = description
+        # Estimated processing time in seconds
+        self.cost = cost
+        # Lower runs first: cost plus aging credit earned by jobs submitted earlier
+        self.priority = priority
+        # Bytes the job will download
+        self.size = size
+        # pending, running, done or dropped
+        self.state = "pending"
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+
+
+class JobScheduler:
+    """
+    Run queued jobs on a pool of workers, shortest estimated job first.
+
+    Every job carries an estimated cost (seconds of work). The next job to run is
+    the one with the lowest ``cost - aging_rate * seconds_waited``, so a short voice
+    note overtakes long videos, while a long job keeps gaining priority as it waits
+    and is never starved. Since every job ages at the same rate, this order is
+    fixed at submission (``cost + aging_rate * submitted_at``) and kept in heaps.
+
+    Each user (key) has at most one job running, so no user occupies more than one
+    worker, and a user's jobs of similar cost are answered in the order they were sent.
+
+    Admission can be bounded: ``submit`` rejects a job when the queue is full, when
+    its user already has too many jobs queued or running, or when the bytes the
+    queued and running jobs still have to download would exceed the budget. Each
+    limit is off unless given.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        aging_rate: float = JOB_AGING_RATE,
+        max_pending: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        name: str = "Job scheduler",
+    ):
+        """
+        Args:
+            workers: Number of jobs running at the same time
+            aging_rate: Seconds of estimated cost forgiven per second a job waits
+            max_pending: Maximum number of queued jobs (None for no limit)
+            max_per_user: Maximum number of queued or running jobs per user (None for no limit)
+            max_bytes: Maximum download size of all queued and running jobs (None for no limit)
+            name: Label used in log messages
+        """
+        self.workers = max(1, workers)
+        self.aging_rate = max(0.0, aging_rate)
+        self.max_pending = None if max_pending is None else max(1, max_pending)
+        self.max_per_user = None if max_per_user is None else max(1, max_per_user)
+        self.max_bytes = max_bytes
+        self.name = name
+        self._pending_bytes = 0
+        # Pending jobs per user: heap of (priority, sequence, job)
+        self._queues: Dict[Hashable, List[Tuple[float, int, Job]]] = {}
+        # Users with pending jobs and none running; the semaphore counts them for the workers
+        self._ready: Set[Hashable] = set()
+        self._ready_count: Optional[asyncio.Semaphore] = None
+        self._running: Dict[Hashable, Job] = {}
+        self._sequence = itertools.count()
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Start the workers."""
+        if self._worker_tasks:
+            return
+        self._ready_count = asyncio.Semaphore(len(self._ready))
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(number)) for number in range(1, self.workers + 1)
+        ]
+        logging.info(f"{self.name}: started {self.workers} workers (aging rate: {self.aging_rate})")
+
+    async def stop(self) -> None:
+        """Stop the workers, cancelling running jobs; pending jobs are dropped."""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        pending = self.pending_count()
+        if pending:
+            logging.warning(f"{self.name}: stopped with {pending} pending jobs")
+        for queue in self._queues.values():
+            for _, _, job in queue:
+                job.state = "dropped"
+        self._queues.clear()
+        self._ready.clear()
+        self._running.clear()
+        self._pending_bytes = 0
+        self._ready_count = None
+        logging.info(f"{self.name}: stopped")
+
+    def submit(
+        self,
+        key: Hashable,
+        func: Callable[[], Awaitable[None]],
+        description: str = "",
+        cost: float = JOB_DEFAULT_COST,
+        size: int = 0,
+        check_admission: bool = True,
+    ) -> Job:
+        """
+        Queue a job for a user.
+
+        Args:
+            key: Identity of the user the job belongs to
+            func: Coroutine function running the job
+            description: Label used in log messages
+            cost: Estimated processing time in seconds
+            size: Bytes the job will download
+            check_admission: Apply the queue limits (jobs admitted earlier, e.g. resumed
+                after a restart, skip them)
+
+        Returns:
+            The queued job
+
+        Raises:
+            JobRejectedError: If the job is not admitted
+        """
+        if check_admission:
+            self._check_admission(key, size)
+
+        cost = max(0.0, cost)
+        job = Job(key, func, description, cost, cost + self.aging_rate * time.monotonic(), size)
+        self._pending_bytes += size
+        queue = self._queues.setdefault(key, [])
+        heapq.heappush(queue, (job.priority, next(self._sequence), job))
+        if key not in self._running:
+            self._mark_ready(key)
+        logging.info(
+            f"{self.name}: queued {description or 'job'} for {key} (estimated cost: {cost:.0f}s, "
+            f"{len(queue)} pending for this user, {self.pending_count()} in total)"
+        )
+        return job
+
+    def pending_count(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def running_count(self) -> int:
+        """Number of jobs currently running."""
+        return len(self._running)
+
+    def user_job_count(self, key: Hashable) -> int:
+        """Number of queued or running jobs of a user."""
+        return len(self._queues.get(key, ())) + (1 if key in self._running else 0)
+
+    def _check_admission(self, key: Hashable, size: int) -> None:
+        """Raise JobRejectedError if a new job of the user cannot be admitted."""
+        if self.max_pending is not None:
+            pending = self.pending_count()
+            if pending >= self.max_pending:
+                raise JobRejectedError(JobRejectedError.QUEUE_FULL, f"queue full ({pending} pending jobs)")
+        if self.max_per_user is not None:
+            user_jobs = self.user_job_count(key)
+            if user_jobs >= self.max_per_user:
+                raise JobRejectedError(JobRejectedError.USER_LIMIT, f"{user_jobs} jobs queued or running for {key}")
+        if self.max_bytes is not None and size and self._pending_bytes + size > self.max_bytes:
+            raise JobRejectedError(
+                JobRejectedError.BYTE_BUDGET,
+                f"download budget exceeded ({self._pending_bytes + size} of {self.max_bytes} bytes)",
+            )
+
+    def estimate_wait(self, job: Job) -> Tuple[int, float]:
+        """
+        Estimate how long a pending job will wait for a worker.
+
+        Args:
+            job: A job returned by ``submit``
+
+        Returns:
+            Tuple of (position in the queue, estimated seconds until it starts);
+            (0, 0) if it can start right away or is no longer pending
+        """
+        if job.state != "pending":
+            return 0, 0.0
+
+        now = time.monotonic()
+        ahead = [
+            queued.cost
+            for queue in self._queues.values()
+            for priority, _, queued in queue
+            if priority < job.priority
+        ]
+        busy = sum(max(running.cost - (now - running.started_at), 0.0) for running in self._running.values())
+        if not ahead and len(self._running) < self.workers and job.key not in self._running:
+            return 0, 0.0
+        # A user's own running job must finish first, whatever the other workers do
+        own = self._running.get(job.key)
+        own_remaining = max(own.cost - (now - own.started_at), 0.0) if own else 0.0
+        wait = max((sum(ahead) + busy) / self.workers, own_remaining)
+        return len(ahead) + 1, wait
+
+    def _mark_ready(self, key: Hashable) -> None:
+        """Let the workers know the user has a job that can start."""
+        if key in self._ready:
+            return
+        self._ready.add(key)
+        if self._ready_count is not None:
+            self._ready_count.release()
+
+    def _next_job(self) -> Job:
+        """Take the best pending job among the users that can start one."""
+        key = min(self._ready, key=lambda k: self._queues[k][0])
+        self._ready.discard(key)
+        queue = self._queues[key]
+        _, _, job = heapq.heappop(queue)
+        if not queue:
+            del self._queues[key]
+        return job
+
+    async def _worker(self, number: int) -> None:
+        """Run the best pending job, forever."""
+        while True:
+            await self._ready_count.acquire()
+            job = self._next_job()
+            job.state = "running"
+            job.started_at = time.monotonic()
+            self._running[job.key] = job
+
+            waited = job.started_at - job.submitted_at
+            logging.info(
+                f"{self.name}: worker {number} running {job.description or 'job'} for {job.key} "
+                f"(estimated cost: {job.cost:.0f}s, waited {waited:.1f}s)"
+            )
+            try:
+                await job.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"{self.name}: error running {job.description or 'job'} for {job.key}: {e}", exc_info=True)
+            finally:
+                job.state = "done"
+                self._pending_bytes -= job.size
+                del self._running[job.key]
+                if job.key in self._queues and self._ready_count is not None:
+                    self._mark_ready(job.key)
+
+
+# Create a global instance of JobScheduler
+job_scheduler = JobScheduler(
+    max_pending=JOB_QUEUE_LIMIT, max_per_user=JOB_MAX_PER_USER, max_bytes=JOB_PENDING_BYTES_BUDGET
+)
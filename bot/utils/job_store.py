@@ -0,0 +1,322 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from bot.utils.database import db
+from bot.utils.transcript_segments import Transcript, dumps, loads
+from config.bot_config import ChatSettings, bot_config
+from config.constants import JOB_WORK_DIR, JOB_RETENTION
+
+# Column of the job history accumulating the time spent in each stage
+STAGE_COLUMNS = {
+    "queued": "queued_seconds",
+    "downloading": "download_seconds",
+    "transcribing": "transcribe_seconds",
+    "post-processing": "post_process_seconds",
+    "delivering": "deliver_seconds",
+}
+
+# Job being run by the current task, for usage recorded deep in the call stack
+current_job: ContextVar[Optional["JobRecord"]] = ContextVar("current_job", default=None)
+
+
+class JobRecord:
+    """
+    Persistent state of one job: the Telegram update being transcribed and how far it got.
+
+    Jobs move through ``queued``, ``downloading``, ``transcribing``, ``post-processing``
+    and ``delivering`` to ``done`` or ``failed``. Each stage saves its output (the
+    downloaded file, the transcript, the enhanced text) so a job interrupted by a
+    restart resumes after the last completed stage instead of starting over.
+    Saving awaits the database thread, so it never blocks the event loop.
+    """
+
+    def __init__(self, store: "JobStore", row: Dict[str, Any]):
+        """
+        Args:
+            store: Store the record belongs to
+            row: Row of the jobs table
+        """
+        self.store = store
+        self.update_id: int = row["update_id"]
+        self.user_id = row["user_id"]
+        self.chat_id = row["chat_id"]
+        self.kind: str = row["kind"]
+        self.payload: str = row["payload"]
+        self.state: str = row["state"]
+        self.download_path: Optional[str] = row.get("download_path")
+        self.result: Optional[str] = row.get("result")
+        self.attempts: int = row.get("attempts") or 0
+        # Published to the job broker for worker processes
+        self.published = row.get("priority") is not None
+        self._transcript_payload: Optional[bytes] = row.get("transcript")
+        settings = row.get("settings")
+        self._settings: Optional[ChatSettings] = (
+            ChatSettings(self.chat_id, json.loads(settings)) if settings else None
+        )
+        # Measurements for the job history, kept in memory only: a resumed job
+        # reports the stages run since it resumed
+        self.created_at: float = row.get("created_at") or time.time()
+        self.media_type: Optional[str] = None
+        self.input_bytes: Optional[int] = None
+        self.audio_seconds: Optional[float] = None
+        self.transcript_chars: Optional[int] = None
+        self.strategy: Optional[str] = None
+        self.openai_tokens = 0
+        self.durations: Dict[str, float] = {}
+        self._stage_started = self.created_at if self.state == "queued" else time.time()
+
+    async def get_settings(self) -> ChatSettings:
+        """Settings of the chat when the job was accepted; the job uses them throughout."""
+        if self._settings is None:
+            # Jobs saved without a snapshot use the chat's current settings
+            self._settings = await db.run(bot_config.settings_for, self.chat_id)
+        return self._settings
+
+    @property
+    def transcript(self) -> Optional[Transcript]:
+        """Transcript saved by the transcribing stage, or None."""
+        if self._transcript_payload is None:
+            return None
+        return loads(self._transcript_payload)
+
+    def has_download(self) -> bool:
+        """Whether the downloaded file of an earlier attempt is still on disk."""
+        return bool(self.download_path) and os.path.exists(self.download_path)
+
+    def work_path(self, name: str) -> str:
+        """Path of an intermediate file kept until the job finishes."""
+        directory = os.path.join(self.store.work_dir, str(self.update_id))
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def _enter(self, state: str) -> None:
+        """Add the time spent in the current stage to its duration and move to ``state``."""
+        now = time.time()
+        column = STAGE_COLUMNS.get(self.state)
+        if column:
+            self.durations[column] = self.durations.get(column, 0.0) + now - self._stage_started
+        self._stage_started = now
+        self.state = state
+
+    def set_media(self, media_type: str, input_bytes: Optional[int] = None, audio_seconds: Optional[float] = None) -> None:
+        """
+        Record what the job transcribes, for the job history.
+
+        Args:
+            media_type: Kind of media (audio, voice, video, youtube...)
+            input_bytes: Size of the file received
+            audio_seconds: Length of the audio
+        """
+        self.media_type = media_type
+        if input_bytes is not None:
+            self.input_bytes = input_bytes
+        if audio_seconds is not None:
+            self.audio_seconds = audio_seconds
+
+    def set_strategy(self, strategy: str) -> None:
+        """Record the strategy that produced the transcript, for the job history."""
+        self.strategy = strategy
+
+    def add_openai_tokens(self, tokens: int) -> None:
+        """Count OpenAI tokens used on behalf of the job."""
+        self.openai_tokens += tokens
+
+    async def set_state(self, state: str) -> None:
+        """Record the stage the job is in."""
+        if state == self.state:
+            return
+        self._enter(state)
+        await self.store.update(self.update_id, state=state)
+        logging.info(f"Job {self.update_id}: {state}")
+
+    async def save_download(self, path: str) -> None:
+        """Record the downloaded file; the job moves on to transcribing."""
+        self.download_path = path
+        self._enter("transcribing")
+        await self.store.update(self.update_id, download_path=path, state=self.state)
+
+    async def save_transcript(self, transcript: str) -> None:
+        """Record the transcript, with its timestamps."""
+        # Serialized off the event loop: long transcripts carry large timing arrays
+        self._transcript_payload = await asyncio.to_thread(dumps, transcript)
+        self.transcript_chars = len(transcript)
+        if self.audio_seconds is None and getattr(transcript, "has_timestamps", False):
+            # No length known up front (e.g. YouTube): the end of the last segment
+            self.audio_seconds = transcript.starts[-1] + transcript.durations[-1]
+        await self.store.update(self.update_id, transcript=self._transcript_payload)
+
+    async def save_result(self, text: str) -> None:
+        """Record the post-processed text; the job moves on to delivering."""
+        self.result = text
+        self._enter("delivering")
+        await self.store.update(self.update_id, result=text, state=self.state)
+
+
+class JobStore:
+    """
+    Jobs persisted in SQLite so they survive restarts and crashes.
+
+    There is one job per Telegram update ID: an update delivered again (Telegram
+    resends updates that were not acknowledged before a crash) is recognised and
+    not processed twice. Finished jobs are kept for ``retention`` seconds for that
+    purpose; their intermediate files are removed as soon as they finish.
+    """
+
+    def __init__(self, database=db, work_dir: str = JOB_WORK_DIR, retention: int = JOB_RETENTION):
+        """
+        Args:
+            database: Database holding the jobs table
+            work_dir: Directory for intermediate files of unfinished jobs
+            retention: Seconds finished jobs are kept to recognise repeated updates
+        """
+        self.database = database
+        self.work_dir = work_dir
+        self.retention = retention
+
+    def create(
+        self,
+        update_id: int,
+        user_id,
+        chat_id: int,
+        kind: str,
+        payload: str,
+        settings: Optional[ChatSettings] = None,
+    ) -> Optional[JobRecord]:
+        """
+        Record a new job for an update.
+
+        Args:
+            update_id: Telegram update ID
+            user_id: User the job belongs to
+            chat_id: Chat the result is delivered to
+            kind: Handler that processes the update
+            payload: The update serialized as JSON
+            settings: Settings snapshot of the chat, kept with the job
+
+        Returns:
+            The queued job, or None if the update already has one
+        """
+        settings_payload = json.dumps(settings.values) if settings else None
+        if not self.database.add_job(update_id, str(user_id), chat_id, kind, payload, settings_payload):
+            return None
+        row = {
+            "update_id": update_id,
+            "user_id": str(user_id),
+            "chat_id": chat_id,
+            "kind": kind,
+            "payload": payload,
+            "state": "queued",
+            "settings": settings_payload,
+            "created_at": time.time(),
+        }
+        return JobRecord(self, row)
+
+    def unfinished(self) -> List[JobRecord]:
+        """Jobs that were queued or running when the bot stopped, oldest first."""
+        return [JobRecord(self, row) for row in self.database.get_unfinished_jobs()]
+
+    async def update(self, update_id: int, **fields: Any) -> None:
+        """Update columns of a job on the database thread, without blocking the event loop."""
+        await self.database.run(self.database.update_job, update_id, **fields)
+
+    async def run(self, record: JobRecord, func: Callable[[], Awaitable[None]]) -> None:
+        """
+        Run a job and record its outcome.
+
+        The job is done when ``func`` returns (unless it marked itself failed) and
+        failed when it raises. A job cancelled because the bot is stopping stays
+        unfinished, with its intermediate files, and resumes on the next start.
+
+        Args:
+            record: The job
+            func: Coroutine function processing the job's update
+        """
+        record.attempts += 1
+        await self.update(record.update_id, attempts=record.attempts)
+        token = current_job.set(record)
+        try:
+            await func()
+        except asyncio.CancelledError:
+            logging.info(f"Job {record.update_id} interrupted in state {record.state}, it will resume on restart")
+            raise
+        except Exception as e:
+            await self.finish(record, "failed", str(e))
+            raise
+        else:
+            await self.finish(record, "done")
+        finally:
+            current_job.reset(token)
+
+    async def finish(self, record: JobRecord, state: str, error: Optional[str] = None) -> None:
+        """
+        Mark a job done or failed, record it in the job history and remove its intermediate files.
+
+        A job already marked failed stays failed. The history row and the user's
+        usage counters are written in the background, batched with other writes.
+
+        Args:
+            record: The job
+            state: ``done`` or ``failed``
+            error: Reason of a failure
+        """
+        if record.state == "failed":
+            state = "failed"
+        record._enter(state)
+        await self.update(record.update_id, state=state, error=error)
+        logging.info(f"Job {record.update_id}: {state}{f' ({error})' if error else ''}")
+        self._record_history(record, error)
+        # The work directory may hold a large download and extracted audio
+        await asyncio.to_thread(
+            shutil.rmtree, os.path.join(self.work_dir, str(record.update_id)), ignore_errors=True
+        )
+
+    def _record_history(self, record: JobRecord, error: Optional[str]) -> None:
+        """Write the job history row of a finished job and add to its user's usage."""
+        finished_at = time.time()
+        output_chars = len(record.result) if record.result is not None else record.transcript_chars
+        try:
+            self.database.add_job_history(
+                {
+                    "update_id": record.update_id,
+                    "user_id": record.user_id,
+                    "chat_id": record.chat_id,
+                    "kind": record.kind,
+                    "media_type": record.media_type,
+                    "input_bytes": record.input_bytes,
+                    "audio_seconds": record.audio_seconds,
+                    "transcript_chars": record.transcript_chars,
+                    "output_chars": output_chars,
+                    **record.durations,
+                    "total_seconds": finished_at - record.created_at,
+                    "strategy": record.strategy,
+                    "attempts": record.attempts,
+                    "outcome": record.state,
+                    "error": error,
+                    "created_at": record.created_at,
+                    "finished_at": finished_at,
+                }
+            )
+            self.database.add_usage(
+                record.user_id,
+                jobs=1,
+                audio_seconds=record.audio_seconds or 0.0,
+                characters=record.transcript_chars or 0,
+                openai_tokens=record.openai_tokens,
+            )
+        except Exception as e:
+            logging.error(f"Error recording history of job {record.update_id}: {e}")
+
+    def prune(self) -> None:
+        """Delete finished jobs older than the retention period."""
+        deleted = self.database.delete_finished_jobs(time.time() - self.retention)
+        if deleted:
+            logging.info(f"Deleted {deleted} finished jobs older than {self.retention}s")
+
+
+# Create a global instance of JobStore
+job_store = JobStore()
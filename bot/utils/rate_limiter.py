@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled at ``rate`` tokens per second up to ``capacity``.
+
+    Callers only wait when the bucket is empty or the service asked us to back
+    off; waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        Take one token, waiting until one is available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+
+                await asyncio.sleep(wait)
+                waited += wait
+
+    def block_for(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens accumulated since the last update."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+
+class RateLimiter:
+    """
+    Per-host token-bucket rate limiter shared by all requests.
+
+    Hosts listed in ``limits`` get their own budget; any other host uses the
+    default one. A 429 response can block a host for its ``Retry-After``.
+    """
+
+    # Back-off used when a 429 response carries no usable Retry-After
+    DEFAULT_RETRY_AFTER = 30.0
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]], default_limit: Tuple[float, int]):
+        """
+        Args:
+            limits: Mapping of host to (requests per second, burst size)
+            default_limit: (requests per second, burst size) for unlisted hosts
+        """
+        self.limits = limits
+        self.default_limit = default_limit
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str) -> None:
+        """Wait until a request to the URL's host fits in its budget."""
+        host = self._get_host(url)
+        waited = await self._get_bucket(host).acquire()
+        if waited > 0:
+            logging.info(f"Rate limiter: waited {waited:.1f}s for {host}")
+
+    def retry_after(self, url: str, header: Optional[str]) -> float:
+        """
+        Honour a 429 response by blocking the host.
+
+        Args:
+            url: URL that was rate limited
+            header: Value of the Retry-After header (seconds or HTTP date)
+
+        Returns:
+            Seconds the host is blocked for
+        """
+        host = self._get_host(url)
+        delay = self._parse_retry_after(header)
+        self._get_bucket(host).block_for(delay)
+        logging.warning(f"Rate limiter: {host} returned 429, backing off for {delay:.0f}s")
+        return delay
+
+    def _get_bucket(self, host: str) -> TokenBucket:
+        """Get or create the bucket of a host."""
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, capacity = self.limits.get(host, self.default_limit)
+            bucket = self._buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _get_host(self, url: str) -> str:
+        """Extract the host from a URL (bare hosts are returned as-is)."""
+        return urlsplit(url).hostname or url
+
+    def _parse_retry_after(self, header: Optional[str]) -> float:
+        """Convert a Retry-After header into seconds."""
+        if not header:
+            return self.DEFAULT_RETRY_AFTER
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return self.DEFAULT_RETRY_AFTER
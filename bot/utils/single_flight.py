@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """In-flight execution shared by every caller of the same key."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller starts the work in its own task; later callers with the
+    same key await that task instead of repeating the work. The work keeps
+    running while at least one caller is waiting, so a cancelled caller never
+    cancels the others; once the last one leaves it is cancelled and forgotten,
+    and a caller arriving later starts afresh instead of joining a cancelled
+    execution. Errors reach every caller of that execution but are not
+    remembered: the next call after completion starts afresh.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Label used in log messages
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        """Check whether work for the key is currently running."""
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func for the key, or join the execution already running for it.
+
+        Args:
+            key: Identity of the work (e.g. a video ID)
+            func: Coroutine function performing the work
+
+        Returns:
+            The result of the shared execution
+        """
+        call = self._calls.get(key)
+        if call is None or call.task.cancelled() or call.task.cancelling():
+            call = _Call(asyncio.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task: self._forget(key, call))
+        else:
+            logging.info(f"{self.name}: joining in-flight request for {key}")
+
+        call.waiters += 1
+        try:
+            # Shield so cancelling one waiter does not cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logging.info(f"{self.name}: all waiters for {key} left, cancelling")
+                call.task.cancel()
+                # Forget it now: the done callback only runs once the task has unwound
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """Remove a finished execution from the registry."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
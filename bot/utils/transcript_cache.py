@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from bot.utils.database import db
+from bot.utils.transcript_segments import Transcript, dumps, loads
+from config.constants import (
+    TRANSCRIPT_CACHE_TTL,
+    TRANSCRIPT_CACHE_MEMORY_BYTES,
+    TRANSCRIPT_CACHE_DISK_BYTES,
+    TRANSCRIPT_CACHE_PRUNE_INTERVAL,
+    TRANSCRIPT_NEGATIVE_CACHE_TTL,
+    TRANSCRIPT_NEGATIVE_CACHE_ENTRIES,
+)
+
+
+class TranscriptCache:
+    """
+    Two-tier cache for YouTube transcripts keyed by video ID and language.
+
+    An in-memory LRU sits in front of a zlib-compressed SQLite table (segment
+    timestamps are stored along with the text). Both
+    tiers share the same TTL and are bounded by a byte budget, evicting the
+    least recently used entries first. The SQLite tier is pruned at most once
+    per prune interval rather than on every write, so it may briefly exceed
+    its budget.
+
+    Queries run on the database thread and (de)compression on a worker thread,
+    so lookups never block the event loop.
+
+    Videos known to have no transcript are remembered in memory for a short
+    negative TTL so repeated requests fail fast.
+    """
+
+    def __init__(
+        self,
+        ttl: int = TRANSCRIPT_CACHE_TTL,
+        memory_max_bytes: int = TRANSCRIPT_CACHE_MEMORY_BYTES,
+        disk_max_bytes: int = TRANSCRIPT_CACHE_DISK_BYTES,
+        negative_ttl: int = TRANSCRIPT_NEGATIVE_CACHE_TTL,
+        negative_max_entries: int = TRANSCRIPT_NEGATIVE_CACHE_ENTRIES,
+        prune_interval: float = TRANSCRIPT_CACHE_PRUNE_INTERVAL,
+    ):
+        """
+        Args:
+            ttl: Seconds a transcript stays valid
+            memory_max_bytes: Byte budget of the in-memory tier
+            disk_max_bytes: Byte budget of the compressed SQLite tier
+            negative_ttl: Seconds a "no transcript" outcome is remembered
+            negative_max_entries: Maximum number of remembered "no transcript" outcomes
+            prune_interval: Minimum seconds between prunes of the SQLite tier
+        """
+        self.ttl = ttl
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.negative_ttl = negative_ttl
+        self.negative_max_entries = negative_max_entries
+        self.prune_interval = prune_interval
+        self._pruned_at: Optional[float] = None
+
+        # (video_id, language) -> (transcript, size in bytes, created_at)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Transcript, int, float]]" = OrderedDict()
+        self._memory_bytes = 0
+
+        # video_id -> (reason, created_at), oldest first
+        self._unavailable: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    async def get(self, video_id: str, language: str) -> Optional[Transcript]:
+        """
+        Get a cached transcript.
+
+        Args:
+            video_id: YouTube video ID
+            language: Transcript language
+
+        Returns:
+            The transcript or None on a miss
+        """
+        key = (video_id, language)
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry:
+            transcript, _, created_at = entry
+            if now - created_at < self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                logging.info(f"Transcript cache hit (memory) for {video_id}/{language}")
+                return transcript
+            self._drop_from_memory(key)
+
+        row = await db.run(db.get_cached_transcript, video_id, language, now - self.ttl)
+        if row:
+            payload, created_at = row
+            try:
+                transcript = await asyncio.to_thread(_decode, payload)
+            except Exception as e:
+                logging.error(f"Corrupted cached transcript for {video_id}/{language}: {e}")
+            else:
+                self._store_in_memory(key, transcript, created_at)
+                self.disk_hits += 1
+                logging.info(f"Transcript cache hit (disk) for {video_id}/{language}")
+                return transcript
+
+        self.misses += 1
+        logging.info(f"Transcript cache miss for {video_id}/{language}")
+        return None
+
+    async def put(self, video_id: str, language: str, transcript: Transcript) -> None:
+        """
+        Store a transcript in both tiers.
+
+        Args:
+            video_id: YouTube video ID
+            language: Transcript language
+            transcript: Transcript (plain text or timed)
+        """
+        if not isinstance(transcript, Transcript):
+            transcript = Transcript(transcript)
+        key = (video_id, language)
+        self._store_in_memory(key, transcript, time.time())
+
+        payload = await asyncio.to_thread(_encode, transcript)
+        await db.run(db.put_cached_transcript, video_id, language, payload)
+        logging.info(
+            f"Cached transcript for {video_id}/{language}: "
+            f"{len(transcript):,} chars, {len(payload):,} bytes compressed"
+        )
+
+        now = time.monotonic()
+        if self._pruned_at is None or now - self._pruned_at >= self.prune_interval:
+            self._pruned_at = now
+            await db.run(db.prune_transcript_cache, self.disk_max_bytes, time.time() - self.ttl)
+
+    def get_unavailable(self, video_id: str) -> Optional[str]:
+        """
+        Check whether a video recently turned out to have no transcript.
+
+        Args:
+            video_id: YouTube video ID
+
+        Returns:
+            The recorded reason, or None if the video is not known to be unavailable
+        """
+        entry = self._unavailable.get(video_id)
+        if not entry:
+            return None
+
+        reason, created_at = entry
+        if time.time() - created_at >= self.negative_ttl:
+            del self._unavailable[video_id]
+            return None
+
+        self.negative_hits += 1
+        logging.info(f"Transcript negative cache hit for {video_id}: {reason}")
+        return reason
+
+    def mark_unavailable(self, video_id: str, reason: str) -> None:
+        """
+        Remember that a video has no transcript for the negative TTL.
+
+        Args:
+            video_id: YouTube video ID
+            reason: Why no transcript could be obtained
+        """
+        self._unavailable.pop(video_id, None)
+        self._unavailable[video_id] = (reason, time.time())
+        while len(self._unavailable) > self.negative_max_entries:
+            self._unavailable.popitem(last=False)
+        logging.info(f"Remembering {video_id} as unavailable for {self.negative_ttl}s: {reason}")
+
+    def clear_unavailable(self, video_id: str) -> None:
+        """Forget a "no transcript" outcome (e.g. on a forced refresh)."""
+        self._unavailable.pop(video_id, None)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss counters and memory usage of the cache."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+            "negative_entries": len(self._unavailable),
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    def _store_in_memory(self, key: Tuple[str, str], transcript: Transcript, created_at: float) -> None:
+        """Insert an entry in the memory tier, evicting LRU entries over budget."""
+        size = len(transcript.encode("utf-8")) + transcript.timing_nbytes
+        if size > self.memory_max_bytes:
+            return
+
+        self._drop_from_memory(key)
+        self._memory[key] = (transcript, size, created_at)
+        self._memory_bytes += size
+
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    def _drop_from_memory(self, key: Tuple[str, str]) -> None:
+        """Remove an entry from the memory tier if present."""
+        entry = self._memory.pop(key, None)
+        if entry:
+            self._memory_bytes -= entry[1]
+
+
+def _encode(transcript: Transcript) -> bytes:
+    """Serialize and compress a transcript for the SQLite tier."""
+    return zlib.compress(dumps(transcript), 6)
+
+
+def _decode(payload: bytes) -> Transcript:
+    """Decompress and deserialize a transcript from the SQLite tier."""
+    return loads(zlib.decompress(payload))
+
+
+# Create a global instance of TranscriptCache
+transcript_cache = TranscriptCache()
@@ -0,0 +1,395 @@
+import html
+import re
+from operator import sub
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bot.utils.transcript_segments import Transcript, TranscriptBuilder, join_segments
+
+# VTT file header and metadata blocks
+_VTT_HEADERS = ("WEBVTT", "NOTE", "STYLE", "REGION", "Kind:", "Language:")
+# Inline markup: VTT timestamps/classes (<00:00:01.000>, <c>) and HTML tags, never crossing segments
+_INLINE_TAG = re.compile(r"<[^>\x1f\n]*>")
+# Any entity other than the common ones handled with str.replace
+_UNCOMMON_ENTITY = re.compile(r"&(?!(?:amp|lt|gt|quot|apos|#39|#x27);)")
+# Common entities, most frequent first; &amp; is replaced after them so "&amp;lt;" becomes "&lt;" and not "<"
+_COMMON_ENTITIES = (
+    ("&#39;", "'"),
+    ("&quot;", '"'),
+    ("&lt;", "<"),
+    ("&gt;", ">"),
+    ("&#x27;", "'"),
+    ("&apos;", "'"),
+)
+
+# Field names services use for segment timings
+_START_KEYS = ("start", "offset", "start_time", "startTime")
+_DURATION_KEYS = ("duration", "dur")
+_END_KEYS = ("end", "end_time", "endTime")
+
+# Separator used to process many segments as one buffer
+_SEGMENT_SEPARATOR = "\x1f"
+
+# Texts some services return instead of real caption content
+PLACEHOLDER_TEXTS = frozenset({"No text"})
+
+
+def normalize_caption_blob(blob: str, separator: str = "\n") -> Transcript:
+    """
+    Turn a VTT or SRT document into a timed transcript.
+
+    The document is scanned once, cue by cue: cue timings become segment timestamps
+    and the lines of a cue are joined into one segment, so cues never overlap. Cue
+    identifiers and VTT headers are dropped and rolling captions are collapsed (a cue
+    repeating the previous cue's last line keeps only its new text, a repeated segment
+    extends the previous one, a segment growing by whole words replaces it). Markup
+    and HTML entities are cleaned afterwards in one pass over the kept texts.
+
+    Args:
+        blob: VTT or SRT content
+        separator: String placed between the segments
+
+    Returns:
+        Transcript with one segment per caption cue
+    """
+    if "\r" in blob:
+        blob = blob.replace("\r\n", "\n").replace("\r", "\n")
+    if "-->" not in blob:
+        lines = _collapse(_clean_buffer(blob).splitlines())
+        return Transcript(separator.join(
+            line for line in lines if not line.isdigit() and not line.startswith(_VTT_HEADERS)
+        ))
+    if "<" in blob or "\t" in blob:
+        # Auto-generated captions: padded and whitespace-only lines around the markup
+        blob = "\n".join(_strip_lines(blob))
+
+    cues = _parse_cues(blob)
+    if cues is None:
+        cues = _parse_cues(_separate_cues(blob))
+    texts, starts, ends = cues
+    if not texts:
+        return Transcript("")
+
+    joined = _SEGMENT_SEPARATOR.join(texts)
+    cleaned = _clean_buffer(joined)
+    texts = cleaned.split(_SEGMENT_SEPARATOR)
+    if "<" in joined or "  " in cleaned:
+        # Markup hid repeats from the comparison of the raw lines
+        texts, starts, ends = _collapse_cues(texts, starts, ends)
+    else:
+        texts = list(map(str.strip, texts))
+        if "" in texts or not PLACEHOLDER_TEXTS.isdisjoint(texts):
+            texts, starts, ends = _collapse_cues(texts, starts, ends)
+    return join_segments(texts, starts, map(sub, ends, starts), separator)
+
+
+def normalize_segments(
+    segments: Iterable[Any], key: str = "text", separator: str = " ", time_scale: float = 1.0
+) -> Transcript:
+    """
+    Join a list of caption segments into a transcript.
+
+    Segments may be dicts (``segment[key]``) or objects (``segment.<key>``). When
+    they carry timings (start plus duration or end) the result is timed. All texts
+    are cleaned as one buffer; placeholder texts are skipped and consecutive
+    duplicate captions collapsed.
+
+    Args:
+        segments: Caption segments as returned by a service
+        key: Name of the field holding the segment text
+        separator: String placed between segments
+        time_scale: Factor applied to timings (e.g. the speed-up of the audio)
+
+    Returns:
+        Transcript of the segments
+    """
+    texts = []
+    timings: Optional[List[Tuple[float, float]]] = []
+    for segment in segments:
+        text = _get_field(segment, key)
+        if not text:
+            continue
+        texts.append(text)
+        if timings is not None:
+            timing = _get_timing(segment)
+            if timing is None:
+                timings = None
+            else:
+                timings.append(timing)
+
+    if not texts:
+        return Transcript("")
+
+    lines = _clean_buffer(_SEGMENT_SEPARATOR.join(texts)).split(_SEGMENT_SEPARATOR)
+    if timings is None:
+        return Transcript(separator.join(_collapse(lines)))
+
+    builder = TranscriptBuilder(separator)
+    last = None
+    for line, (start, duration) in zip(lines, timings):
+        line = line.strip()
+        if "  " in line or "\t" in line:
+            line = " ".join(line.split())
+        if not line or line in PLACEHOLDER_TEXTS:
+            continue
+        if line == last:
+            builder.extend_last((start + duration) * time_scale)
+            continue
+        builder.add(line, start * time_scale, duration * time_scale)
+        last = line
+    return builder.build()
+
+
+def normalize_text(text: str) -> Transcript:
+    """
+    Clean an already assembled transcript, keeping its line structure.
+
+    Args:
+        text: Transcript text
+
+    Returns:
+        Untimed transcript with markup removed, entities unescaped and blank or repeated lines dropped
+    """
+    return Transcript("\n".join(_collapse(_clean_buffer(text).splitlines())))
+
+
+def _parse_cues(blob: str) -> Optional[Tuple[List[str], List[float], List[float]]]:
+    """
+    Collect the text, start and end of each cue, collapsing rolling captions.
+
+    Returns:
+        (texts, starts, ends), or None if some cues are not separated by blank lines
+    """
+    texts: List[str] = []
+    starts: List[float] = []
+    ends: List[float] = []
+    # Seconds of each "HH:MM:" timestamp prefix seen, so most timestamps cost a float()
+    prefixes: Dict[str, float] = {}
+    last_line = end_text = None
+    end = 0.0
+    # Text of the last segment; no caption starts with a line break, so nothing extends the initial value
+    last_text = "\n"
+
+    for block in blob.split("\n\n"):
+        lines = block.split("\n")
+        # Index of the first text line, right after the timing line
+        if "-->" in lines[0]:
+            first = 1
+        elif len(lines) > 1 and "-->" in lines[1]:
+            first = 2
+        else:
+            first = _timing_index(lines)
+            if first is None:
+                continue
+            first += 1
+
+        timing_line = lines[first - 1]
+        if "," in timing_line:
+            timing_line = timing_line.replace(",", ".")
+        start_text, arrow, next_end_text = timing_line.partition(" --> ")
+        if not arrow:
+            start_text, next_end_text = _split_timing(timing_line)
+        elif " " in next_end_text:
+            # VTT cue settings ("align:start position:0%")
+            next_end_text = next_end_text.partition(" ")[0]
+        try:
+            # Rolling captions start each cue where the previous one ended
+            start = end if start_text == end_text else _timestamp_seconds(start_text, prefixes)
+            base = prefixes.get(next_end_text[:-6])
+            if base is None:
+                end = _timestamp_seconds(next_end_text, prefixes)
+            else:
+                end = base + float(next_end_text[-6:])
+        except ValueError:
+            end_text = None
+            continue
+        end_text = next_end_text
+
+        count = len(lines)
+        if first < count and lines[first] == last_line:
+            first += 1
+        if first == count:
+            if ends and end > ends[-1]:
+                ends[-1] = end
+            continue
+        last_line = lines[-1]
+        text = lines[first] if first + 1 == count else " ".join(lines[first:])
+        if "-->" in text:
+            return None
+
+        # A repeated segment extends the previous one, a segment growing by whole words replaces it
+        if text.startswith(last_text) and (len(text) == len(last_text) or text[len(last_text)] == " "):
+            texts[-1] = text
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            texts.append(text)
+            starts.append(start)
+            ends.append(end)
+        last_text = text
+
+    return texts, starts, ends
+
+
+def _collapse_cues(
+    texts: List[str], starts: List[float], ends: List[float]
+) -> Tuple[List[str], List[float], List[float]]:
+    """Normalize the whitespace of cleaned cue texts, dropping empty and placeholder ones and collapsing repeats."""
+    kept_texts: List[str] = []
+    kept_starts: List[float] = []
+    kept_ends: List[float] = []
+    last = "\n"
+    for text, start, end in zip(texts, starts, ends):
+        text = " ".join(text.split())
+        if not text or text in PLACEHOLDER_TEXTS:
+            continue
+        if text.startswith(last) and (len(text) == len(last) or text[len(last)] == " "):
+            kept_texts[-1] = text
+            kept_ends[-1] = max(kept_ends[-1], end)
+        else:
+            kept_texts.append(text)
+            kept_starts.append(start)
+            kept_ends.append(end)
+        last = text
+    return kept_texts, kept_starts, kept_ends
+
+
+def _timing_index(lines: List[str]) -> Optional[int]:
+    """Find the timing line of a block that starts with stray blank lines, or None if it holds no cue."""
+    index = 0
+    while index < len(lines) and not lines[index]:
+        index += 1
+    for index in (index, index + 1):
+        if index < len(lines) and "-->" in lines[index]:
+            return index
+    return None
+
+
+def _separate_cues(blob: str) -> str:
+    """Put a blank line before every cue, keeping a numeric identifier with its timing line."""
+    lines: List[str] = []
+    for line in _strip_lines(blob):
+        if "-->" in line:
+            identifier = lines.pop() if lines and lines[-1].isdigit() else None
+            if lines and lines[-1]:
+                lines.append("")
+            if identifier is not None:
+                lines.append(identifier)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _strip_lines(blob: str) -> List[str]:
+    """Strip the lines of a document, dropping whitespace-only ones so they don't turn into cue separators."""
+    lines = blob.split("\n")
+    return [stripped for line, stripped in zip(lines, map(str.strip, lines)) if stripped or not line]
+
+
+def _split_timing(line: str) -> Tuple[str, str]:
+    """Get the start and end timestamps of a cue timing line, dropping VTT cue settings."""
+    start_text, _, end_text = line.partition("-->")
+    end_text = end_text.split(None, 1)
+    return start_text.strip(), end_text[0] if end_text else ""
+
+
+def _timestamp_seconds(value: str, prefixes: Dict[str, float]) -> float:
+    """
+    Parse an [HH:]MM:SS.mmm timestamp, memoizing the seconds of its "HH:MM:" prefix.
+
+    Raises:
+        ValueError: If the value is not a timestamp
+    """
+    seconds = value[-6:]
+    if seconds[2:3] != ".":
+        raise ValueError(f"Invalid timestamp: {value}")
+    prefix = value[:-6]
+    base = prefixes.get(prefix)
+    if base is None:
+        parts = prefix.split(":")
+        if len(parts) not in (2, 3) or parts[-1]:
+            raise ValueError(f"Invalid timestamp: {value}")
+        base = 0
+        for part in parts[:-1]:
+            base = base * 60 + int(part)
+        base = prefixes[prefix] = base * 60.0
+    return base + float(seconds)
+
+
+def _clean_buffer(text: str) -> str:
+    """Strip inline markup and unescape HTML entities, one pass over the buffer each."""
+    if "<" in text:
+        text = _INLINE_TAG.sub("", text)
+    if "&" not in text:
+        return text
+    if _UNCOMMON_ENTITY.search(text):
+        return html.unescape(text)
+    # Count the entities so the search stops once every "&" is accounted for
+    amps = text.count("&amp;")
+    remaining = text.count("&") - amps
+    for entity, char in _COMMON_ENTITIES:
+        if not remaining:
+            break
+        found = text.count(entity)
+        if found:
+            text = text.replace(entity, char)
+            remaining -= found
+    if amps:
+        text = text.replace("&amp;", "&")
+    return text
+
+
+def _collapse(lines: Iterable[str]) -> List[str]:
+    """Normalize whitespace of each line and drop empty, placeholder and repeated lines."""
+    result: List[str] = []
+    last = None
+    for line in lines:
+        line = line.strip()
+        if "  " in line or "\t" in line:
+            line = " ".join(line.split())
+        if not line or line == last or line in PLACEHOLDER_TEXTS:
+            continue
+        result.append(line)
+        last = line
+    return result
+
+
+def _get_field(segment: Any, name: str) -> Any:
+    """Read a field of a dict or object segment."""
+    if isinstance(segment, dict):
+        return segment.get(name)
+    return getattr(segment, name, None)
+
+
+def _get_timing(segment: Any) -> Optional[Tuple[float, float]]:
+    """Read (start, duration) of a segment, or None if it has no usable timing."""
+    start = None
+    for name in _START_KEYS:
+        start = _parse_seconds(_get_field(segment, name))
+        if start is not None:
+            break
+    else:
+        return None
+
+    for keys, is_end in ((_DURATION_KEYS, False), (_END_KEYS, True)):
+        for name in keys:
+            value = _parse_seconds(_get_field(segment, name))
+            if value is not None:
+                return start, max(value - start, 0.0) if is_end else value
+    return start, 0.0
+
+
+def _parse_seconds(value: Any) -> Optional[float]:
+    """Parse seconds given as a number, a numeric string or an [HH:]MM:SS[.mmm] timestamp."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        seconds = 0.0
+        for part in str(value).replace(",", ".").split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
@@ -0,0 +1,218 @@
+import json
+import struct
+from array import array
+from itertools import accumulate, count
+from operator import add
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+# Header of serialized timed transcripts: magic, segment count, separator length
+_MAGIC = b"TSEG1"
+_HEADER = struct.Struct("<5sII")
+
+
+class Transcript(str):
+    """
+    Transcript text with optional per-segment timestamps.
+
+    The text is the segment texts joined by ``separator``. Timings are kept in
+    parallel arrays instead of per-segment objects: ``starts`` and ``durations``
+    in seconds, and ``offsets`` with the position of each segment in the text
+    (plus a final sentinel). Being a ``str``, a Transcript can be used wherever
+    plain transcript text is expected; string operations return plain ``str``.
+    """
+
+    # Set when the source returned only part of the transcript (e.g. pages missing)
+    partial = False
+
+    def __new__(
+        cls,
+        text: str = "",
+        starts: Optional[array] = None,
+        durations: Optional[array] = None,
+        offsets: Optional[array] = None,
+        separator: str = " ",
+    ):
+        transcript = super().__new__(cls, text)
+        transcript.starts = starts if starts is not None else array("d")
+        transcript.durations = durations if durations is not None else array("d")
+        transcript.offsets = offsets if offsets is not None else array("I")
+        transcript.separator = separator
+        return transcript
+
+    @property
+    def segment_count(self) -> int:
+        """Number of timed segments."""
+        return len(self.starts)
+
+    @property
+    def has_timestamps(self) -> bool:
+        """Whether the transcript carries segment timings."""
+        return len(self.starts) > 0
+
+    @property
+    def timing_nbytes(self) -> int:
+        """Memory used by the timing arrays."""
+        return sum(a.itemsize * len(a) for a in (self.starts, self.durations, self.offsets))
+
+    def segment_text(self, index: int) -> str:
+        """Get the text of one segment."""
+        return self[self.offsets[index]:self.offsets[index + 1] - len(self.separator)]
+
+    def iter_segments(self) -> Iterator[Tuple[float, float, str]]:
+        """Yield (start, duration, text) for each segment, slicing texts lazily."""
+        offsets = self.offsets
+        separator_length = len(self.separator)
+        for index, (start, duration) in enumerate(zip(self.starts, self.durations)):
+            yield start, duration, self[offsets[index]:offsets[index + 1] - separator_length]
+
+
+class TranscriptBuilder:
+    """
+    Incrementally build a Transcript from segments.
+
+    If any segment lacks timing the result is a plain (untimed) Transcript.
+    """
+
+    def __init__(self, separator: str = " "):
+        """
+        Args:
+            separator: String placed between segment texts
+        """
+        self.separator = separator
+        self._parts = []
+        self._starts = array("d")
+        self._durations = array("d")
+        self._offsets = array("I")
+        self._length = 0
+        self._timed = True
+
+    def __len__(self) -> int:
+        return len(self._parts)
+
+    def add(self, text: str, start: Optional[float] = None, duration: Optional[float] = None) -> None:
+        """Append a segment."""
+        if start is None:
+            self._timed = False
+            start = duration = 0.0
+        self._offsets.append(self._length)
+        self._parts.append(text)
+        self._starts.append(start)
+        self._durations.append(duration or 0.0)
+        self._length += len(text) + len(self.separator)
+
+    def replace_last(self, text: str, end: Optional[float] = None) -> None:
+        """Replace the text of the last segment (e.g. a growing caption), optionally extending it."""
+        self._length += len(text) - len(self._parts[-1])
+        self._parts[-1] = text
+        if end is not None:
+            self.extend_last(end)
+
+    def extend_last(self, end: Optional[float]) -> None:
+        """Make the last segment last at least until ``end``."""
+        if end is not None and self._parts:
+            self._durations[-1] = max(self._durations[-1], end - self._starts[-1])
+
+    def build(self) -> Transcript:
+        """Join the segments into a Transcript."""
+        text = self.separator.join(self._parts)
+        if not self._timed or not self._parts:
+            return Transcript(text)
+        offsets = self._offsets
+        offsets.append(self._length)
+        return Transcript(text, self._starts, self._durations, offsets, self.separator)
+
+
+def join_segments(texts: List[str], starts: Iterable[float], durations: Iterable[float], separator: str = " ") -> Transcript:
+    """
+    Build a timed Transcript from parallel lists of segment texts and timings in one go.
+
+    Args:
+        texts: Segment texts
+        starts: Start of each segment in seconds
+        durations: Duration of each segment in seconds
+        separator: String placed between segment texts
+
+    Returns:
+        Timed transcript, or an empty one if there are no segments
+    """
+    if not texts:
+        return Transcript("")
+    # Offset of segment i: the lengths of the texts before it plus i separators
+    offsets = array("I", map(add, accumulate(map(len, texts), initial=0), count(0, len(separator))))
+    return Transcript(separator.join(texts), array("d", starts), array("d", durations), offsets, separator)
+
+
+def write_srt(transcript: Transcript, fp: IO[str]) -> None:
+    """Stream a timed transcript as SRT into a text file."""
+    for index, (start, duration, text) in enumerate(transcript.iter_segments(), 1):
+        fp.write(
+            f"{index}\n{_format_timestamp(start, ',')} --> {_format_timestamp(start + duration, ',')}\n{text}\n\n"
+        )
+
+
+def write_vtt(transcript: Transcript, fp: IO[str]) -> None:
+    """Stream a timed transcript as WebVTT into a text file."""
+    fp.write("WEBVTT\n\n")
+    for start, duration, text in transcript.iter_segments():
+        fp.write(f"{_format_timestamp(start, '.')} --> {_format_timestamp(start + duration, '.')}\n{text}\n\n")
+
+
+def write_json(transcript: Transcript, fp: IO[str]) -> None:
+    """Stream a timed transcript as ``{"segments": [{"start", "duration", "text"}, ...]}``."""
+    fp.write('{"segments": [')
+    for index, (start, duration, text) in enumerate(transcript.iter_segments()):
+        if index:
+            fp.write(", ")
+        fp.write(f'{{"start": {start:.3f}, "duration": {duration:.3f}, "text": {json.dumps(text, ensure_ascii=False)}}}')
+    fp.write("]}")
+
+
+def dumps(transcript: str) -> bytes:
+    """
+    Serialize a transcript for storage.
+
+    Untimed transcripts are stored as plain UTF-8, so existing payloads stay valid.
+    Timed ones get a header followed by the raw arrays (native byte order) and the text.
+    """
+    if not isinstance(transcript, Transcript) or not transcript.has_timestamps:
+        return transcript.encode("utf-8")
+
+    separator = transcript.separator.encode("utf-8")
+    return b"".join((
+        _HEADER.pack(_MAGIC, transcript.segment_count, len(separator)),
+        separator,
+        transcript.starts.tobytes(),
+        transcript.durations.tobytes(),
+        transcript.offsets.tobytes(),
+        transcript.encode("utf-8"),
+    ))
+
+
+def loads(data: bytes) -> Transcript:
+    """Deserialize a transcript stored with ``dumps``."""
+    if not data.startswith(_MAGIC):
+        return Transcript(data.decode("utf-8"))
+
+    _, count, separator_length = _HEADER.unpack_from(data)
+    position = _HEADER.size
+    separator = data[position:position + separator_length].decode("utf-8")
+    position += separator_length
+
+    arrays = []
+    for typecode, length in (("d", count), ("d", count), ("I", count + 1)):
+        values = array(typecode)
+        size = values.itemsize * length
+        values.frombytes(data[position:position + size])
+        arrays.append(values)
+        position += size
+
+    return Transcript(data[position:].decode("utf-8"), *arrays, separator=separator)
+
+
+def _format_timestamp(seconds: float, decimal_mark: str) -> str:
+    """Format seconds as HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (VTT)."""
+    milliseconds = int(round(max(seconds, 0.0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_mark}{milliseconds:03d}"
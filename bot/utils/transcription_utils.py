@@ -3,10 +3,29 @@ import logging
 from telegram import Message
 import asyncio
 import tempfile
-from config.constants import CHUNK_SIZE, YOUTUBE_REGEX, PAUSE_BETWEEN_CHUNKS
+from typing import List, Optional
+from config.constants import (
+    CHUNK_SIZE,
+    YOUTUBE_REGEX,
+    YOUTUBE_PLAYLIST_REGEX,
+    PAUSE_BETWEEN_CHUNKS,
+    JOB_DEFAULT_COST,
+    JOB_YOUTUBE_COST,
+    JOB_DOWNLOAD_RATE,
+    JOB_TRANSCRIBE_RATIO,
+    YOUTUBE_BATCH_CONCURRENCY,
+    YOUTUBE_BATCH_MAX_VIDEOS,
+)
 from bot.services.openai_service import openai_service
 import os
-from config.bot_config import bot_config
+from config.bot_config import bot_config, ChatSettings
+from bot.utils.database import db
+from bot.utils.single_flight import SingleFlight
+from bot.utils.concurrency import ffmpeg_pool, download_pool
+from bot.utils.transcript_segments import Transcript, write_srt
+
+# Identical audio/video files being transcribed, keyed by Telegram file_unique_id and speed
+media_transcriptions = SingleFlight("Media transcription")
 
 
 def extract_video_id(youtube_url):
@@ -17,9 +36,82 @@ def extract_video_id(youtube_url):
     return None
 
 
-async def transcribe_audio(file_path):
-    """Transcribe an audio file using OpenAI's Whisper model."""
-    return await openai_service.transcribe_audio(file_path)
+def extract_video_ids(text: str) -> List[str]:
+    """Extract the IDs of every YouTube link in a text, in order and without duplicates."""
+    # Every YOUTUBE_REGEX match ends with the 11-character video ID
+    return list(dict.fromkeys(match.group()[-11:] for match in YOUTUBE_REGEX.finditer(text or "")))
+
+
+def extract_playlist_id(text: str, include_watch_urls: bool = False) -> Optional[str]:
+    """
+    Extract the playlist ID of the first YouTube playlist link in a text.
+
+    Args:
+        text: Text to search
+        include_watch_urls: Also accept video links that carry a playlist (``watch?v=...&list=...``);
+            by default only playlist pages count, so those links keep meaning a single video
+
+    Returns:
+        The playlist ID, or None
+    """
+    for match in YOUTUBE_PLAYLIST_REGEX.finditer(text or ""):
+        if match.group(1) == "playlist" or include_watch_urls:
+            return match.group(2)
+    return None
+
+
+async def get_settings(job, chat_id: int) -> ChatSettings:
+    """Settings snapshot of a job, or the current settings of the chat when there is no job."""
+    if job:
+        return await job.get_settings()
+    return await db.run(bot_config.settings_for, chat_id)
+
+
+def estimate_job_cost(message: Message, speed: Optional[int] = None) -> float:
+    """
+    Estimate the seconds needed to transcribe a message, before downloading anything.
+
+    Telegram reports the size and duration of audio, voice and video messages, so
+    their cost is download time plus transcription time of the sped-up audio.
+    YouTube links count a fixed cost per round of the batch concurrency.
+
+    Args:
+        message: Telegram message to transcribe
+        speed: Transcription speed of the chat (default: the global setting)
+
+    Returns:
+        Estimated processing time in seconds
+    """
+    media = message.video or message.audio or message.voice
+    if media:
+        speed = speed or bot_config.transcription_speed or 1
+        return (
+            JOB_DEFAULT_COST
+            + (media.file_size or 0) / JOB_DOWNLOAD_RATE
+            + (media.duration or 0) / speed * JOB_TRANSCRIBE_RATIO
+        )
+
+    text = message.text or message.caption or ""
+    videos = len(extract_video_ids(text))
+    if extract_playlist_id(text):
+        videos = YOUTUBE_BATCH_MAX_VIDEOS
+    if videos:
+        rounds = -(-min(videos, YOUTUBE_BATCH_MAX_VIDEOS) // YOUTUBE_BATCH_CONCURRENCY) if videos > 1 else 1
+        return JOB_YOUTUBE_COST * rounds
+    return JOB_DEFAULT_COST
+
+
+async def download_telegram_file(bot, file_id: str, path: str) -> None:
+    """Download a Telegram file to a local path, within the download concurrency limit."""
+    async with download_pool:
+        file = await bot.get_file(file_id)
+        logging.info(f"Retrieved file info: {file.file_path}")
+        await file.download_to_drive(custom_path=path)
+
+
+async def transcribe_audio(file_path, time_scale=1.0):
+    """Transcribe an audio file using OpenAI's Whisper model (timestamps scaled by time_scale)."""
+    return await openai_service.transcribe_audio(file_path, time_scale)
 
 
 async def post_process_transcription(transcription):
@@ -74,7 +166,36 @@ async def send_transcription_file(
             logging.error(f"Error al eliminar el archivo temporal: {e}")
 
 
-async def process_media(message, transcription, original_message, content_type="video", status_message=None):
+async def send_subtitle_file(message: Message, transcript: Transcript):
+    """
+    Envía la transcripción como archivo de subtítulos SRT.
+    El archivo se escribe segmento a segmento, sin copias del texto completo.
+    """
+    temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix=".srt").name
+    try:
+        with open(temp_file_path, "w", encoding="utf-8") as f:
+            write_srt(transcript, f)
+        logging.info(
+            f"Archivo de subtítulos creado en: {temp_file_path} ({transcript.segment_count} segmentos)"
+        )
+
+        with open(temp_file_path, "rb") as file:
+            await message.chat.send_document(
+                document=file,
+                filename="subtitulos.srt",
+                caption="🎞️ Subtítulos con marcas de tiempo.",
+            )
+        logging.info("Archivo de subtítulos enviado correctamente.")
+    finally:
+        try:
+            os.unlink(temp_file_path)
+        except Exception as e:
+            logging.error(f"Error al eliminar el archivo temporal: {e}")
+
+
+async def process_media(
+    message, transcription, original_message, content_type="video", status_message=None, job=None, settings=None
+):
     """
     Process media content by handling transcription, chunking, and optional summarization.
 
@@ -84,17 +205,28 @@ async def process_media(message, transcription, original_message, content_type="
         original_message: The original message being processed
         content_type: Type of media being processed (video/audio/youtube)
         status_message: Optional status message to delete after processing
+        job: Optional persistent job; the enhanced text is saved so a resumed job skips enhancement
+        settings: Settings to apply (default: the job's snapshot, or the chat's current settings)
     """
     chat_id = message.chat.id
     user_id = message.from_user.id
+    settings = settings or await get_settings(job, chat_id)
+    # The subtitle file uses the original timestamps (enhancement returns plain text)
+    timed_transcription = transcription
 
     try:
         logging.info(
             f"Processing {content_type} media for user {user_id} in chat {chat_id}"
         )
 
+        if job and job.result is not None:
+            logging.info(f"Job {job.update_id} was post-processed before the restart, delivering")
+            transcription = job.result
+
         # Enhanced transcription processing if enabled
-        if bot_config.enhanced_transcription_enabled:
+        elif settings.enhanced_transcription_enabled:
+            if job:
+                await job.set_state("post-processing")
             logging.info("Enhanced transcription enabled, post-processing text")
 
             # Update status message instead of creating new one
@@ -125,9 +257,24 @@ async def process_media(message, transcription, original_message, content_type="
                         "🤖 Continuando con transcripción original\n"
                         f"📄 {len(transcription):,} caracteres"
                     )
+            if job:
+                await job.save_result(transcription)
+
+        if job:
+            await job.set_state("delivering")
+
+        if (
+            settings.subtitle_file_enabled
+            and isinstance(timed_transcription, Transcript)
+            and timed_transcription.has_timestamps
+        ):
+            try:
+                await send_subtitle_file(message, timed_transcription)
+            except Exception as e:
+                logging.error(f"Error sending subtitle file: {e}")
 
         # Handle text file output if enabled
-        if bot_config.output_text_file_enabled:
+        if settings.output_text_file_enabled:
             logging.info("Text file output enabled, preparing file")
 
             # Update status message instead of creating new one
@@ -224,14 +371,15 @@ def get_file_size(file_path):
         size_bytes /= 1024.0
 
 
-async def compress_audio(input_path, output_path):
-    """Compress audio using ffmpeg with Opus codec and apply transcription speed."""
+async def compress_audio(input_path, output_path, speed=None):
+    """Compress audio using ffmpeg with Opus codec and apply transcription speed (default: the global setting)."""
     try:
         input_size = get_file_size(input_path)
         logging.info(f"Compressing audio. Input file size: {input_size}")
 
-        # Get transcription speed from config
-        speed = bot_config.transcription_speed
+        # The caller passes the speed of the job's settings snapshot
+        if speed is None:
+            speed = bot_config.transcription_speed
         logging.info(f"Applying transcription speed: x{speed}")
 
         # Construir el comando de ffmpeg con filtro de velocidad
@@ -262,13 +410,14 @@ async def compress_audio(input_path, output_path):
 
         cmd.append(output_path)
 
-        # Ejecutar ffmpeg de manera asíncrona
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
+        # Ejecutar ffmpeg de manera asíncrona, limitado al número de núcleos
+        async with ffmpeg_pool:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
 
-        # Esperar a que el proceso termine
-        stdout, stderr = await process.communicate()
+            # Esperar a que el proceso termine
+            stdout, stderr = await process.communicate()
 
         # Verificar si el proceso terminó correctamente
         if process.returncode != 0:
@@ -306,13 +455,14 @@ async def extract_audio(input_path, output_path):
             output_path,
         ]
 
-        # Ejecutar ffmpeg de manera asíncrona
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
+        # Ejecutar ffmpeg de manera asíncrona, limitado al número de núcleos
+        async with ffmpeg_pool:
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
 
-        # Esperar a que el proceso termine
-        stdout, stderr = await process.communicate()
+            # Esperar a que el proceso termine
+            stdout, stderr = await process.communicate()
 
         # Verificar si el proceso terminó correctamente
         if process.returncode != 0:
@@ -0,0 +1,73 @@
+import logging
+import time
+from typing import Dict, Optional
+from bot.utils.database import db
+from config.constants import USERS_REFRESH_INTERVAL
+
+
+class UserIndex:
+    """
+    In-memory copy of the users table: every known user and whether they are authorized.
+
+    Admission checks of known users are answered from memory. A user seen for the
+    first time is registered with one upsert that also returns their authorization.
+    The copy is reloaded every ``refresh_interval`` seconds, in a single query, to
+    pick up authorizations granted outside this process.
+    """
+
+    def __init__(self, database=db, refresh_interval: float = USERS_REFRESH_INTERVAL):
+        """
+        Args:
+            database: Database holding the users table
+            refresh_interval: Seconds the copy is used before it is reloaded
+        """
+        self.database = database
+        self.refresh_interval = refresh_interval
+        # user_id -> authorized
+        self._users: Dict[str, bool] = {}
+        self._loaded_at: Optional[float] = None
+
+    async def reload(self) -> None:
+        """Load every user from the database."""
+        users = await self.database.run(self.database.get_users)
+        # Keep the previous copy if the database could not be read
+        if users or not self._users:
+            self._users = users
+        self._loaded_at = time.monotonic()
+        logging.debug(f"User index loaded: {len(self._users)} users")
+
+    async def admit(self, user_id) -> bool:
+        """
+        Register a user on first contact and tell whether they are authorized.
+
+        Args:
+            user_id: Telegram user ID
+
+        Returns:
+            Whether the user is authorized
+        """
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            await self.reload()
+
+        key = str(user_id)
+        authorized = self._users.get(key)
+        if authorized is None:
+            authorized = await self.database.run(self.database.register_user, key)
+            if authorized is None:
+                return False
+            self._users[key] = authorized
+            logging.info(f"New user registered: {user_id}")
+        return authorized
+
+    def authorize(self, user_ids) -> None:
+        """Authorize users in the database and in the index (write-through)."""
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return
+        self.database.add_authorized_users(user_ids)
+        for user_id in user_ids:
+            self._users[user_id] = True
+
+
+# Create a global instance of UserIndex
+user_index = UserIndex()
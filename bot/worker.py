@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Optional
+from telegram.ext import ApplicationBuilder
+from .handlers import restore_job, JOB_HANDLERS
+from config.bot_config import bot_config
+from config.constants import JOB_WORKERS, JOB_POLL_INTERVAL, JOB_WORKER_TIMEOUT
+from bot.services.youtube_transcript_service import youtube_transcript_extractor
+from bot.utils.database import db
+from bot.utils.job_broker import job_broker
+from bot.utils.job_store import job_store
+from bot.utils.concurrency import report_pool_stats, log_pool_stats
+
+
+class Worker:
+    """
+    Worker process: claims jobs from the job broker and processes them.
+
+    The front end process keeps the only polling connection to Telegram; workers
+    send their results straight to the users through the Bot API, which any number
+    of processes may use, and record the outcome of each job in the jobs table.
+    Start as many worker processes as needed, on this host or on others sharing
+    the database file.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        slots: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        heartbeat_interval: float = JOB_WORKER_TIMEOUT / 3,
+    ):
+        """
+        Args:
+            worker_id: Identity of the worker in the jobs table (default: host and process ID)
+            slots: Number of jobs processed at the same time
+            poll_interval: Seconds between polls of the broker when it is empty
+            heartbeat_interval: Seconds between heartbeats
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.slots = max(1, slots)
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+
+    async def run(self) -> None:
+        """Process jobs until the process receives SIGINT or SIGTERM."""
+        application = (
+            ApplicationBuilder()
+            .token(bot_config.bot_token)
+            .read_timeout(30)
+            .write_timeout(30)
+            .connect_timeout(30)
+            .build()
+        )
+        await application.initialize()
+        application.bot_data["role"] = "worker"
+        await youtube_transcript_extractor.start()
+        await db.run(job_broker.heartbeat, self.worker_id, self.slots)
+        logging.info(f"Worker {self.worker_id}: started with {self.slots} slots")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        tasks = [
+            asyncio.create_task(self._heartbeat()),
+            asyncio.create_task(report_pool_stats()),
+            asyncio.create_task(bot_config.refresh_settings()),
+            *(asyncio.create_task(self._slot(application, number)) for number in range(1, self.slots + 1)),
+        ]
+        try:
+            await stop.wait()
+        finally:
+            logging.info(f"Worker {self.worker_id}: stopping")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Interrupted jobs keep their saved stages and are resumed by another worker
+            await db.run(job_broker.release, self.worker_id)
+            log_pool_stats()
+            await youtube_transcript_extractor.close()
+            await application.shutdown()
+            db.close()
+
+    async def _heartbeat(self) -> None:
+        """Tell the broker the worker is alive, forever."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await db.run(job_broker.heartbeat, self.worker_id, self.slots)
+
+    async def _slot(self, application, number: int) -> None:
+        """Claim and process jobs one at a time, forever."""
+        while True:
+            record = await db.run(job_broker.claim, self.worker_id)
+            if record is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            restored = await restore_job(record, application)
+            if not restored:
+                continue
+            update, context = restored
+            handler = JOB_HANDLERS[record.kind]
+            logging.info(
+                f"Worker {self.worker_id}: slot {number} running job {record.update_id} "
+                f"({record.kind}, state {record.state})"
+            )
+            try:
+                await job_store.run(record, lambda: handler(update, context, record))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Worker {self.worker_id}: error running job {record.update_id}: {e}", exc_info=True)
+
+
+def run_worker():
+    # Run a worker process until it is stopped
+    asyncio.run(Worker().run())
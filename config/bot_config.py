@@ -1,58 +1,167 @@
+import asyncio
+import logging
 import os
+from typing import Dict, Optional
 from dotenv import load_dotenv
 from bot.utils.database import db
+from bot.utils.user_index import user_index
+from config.constants import SETTINGS_REFRESH_INTERVAL
 
 
-class BotConfig:
-    def __init__(self):
-        # Load environment variables from .env file, overriding existing variables
-        load_dotenv(override=True)
-        # Get API keys from environment variables
-        self.bot_token = os.getenv("BOT_TOKEN")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        # Load authorized users from environment variable
-        self.authorized_users = os.getenv("AUTHORIZED_USERS", "").split(",")
+class SettingsView:
+    """Typed access to the bot settings, read from ``values`` (setting key -> value)."""
+
+    values: Dict[str, int]
+
+    def _setting(self, key: str, default: int) -> int:
+        return self.values.get(key, default)
 
     @property
     def auto_transcription_enabled(self) -> bool:
-        return db.get_setting("auto_transcription_enabled")
+        return bool(self._setting("auto_transcription_enabled", 0))
 
     @property
     def enhanced_transcription_enabled(self) -> bool:
-        return db.get_setting("enhanced_transcription_enabled")
+        return bool(self._setting("enhanced_transcription_enabled", 0))
 
     @property
     def output_text_file_enabled(self) -> bool:
-        return db.get_setting("output_text_file_enabled")
+        return bool(self._setting("output_text_file_enabled", 0))
+
+    @property
+    def subtitle_file_enabled(self) -> bool:
+        return bool(self._setting("subtitle_file_enabled", 0))
 
     @property
     def transcription_speed(self) -> int:
-        return db.get_int_setting("transcription_speed")
+        return self._setting("transcription_speed", 1)
 
-    def toggle_auto_transcription(self):
-        return db.toggle_setting("auto_transcription_enabled")
+    def get_transcription_speed_text(self) -> str:
+        speed = self.transcription_speed
+        return f"x{speed}"
+
+
+class ChatSettings(SettingsView):
+    """
+    Settings of one chat, resolved once: the global defaults with the chat's overrides.
+
+    A job keeps the snapshot taken when it was accepted, so settings changed while
+    it waits or runs only apply to later requests.
+    """
 
-    def toggle_enhanced_transcription(self):
-        return db.toggle_setting("enhanced_transcription_enabled")
+    def __init__(self, chat_id: int, values: Dict[str, int]):
+        """
+        Args:
+            chat_id: Telegram chat ID
+            values: Setting key -> value
+        """
+        self.chat_id = chat_id
+        self.values = dict(values)
 
-    def toggle_output_text_file(self):
-        return db.toggle_setting("output_text_file_enabled")
 
-    def set_transcription_speed(self, speed: int):
+class BotConfig(SettingsView):
+    """
+    Bot configuration: credentials from the environment and the global settings.
+
+    The properties return the global settings, which are the defaults of every
+    chat; ``settings_for`` gives the settings of one chat, with its overrides.
+    """
+
+    def __init__(self):
+        # Load environment variables from .env file, overriding existing variables
+        load_dotenv(override=True)
+        # Get API keys from environment variables
+        self.bot_token = os.getenv("BOT_TOKEN")
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        # Load authorized users from environment variable
+        # (comma-separated; spaces and empty entries are ignored)
+        self.authorized_users = [
+            user_id.strip() for user_id in os.getenv("AUTHORIZED_USERS", "").split(",") if user_id.strip()
+        ]
+        # In-memory snapshot of the settings table, updated write-through
+        # and refreshed by refresh_settings; the properties only read it
+        self.values = {}
+        self.reload_settings()
+
+    def reload_settings(self) -> None:
+        """Load every setting from the database in a single query."""
+        settings = db.get_all_settings()
+        # Keep serving the previous snapshot if the database could not be read
+        if settings or not self.values:
+            self.values = settings
+
+    async def refresh_settings(self, interval: float = SETTINGS_REFRESH_INTERVAL) -> None:
+        """
+        Reload the settings snapshot every ``interval`` seconds (run as a background task),
+        picking up changes made by other processes.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            await db.run(self.reload_settings)
+
+    def settings_for(self, chat_id: int) -> ChatSettings:
+        """
+        Resolve the settings of a chat in a single query.
+
+        Args:
+            chat_id: Telegram chat ID
+
+        Returns:
+            The global settings with the chat's overrides applied
+        """
+        values = db.get_chat_settings(chat_id)
+        # Fall back to the global settings if the database could not be read
+        return ChatSettings(chat_id, values or self.values)
+
+    def _toggle(self, key: str, chat_id: Optional[int] = None) -> bool:
+        if chat_id is not None:
+            new_value = not self.settings_for(chat_id).values.get(key, 0)
+            try:
+                db.set_chat_setting(chat_id, key, new_value)
+            except Exception as e:
+                logging.error(f"Error toggling setting {key} for chat {chat_id}: {e}")
+                return not new_value
+            return new_value
+
+        # Write-through: the database first, then the snapshot
+        new_value = not self._setting(key, 0)
+        try:
+            db.set_setting(key, new_value)
+        except Exception as e:
+            logging.error(f"Error toggling setting {key}: {e}")
+            return not new_value
+        self.values[key] = int(new_value)
+        return new_value
+
+    # Toggles change the global default, or only one chat when chat_id is given
+
+    def toggle_auto_transcription(self, chat_id: Optional[int] = None):
+        return self._toggle("auto_transcription_enabled", chat_id)
+
+    def toggle_enhanced_transcription(self, chat_id: Optional[int] = None):
+        return self._toggle("enhanced_transcription_enabled", chat_id)
+
+    def toggle_output_text_file(self, chat_id: Optional[int] = None):
+        return self._toggle("output_text_file_enabled", chat_id)
+
+    def toggle_subtitle_file(self, chat_id: Optional[int] = None):
+        return self._toggle("subtitle_file_enabled", chat_id)
+
+    def set_transcription_speed(self, speed: int, chat_id: Optional[int] = None):
         if speed in [1, 2, 3]:
+            if chat_id is not None:
+                db.set_chat_setting(chat_id, "transcription_speed", speed)
+                return speed
             db.set_int_setting("transcription_speed", speed)
+            self.values["transcription_speed"] = speed
             return speed
         else:
             raise ValueError("Speed must be 1, 2, or 3")
 
-    def get_transcription_speed_text(self) -> str:
-        speed = self.transcription_speed
-        return f"x{speed}"
-
 
 # Create a global instance of BotConfig
 bot_config = BotConfig()
 
-# Add authorized users from environment variable to the database
-for user_id in bot_config.authorized_users:
-    db.add_authorized_user(user_id)
+# Add authorized users from environment variable to the database (in one transaction)
+# and to the in-memory user index
+user_index.authorize(bot_config.authorized_users)
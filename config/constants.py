@@ -1,13 +1,20 @@
+import os
 import re
+from dotenv import load_dotenv
 
-# Dictionary to store cached data
-CACHE = {}
+# Load .env early so the tunables below can be overridden from it
+load_dotenv()
 
 # Regular expression to match various YouTube URL formats
 YOUTUBE_REGEX = re.compile(
     r"(?:https?:\/\/)?(?:www\.)?(?:youtube\.com|youtu\.be)\/(?:watch\?v=)?(?:embed\/)?(?:v\/)?(?:shorts\/)?(?:live\/)?(?:[\w\-]{11})"
 )
 
+# Regular expression to match the playlist ID of a YouTube URL (playlist pages and watch?v=...&list=...)
+YOUTUBE_PLAYLIST_REGEX = re.compile(
+    r"(?:https?:\/\/)?(?:www\.|m\.)?youtube\.com\/(playlist|watch)\?\S*?\blist=([\w\-]+)"
+)
+
 # Maximum size for a single message chunk (in characters)
 CHUNK_SIZE = 4000
 
@@ -16,3 +23,147 @@ PAUSE_BETWEEN_CHUNKS = 0.5
 
 # Maximum file size for audio/video processing (20 MB in bytes)
 MAX_FILE_SIZE = 20 * 1024 * 1024
+
+# Maximum number of YouTube transcript strategies running at the same time
+YOUTUBE_STRATEGY_CONCURRENCY = int(os.getenv("YOUTUBE_STRATEGY_CONCURRENCY", "3"))
+
+# Seconds to wait for the running strategies before hedging with the next one
+# (0 launches the first YOUTUBE_STRATEGY_CONCURRENCY strategies at once)
+YOUTUBE_STRATEGY_HEDGE_DELAY = float(os.getenv("YOUTUBE_STRATEGY_HEDGE_DELAY", "2.0"))
+
+# Weight of each new sample in the per-strategy success rate and latency averages
+STRATEGY_STATS_DECAY = float(os.getenv("STRATEGY_STATS_DECAY", "0.2"))
+
+# Seconds after which unused strategy statistics drift halfway back to neutral
+STRATEGY_STATS_HALF_LIFE = float(os.getenv("STRATEGY_STATS_HALF_LIFE", str(6 * 60 * 60)))
+
+# Probability of promoting a random strategy to the front to keep exploring
+STRATEGY_EXPLORATION_RATE = float(os.getenv("STRATEGY_EXPLORATION_RATE", "0.1"))
+
+# Shared HTTP connection pool used by the transcript services
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+
+# YouTube transcript cache: entry lifetime and byte caps of the memory and SQLite tiers
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(7 * 24 * 60 * 60)))
+TRANSCRIPT_CACHE_MEMORY_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+TRANSCRIPT_CACHE_DISK_BYTES = int(os.getenv("TRANSCRIPT_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+# Minimum seconds between removals of expired and over-budget entries from the SQLite tier
+TRANSCRIPT_CACHE_PRUNE_INTERVAL = float(os.getenv("TRANSCRIPT_CACHE_PRUNE_INTERVAL", "300"))
+
+# Per-strategy circuit breakers: trip thresholds and seconds before a probe is allowed
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_ERROR_RATE = float(os.getenv("CIRCUIT_BREAKER_ERROR_RATE", "0.8"))
+CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "20"))
+CIRCUIT_BREAKER_MIN_CALLS = int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10"))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "120"))
+
+# Per-host request budgets of the transcript services: (requests per second, burst size)
+TRANSCRIPT_SERVICE_RATE_LIMITS = {
+    "www.savesubs.com": (1.0, 3),
+    "www.youtube-transcript.io": (0.5, 2),
+    "notegpt.io": (1.0, 3),
+    "tactiq-apps-prod.tactiq.io": (1.0, 3),
+    "kome.ai": (1.0, 5),
+    "apiv2.anthiago.com": (1.0, 3),
+    "yescribe.erweima.ai": (0.5, 2),
+    "www.youtube.com": (0.5, 3),
+}
+DEFAULT_SERVICE_RATE_LIMIT = (1.0, 3)
+
+# Worker threads for the blocking youtube_transcript_api strategies
+YOUTUBE_API_THREADS = int(os.getenv("YOUTUBE_API_THREADS", "4"))
+
+# Overall time budget (seconds) for extracting one YouTube transcript
+YOUTUBE_EXTRACTION_DEADLINE = float(os.getenv("YOUTUBE_EXTRACTION_DEADLINE", "60"))
+
+# Per-strategy timeouts: p95 of recent latencies times a margin, clamped to [MIN, MAX]
+STRATEGY_TIMEOUT_MIN = float(os.getenv("STRATEGY_TIMEOUT_MIN", "3"))
+STRATEGY_TIMEOUT_MAX = float(os.getenv("STRATEGY_TIMEOUT_MAX", "20"))
+STRATEGY_TIMEOUT_P95_MARGIN = float(os.getenv("STRATEGY_TIMEOUT_P95_MARGIN", "1.5"))
+STRATEGY_LATENCY_SAMPLES = int(os.getenv("STRATEGY_LATENCY_SAMPLES", "50"))
+
+# Seconds a video without transcript is remembered (repeat requests fail fast), and entry cap
+TRANSCRIPT_NEGATIVE_CACHE_TTL = int(os.getenv("TRANSCRIPT_NEGATIVE_CACHE_TTL", str(30 * 60)))
+TRANSCRIPT_NEGATIVE_CACHE_ENTRIES = int(os.getenv("TRANSCRIPT_NEGATIVE_CACHE_ENTRIES", "10000"))
+
+# Kome.ai transcript pages fetched at the same time, and maximum pages per transcript
+KOME_AI_PAGE_CONCURRENCY = int(os.getenv("KOME_AI_PAGE_CONCURRENCY", "3"))
+KOME_AI_MAX_PAGES = int(os.getenv("KOME_AI_MAX_PAGES", "40"))
+
+# Batch mode (several links or a playlist): videos extracted at the same time, maximum videos
+# per batch, batches larger than this are delivered as one zip archive, and seconds between
+# progress message edits
+YOUTUBE_BATCH_CONCURRENCY = int(os.getenv("YOUTUBE_BATCH_CONCURRENCY", "3"))
+YOUTUBE_BATCH_MAX_VIDEOS = int(os.getenv("YOUTUBE_BATCH_MAX_VIDEOS", "50"))
+YOUTUBE_BATCH_ARCHIVE_THRESHOLD = int(os.getenv("YOUTUBE_BATCH_ARCHIVE_THRESHOLD", "3"))
+YOUTUBE_BATCH_PROGRESS_INTERVAL = float(os.getenv("YOUTUBE_BATCH_PROGRESS_INTERVAL", "2.0"))
+
+# Jobs (transcription requests) processed at the same time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "3"))
+
+# Admission control: maximum queued jobs, queued or running jobs per user, and bytes that
+# queued and running jobs may still download
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "100"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "3"))
+JOB_PENDING_BYTES_BUDGET = int(os.getenv("JOB_PENDING_BYTES_BUDGET", str(200 * 1024 * 1024)))
+
+# Seconds between updates of the queue position shown to waiting users
+JOB_QUEUE_UPDATE_INTERVAL = float(os.getenv("JOB_QUEUE_UPDATE_INTERVAL", "10"))
+
+# Seconds of estimated cost a queued job is forgiven per second it waits, so long jobs still run
+JOB_AGING_RATE = float(os.getenv("JOB_AGING_RATE", "1.0"))
+
+# Job cost estimates in seconds, used to run short jobs first: default (e.g. plain messages are
+# checked instantly, so only requests use it), per YouTube video, media download throughput in
+# bytes per second, and transcription seconds per second of (sped-up) audio
+JOB_DEFAULT_COST = float(os.getenv("JOB_DEFAULT_COST", "5"))
+JOB_YOUTUBE_COST = float(os.getenv("JOB_YOUTUBE_COST", "15"))
+JOB_DOWNLOAD_RATE = float(os.getenv("JOB_DOWNLOAD_RATE", str(2 * 1024 * 1024)))
+JOB_TRANSCRIBE_RATIO = float(os.getenv("JOB_TRANSCRIBE_RATIO", "0.1"))
+
+# Concurrency limit per pipeline stage: ffmpeg processes (CPU-bound, 0 = one per CPU core),
+# Telegram file downloads, OpenAI API calls and transcript service requests
+FFMPEG_CONCURRENCY = int(os.getenv("FFMPEG_CONCURRENCY", "0"))
+TELEGRAM_DOWNLOAD_CONCURRENCY = int(os.getenv("TELEGRAM_DOWNLOAD_CONCURRENCY", "4"))
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "4"))
+TRANSCRIPT_SERVICE_CONCURRENCY = int(os.getenv("TRANSCRIPT_SERVICE_CONCURRENCY", "16"))
+
+# Seconds between stage pool utilisation reports in the log
+POOL_STATS_INTERVAL = float(os.getenv("POOL_STATS_INTERVAL", "300"))
+
+# Persistent jobs: directory for intermediate files (downloads) of unfinished jobs, seconds
+# finished jobs are kept to recognise updates Telegram delivers again, and times a job is
+# started before it is given up (a job that keeps crashing the bot is not resumed forever)
+JOB_WORK_DIR = os.getenv("JOB_WORK_DIR", "job_data")
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", str(2 * 24 * 3600)))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Process role: "all" runs everything in one process, "frontend" only receives and queues
+# requests, "worker" processes queued requests (start as many worker processes as needed)
+BOT_ROLE = os.getenv("BOT_ROLE", "all")
+
+# Worker processes: seconds between polls of the job broker when it is empty, and seconds
+# without a heartbeat after which a worker is considered dead and its jobs are queued again
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_WORKER_TIMEOUT = float(os.getenv("JOB_WORKER_TIMEOUT", "60"))
+
+# Seconds between background reloads of the in-memory settings snapshot (changes made in
+# this process are applied to it right away; the reload picks up changes made by other
+# processes, such as the front end when running workers)
+SETTINGS_REFRESH_INTERVAL = float(os.getenv("SETTINGS_REFRESH_INTERVAL", "10"))
+
+# SQLite: seconds a query waits for another process's write lock, page cache size in KiB,
+# and batching of frequent background writes (strategy statistics, cache access times):
+# they are committed together every DB_WRITE_BATCH_INTERVAL seconds or once
+# DB_WRITE_BATCH_SIZE are queued
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "10"))
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "16384"))
+DB_WRITE_BATCH_INTERVAL = float(os.getenv("DB_WRITE_BATCH_INTERVAL", "1.0"))
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))
+
+# Seconds the in-memory index of users and their authorization is used before it is
+# reloaded from the database (users registered by this process are added right away)
+USERS_REFRESH_INTERVAL = float(os.getenv("USERS_REFRESH_INTERVAL", "60"))
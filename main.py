@@ -1,4 +1,14 @@
+import argparse
 from bot import run_bot
+from config.constants import BOT_ROLE
 
 if __name__ == "__main__":
-    run_bot()
+    parser = argparse.ArgumentParser(description="ArkanTranscripter Telegram bot")
+    parser.add_argument(
+        "--role",
+        choices=["all", "frontend", "worker"],
+        default=BOT_ROLE,
+        help="all: single process (default); frontend: receive and queue requests; "
+        "worker: process queued requests (run one or more next to a frontend)",
+    )
+    run_bot(parser.parse_args().role)
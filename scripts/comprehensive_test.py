@@ -16,13 +16,29 @@ import re
 import time
 from pathlib import Path
 import sys
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+import bot.services.youtube_transcript_service as youtube_transcript_service
+import bot.utils.transcript_cache as transcript_cache_module
 from bot.services.youtube_transcript_service import YouTubeTranscriptExtractor
+from bot.utils.circuit_breaker import CircuitBreaker
+from bot.utils.transcript_cache import TranscriptCache
+from bot.utils.job_scheduler import JobScheduler, JobRejectedError
+from bot.utils.concurrency import StagePool
+from bot.utils.single_flight import SingleFlight
+from bot.utils.rate_limiter import RateLimiter
+from bot.utils.database import Database, MIGRATIONS
+from bot.utils.job_store import JobStore
+from bot.utils.job_broker import JobBroker
+from bot.utils.user_index import UserIndex
+import bot.utils.job_store as job_store_module
+import config.bot_config as config_module
+from config.bot_config import ChatSettings
 
 def load_test_urls_from_file(file_path: str = 'test_urls.txt', categories: List[str] = None) -> Dict[str, List[Dict[str, str]]]:
     """
@@ -645,6 +661,1745 @@ async def run_clean_messaging_tests():
     return passed == total
 
 
+def print_banner(title: str) -> None:
+    """Print the banner that opens a test mode."""
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def report_results(title: str, checks: Dict[str, bool], success: str, failure: str) -> bool:
+    """
+    Print the outcome of every check of a test mode, then its verdict.
+
+    Args:
+        title: Heading of the results
+        checks: Description of each check -> whether it passed
+        success: Verdict printed when every check passed
+        failure: Verdict printed otherwise
+
+    Returns:
+        Whether every check passed
+    """
+    print(f"\n📊 {title}:")
+    for name, passed in checks.items():
+        print(f"   {name}: {'✅' if passed else '❌'}")
+
+    if all(checks.values()):
+        print(f"   🎉 SUCCESS: {success}")
+        return True
+    print(f"   ❌ FAILURE: {failure}")
+    return False
+
+
+@contextmanager
+def patched(target, **attributes):
+    """Temporarily replace attributes of an object or module."""
+    originals = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name, value in originals.items():
+            setattr(target, name, value)
+
+
+@contextmanager
+def isolated_extraction(directory: str):
+    """Point the YouTube extraction at a throwaway database and transcript cache."""
+    database = Database(str(Path(directory) / "extraction.db"))
+    try:
+        with patched(transcript_cache_module, db=database), patched(
+            youtube_transcript_service,
+            db=database,
+            transcript_cache=TranscriptCache(),
+            # Strategies are tried in the order given, without random exploration
+            STRATEGY_EXPLORATION_RATE=0.0,
+        ):
+            yield database
+    finally:
+        database.close()
+
+
+def make_fake_strategies(extractor: YouTubeTranscriptExtractor, strategies: List) -> None:
+    """Replace the strategies of an extractor (each with a fresh circuit breaker)."""
+    extractor.strategies = strategies
+    extractor.circuit_breakers = {strategy.__name__: CircuitBreaker(strategy.__name__) for strategy in strategies}
+
+
+async def test_hedged_strategies(hedge_delay: float = 0.1) -> bool:
+    """
+    Test the hedged race of transcript strategies.
+    A slow strategy starts first; when it has not answered within the hedge delay
+    the next one is launched, wins, and the slow one is cancelled without counting
+    as a failure of its service. The third strategy is never started.
+    """
+    import tempfile
+
+    print_banner(f"🏁 TESTING HEDGED STRATEGY RACE (hedge delay {hedge_delay}s)")
+
+    started: List[str] = []
+    cancelled: List[str] = []
+
+    def strategy(name: str, delay: float):
+        async def extract(video_id: str) -> str:
+            started.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            return f"{name} transcript"
+
+        extract.__name__ = name
+        return extract
+
+    extractor = YouTubeTranscriptExtractor(max_concurrency=3, hedge_delay=hedge_delay)
+    make_fake_strategies(extractor, [strategy("slow", 10 * hedge_delay), strategy("fast", hedge_delay / 2), strategy("spare", 0)])
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory, isolated_extraction(directory):
+            start = time.monotonic()
+            result = await extractor.extract_transcript("hedgedVideo")
+            elapsed = time.monotonic() - start
+            await extractor.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    slow_breaker = extractor.circuit_breakers["slow"]
+    return report_results(
+        "HEDGED RACE RESULTS",
+        {
+            f"Hedged strategy won in {elapsed:.2f}s": result == "fast transcript" and elapsed < 5 * hedge_delay,
+            f"Strategies started: {', '.join(started)}": started == ["slow", "fast"],
+            "Slow strategy cancelled": cancelled == ["slow"],
+            "Cancelled strategy not counted as a failure": slow_breaker.consecutive_failures == 0
+            and slow_breaker.state == CircuitBreaker.CLOSED,
+        },
+        "Slow strategies are hedged and the losers cancelled!",
+        "The strategy race is not hedged as expected",
+    )
+
+
+async def test_strategy_deadline(deadline: float = 0.25) -> bool:
+    """
+    Test the per-strategy timeouts and the overall extraction deadline.
+    A strategy's timeout must follow its recent p95 latency times the margin,
+    within the configured bounds, and be capped by its share of the remaining
+    budget. An extraction whose strategies all hang must stop at the deadline
+    without starting the strategies there is no time left for.
+    """
+    import tempfile
+    from collections import deque
+
+    print_banner(f"⏳ TESTING STRATEGY TIMEOUTS AND DEADLINE ({deadline}s)")
+
+    extractor = YouTubeTranscriptExtractor(max_concurrency=2, hedge_delay=0)
+    samples = {
+        "typical": [0.1 * n for n in range(1, 21)],  # p95: 1.9s
+        "fast": [0.01] * 10,
+        "slow": [100.0] * 10,
+        "new": [1.0] * (extractor.MIN_LATENCY_SAMPLES - 1),
+    }
+    extractor._latencies = {name: deque(values) for name, values in samples.items()}
+
+    with patched(
+        youtube_transcript_service, STRATEGY_TIMEOUT_MIN=0.5, STRATEGY_TIMEOUT_MAX=30.0, STRATEGY_TIMEOUT_P95_MARGIN=2.0
+    ):
+        timeouts = {name: extractor._get_strategy_timeout(name, 1000.0, 1) for name in samples}
+        p95_ok = abs(timeouts["typical"][0] - 3.8) < 1e-9 and not timeouts["typical"][1]
+        bounded = timeouts["fast"] == (0.5, False) and timeouts["slow"] == (30.0, False)
+        unmeasured = timeouts["new"] == (30.0, False)
+        # Four strategies left with two running at a time: two waves share the remaining 4s
+        wave_share = extractor._get_strategy_timeout("typical", 4.0, 4) == (2.0, True)
+        # Never beyond the remaining budget, even below the minimum timeout
+        remaining_cap = extractor._get_strategy_timeout("typical", 0.3, 1) == (0.3, True)
+
+    started: List[str] = []
+    statuses: List[tuple] = []
+
+    def hanging(name: str):
+        async def extract(video_id: str) -> str:
+            started.append(name)
+            await asyncio.sleep(10)
+            return "too late"
+
+        extract.__name__ = name
+        return extract
+
+    async def status_callback(strategy_num, strategy_name, total, status, details=""):
+        statuses.append((status, details))
+
+    sequential = YouTubeTranscriptExtractor(max_concurrency=1, hedge_delay=0)
+    make_fake_strategies(sequential, [hanging(f"hang{n}") for n in range(1, 6)])
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory, isolated_extraction(directory), patched(
+            youtube_transcript_service, STRATEGY_TIMEOUT_MIN=0.1
+        ):
+            start = time.monotonic()
+            result = await sequential.extract_transcript_with_status("hangingVideo", status_callback, deadline=deadline)
+            elapsed = time.monotonic() - start
+            await sequential.close()
+            await extractor.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    stopped = result is None and elapsed < deadline + 0.15
+    not_started = 0 < len(started) < 5
+    reported = bool(statuses) and statuses[-1][0] == "exhausted" and "límite de tiempo" in statuses[-1][1]
+    breakers_closed = all(breaker.state == CircuitBreaker.CLOSED for breaker in sequential.circuit_breakers.values())
+
+    return report_results(
+        "TIMEOUT AND DEADLINE RESULTS",
+        {
+            f"Timeout follows p95 x margin ({timeouts['typical'][0]:.1f}s)": p95_ok,
+            "Timeout kept within its bounds": bounded,
+            "Maximum timeout until enough samples": unmeasured,
+            "Timeout capped by the wave's share of the budget": wave_share,
+            "Timeout capped by the remaining budget": remaining_cap,
+            f"Extraction stopped at the deadline ({elapsed:.2f}s)": stopped,
+            f"Strategies without time left not started ({len(started)} of 5 started)": not_started,
+            "Deadline reported to the user": reported,
+            "Budget-capped timeouts do not trip breakers": breakers_closed,
+        },
+        "Strategies are bounded by their p95 and the deadline!",
+        "Strategy timeouts or the deadline are not enforced",
+    )
+
+
+async def test_negative_cache() -> bool:
+    """
+    Test the negative cache of videos without a transcript.
+    When every strategy reports that the video has no transcript, a repeat request
+    must be answered from the negative cache without running any strategy, and
+    ``force_refresh`` must run them again. Outages, timeouts and open breakers say
+    nothing about the video and must not be remembered.
+    """
+    import tempfile
+    from bot.services.youtube_transcript_service import TranscriptUnavailableError
+
+    print_banner("🚫 TESTING NEGATIVE TRANSCRIPT CACHE")
+
+    calls: Dict[str, int] = {}
+    statuses: List[str] = []
+
+    def strategy(name: str):
+        async def extract(video_id: str) -> str:
+            calls[video_id] = calls.get(video_id, 0) + 1
+            if video_id == "noCaptions":
+                raise TranscriptUnavailableError("NoTranscriptFound")
+            if video_id == "outage":
+                raise RuntimeError("HTTP 503")
+            await asyncio.sleep(10)
+            return "too late"
+
+        extract.__name__ = name
+        return extract
+
+    async def status_callback(strategy_num, strategy_name, total, status, details=""):
+        statuses.append(status)
+
+    extractor = YouTubeTranscriptExtractor(max_concurrency=2, hedge_delay=0)
+
+    def reset_strategies():
+        make_fake_strategies(extractor, [strategy("first"), strategy("second")])
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory, isolated_extraction(directory):
+            cache = youtube_transcript_service.transcript_cache
+
+            # The video has no transcript: remembered, then bypassed on request
+            reset_strategies()
+            first = await extractor.extract_transcript("noCaptions")
+            first_calls = calls["noCaptions"]
+            repeat = await extractor.extract_transcript_with_status("noCaptions", status_callback)
+            repeat_calls = calls["noCaptions"]
+            refreshed = await extractor.extract_transcript_with_status("noCaptions", force_refresh=True)
+            remembered = first is None and repeat is None and first_calls == 2 and repeat_calls == 2
+            answered_from_cache = statuses == ["unavailable"] and cache.negative_hits == 1
+            bypassed = refreshed is None and calls["noCaptions"] == 4
+
+            # The services fail: nothing is remembered
+            reset_strategies()
+            for _ in range(2):
+                await extractor.extract_transcript("outage")
+            outage_retried = calls["outage"] == 4 and cache.get_unavailable("outage") is None
+
+            # The deadline runs out while the strategies are still working
+            reset_strategies()
+            for _ in range(2):
+                await extractor.extract_transcript_with_status("tooSlow", deadline=0.2)
+            timeout_retried = calls["tooSlow"] == 4 and cache.get_unavailable("tooSlow") is None
+
+            # Every breaker is open, so no strategy runs
+            reset_strategies()
+            for name, breaker in list(extractor.circuit_breakers.items()):
+                breaker = extractor.circuit_breakers[name] = CircuitBreaker(name, failure_threshold=1)
+                breaker.record_failure()
+            skipped = await extractor.extract_transcript("breakersOpen")
+            breakers_not_cached = (
+                skipped is None and "breakersOpen" not in calls and cache.get_unavailable("breakersOpen") is None
+            )
+            await extractor.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "NEGATIVE CACHE RESULTS",
+        {
+            "Video without transcript remembered after one run": remembered,
+            "Repeat request answered from the negative cache": answered_from_cache,
+            "force_refresh runs the strategies again": bypassed,
+            "Service errors are not remembered": outage_retried,
+            "Timeouts are not remembered": timeout_retried,
+            "Open breakers are not remembered": breakers_not_cached,
+        },
+        "Only videos without transcript are remembered!",
+        "The negative cache remembers the wrong outcomes",
+    )
+
+
+async def test_strategy_ranking() -> bool:
+    """
+    Test that strategies are ordered by the statistics persisted for them.
+    Outcomes recorded with ``record_strategy_result`` must put the strategy with
+    the lowest expected time-to-success first and one that keeps failing last;
+    a strategy without statistics and one whose statistics are long stale must
+    sit at the neutral prior in between. Exploration promotes another strategy.
+    """
+    import sqlite3
+    import tempfile
+    from config.constants import STRATEGY_STATS_DECAY, STRATEGY_STATS_HALF_LIFE
+
+    print_banner("📈 TESTING STRATEGY RANKING")
+
+    def strategy(name: str):
+        async def extract(video_id: str) -> str:
+            return f"{name} transcript"
+
+        extract.__name__ = name
+        return extract
+
+    names = ["flaky", "stale", "unknown", "steady", "reliable"]
+    extractor = YouTubeTranscriptExtractor()
+    make_fake_strategies(extractor, [strategy(name) for name in names])
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory, isolated_extraction(directory) as database:
+            # Expected cost = latency / success rate: reliable 2s, steady 6s, prior 10s, flaky 50s
+            database.record_strategy_result("reliable", True, 2.0, STRATEGY_STATS_DECAY)
+            database.record_strategy_result("steady", True, 6.0, STRATEGY_STATS_DECAY)
+            database.record_strategy_result("flaky", False, 1.0, STRATEGY_STATS_DECAY)
+            # Failed too, but so long ago that it has drifted back to the prior
+            database.record_strategy_result("stale", False, 1.0, STRATEGY_STATS_DECAY)
+            database.get_strategy_stats()  # commits the batched results
+            with sqlite3.connect(database.db_path) as conn:
+                conn.execute(
+                    "UPDATE strategy_stats SET updated_at = ? WHERE strategy = 'stale'",
+                    (time.time() - 20 * STRATEGY_STATS_HALF_LIFE,),
+                )
+            conn.close()
+
+            ranked = [item.__name__ for item in await extractor._rank_strategies()]
+            with patched(youtube_transcript_service, STRATEGY_EXPLORATION_RATE=1.0):
+                explored = [item.__name__ for item in await extractor._rank_strategies()]
+            await extractor.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    expected = ["reliable", "steady", "unknown", "stale", "flaky"]
+    return report_results(
+        "STRATEGY RANKING RESULTS",
+        {
+            f"Ranked from recorded stats: {', '.join(ranked)}": ranked == expected,
+            "Strategy without stats ranked at the prior": ranked.index("unknown") == 2,
+            "Stale stats drift back to the prior": ranked.index("stale") < ranked.index("flaky"),
+            f"Exploration promotes another strategy: {explored[0]}": (
+                explored[0] != "reliable" and sorted(explored) == sorted(names)
+            ),
+        },
+        "Strategies are ordered by their recorded performance!",
+        "Strategy ranking ignores the recorded statistics",
+    )
+
+
+async def test_single_flight(callers: int = 5) -> bool:
+    """
+    Test that concurrent calls for the same key share one execution.
+    Callers of a running key must get its result without running it again. A
+    caller arriving right after the execution was cancelled (its last waiter
+    left, or it was cancelled directly) must start a fresh one instead of
+    receiving a CancelledError for work it never cancelled.
+    """
+    print_banner(f"🛫 TESTING SINGLE FLIGHT ({callers} concurrent callers)")
+
+    flight = SingleFlight("Test flight")
+    runs = 0
+
+    async def work(result: str, delay: float = 0.05) -> str:
+        nonlocal runs
+        runs += 1
+        await asyncio.sleep(delay)
+        return result
+
+    results = await asyncio.gather(*(flight.do("shared", lambda: work("shared result")) for _ in range(callers)))
+    shared_runs = runs
+    shared = results == ["shared result"] * callers and shared_runs == 1
+
+    # The only waiter leaves; a new caller arrives before the cancelled work unwinds
+    leaving = asyncio.create_task(flight.do("left", lambda: work("stale result", 10)))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await asyncio.sleep(0)
+    try:
+        after_leave = await flight.do("left", lambda: work("fresh result"))
+    except asyncio.CancelledError:
+        after_leave = None
+    await asyncio.gather(leaving, return_exceptions=True)
+
+    # The work itself is cancelled while registered; a new caller must not join it
+    waiting = asyncio.create_task(flight.do("cancelled", lambda: work("stale result", 10)))
+    await asyncio.sleep(0)
+    flight._calls["cancelled"].task.cancel()
+    try:
+        after_cancel = await flight.do("cancelled", lambda: work("fresh result"))
+    except asyncio.CancelledError:
+        after_cancel = None
+    await asyncio.gather(waiting, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    forgotten = not any(flight.is_in_flight(key) for key in ("shared", "left", "cancelled"))
+
+    return report_results(
+        "SINGLE FLIGHT RESULTS",
+        {
+            f"{callers} callers shared {shared_runs} execution(s)": shared,
+            "Caller after the last waiter left starts afresh": after_leave == "fresh result",
+            "Caller after the work was cancelled starts afresh": after_cancel == "fresh result",
+            "Finished executions forgotten": forgotten,
+        },
+        "Concurrent calls are coalesced safely!",
+        "Single flight hands out cancelled executions",
+    )
+
+
+def test_circuit_breaker(cooldown: float = 0.05) -> bool:
+    """
+    Test the circuit breaker state machine.
+    Consecutive failures open it and calls are rejected; after the cooldown a
+    single probe goes through (half-open); a failed probe opens it again and a
+    successful one closes it. A high error rate over the window also opens it.
+    """
+    print_banner(f"🔌 TESTING CIRCUIT BREAKER (cooldown {cooldown}s)")
+
+    breaker = CircuitBreaker("test", failure_threshold=3, window_size=10, min_calls=10, cooldown=cooldown)
+    for _ in range(2):
+        breaker.allow_request()
+        breaker.record_failure()
+    closed_below_threshold = breaker.state == CircuitBreaker.CLOSED
+    breaker.allow_request()
+    breaker.record_failure()
+    opened = breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+
+    time.sleep(cooldown)
+    probe = breaker.allow_request()
+    single_probe = probe and breaker.state == CircuitBreaker.HALF_OPEN and not breaker.allow_request()
+    breaker.record_failure()
+    reopened = breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+
+    time.sleep(cooldown)
+    breaker.allow_request()
+    breaker.record_success()
+    closed = breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.release()
+
+    # Failures interleaved with successes never reach the consecutive threshold
+    rate_breaker = CircuitBreaker("rate", failure_threshold=100, error_rate_threshold=0.8, window_size=10, min_calls=10)
+    for n in range(10):
+        rate_breaker.allow_request()
+        if n % 5 == 0:
+            rate_breaker.record_success()
+        else:
+            rate_breaker.record_failure()
+    rate_tripped = rate_breaker.state == CircuitBreaker.OPEN
+
+    return report_results(
+        "CIRCUIT BREAKER RESULTS",
+        {
+            "Closed below the failure threshold": closed_below_threshold,
+            "Opens after consecutive failures and rejects calls": opened,
+            "Half-open after the cooldown, one probe at a time": single_probe,
+            "Failed probe opens it again": reopened,
+            "Successful probe closes it": closed,
+            "Opens on the error rate over the window": rate_tripped,
+        },
+        "Failing services are skipped and probed back!",
+        "Circuit breaker transitions are wrong",
+    )
+
+
+async def test_rate_limiter(rate: float = 20.0, burst: int = 2, requests: int = 6) -> bool:
+    """
+    Test the per-host token buckets.
+    A burst goes out at once, then requests to the host are spaced at its rate
+    while another host is not held back. A 429 blocks only its host for the
+    Retry-After delay.
+    """
+    print_banner(f"🪣 TESTING RATE LIMITER ({requests} requests, {rate:.0f}/s, burst {burst})")
+
+    limiter = RateLimiter({"busy.example": (rate, burst)}, (rate, burst))
+    busy_sent: List[float] = []
+    other_sent: List[float] = []
+    start = time.monotonic()
+
+    async def request(url: str, sent: List[float]) -> None:
+        await limiter.acquire(url)
+        sent.append(time.monotonic() - start)
+
+    logging.disable(logging.INFO)
+    try:
+        await asyncio.gather(
+            *(request("https://busy.example/api", busy_sent) for _ in range(requests)),
+            request("https://other.example/api", other_sent),
+        )
+        throttled_time = max(busy_sent)
+        other_done = other_sent[0]
+        expected = (requests - burst) / rate
+
+        retry_after = 0.1
+        limiter.retry_after("https://busy.example/api", str(retry_after))
+        blocked_start = time.monotonic()
+        await limiter.acquire("https://busy.example/api")
+        blocked_for = time.monotonic() - blocked_start
+        other_start = time.monotonic()
+        await limiter.acquire("https://other.example/api")
+        other_wait = time.monotonic() - other_start
+    finally:
+        logging.disable(logging.NOTSET)
+
+    burst_immediate = sum(1 for sent_at in busy_sent if sent_at < 0.5 / rate) >= burst
+    spaced = expected * 0.8 <= throttled_time <= expected + 0.1
+
+    return report_results(
+        "RATE LIMITER RESULTS",
+        {
+            f"Burst of {burst} sent at once": burst_immediate,
+            f"{requests} requests spread over {throttled_time:.2f}s (expected ~{expected:.2f}s)": spaced,
+            f"Other host not held back ({other_done * 1000:.0f}ms)": other_done < 0.5 / rate,
+            f"429 blocks the host for its Retry-After ({blocked_for:.2f}s)": blocked_for >= retry_after * 0.9,
+            f"Other hosts unaffected by the 429 ({other_wait * 1000:.0f}ms)": other_wait < 0.5 / rate,
+        },
+        "Requests are throttled per host!",
+        "Rate limiting is not working as expected",
+    )
+
+
+async def test_kome_pagination(page_count: int = 7, concurrency: int = 3) -> bool:
+    """
+    Test the Kome.ai pagination.
+    Pages after the first are fetched concurrently, at most ``concurrency`` at a
+    time, and stitched back in order even when they complete out of order. A
+    failed page or the page cap returns the pages obtained so far, marked partial.
+    """
+    print_banner(f"📄 TESTING KOME.AI PAGINATION ({page_count} pages, {concurrency} at a time)")
+
+    extractor = YouTubeTranscriptExtractor()
+    requested: List[int] = []
+    in_flight = 0
+    max_in_flight = 0
+
+    def fake_pages(last_page: Optional[int], failing_page: Optional[int] = None):
+        async def fetch(video_id: str, page: int):
+            nonlocal in_flight, max_in_flight
+            requested.append(page)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                # Later pages of a window answer first
+                await asyncio.sleep(0.01 * (concurrency - page % concurrency))
+                if page == failing_page:
+                    raise youtube_transcript_service.ServiceUnavailableError(f"page {page} failed")
+                return f"page {page}", last_page is None or page < last_page
+            finally:
+                in_flight -= 1
+
+        return fetch
+
+    expected = "\n".join(f"page {page}" for page in range(page_count))
+
+    logging.disable(logging.INFO)
+    try:
+        with patched(youtube_transcript_service, KOME_AI_PAGE_CONCURRENCY=concurrency, KOME_AI_MAX_PAGES=40):
+            extractor._fetch_kome_ai_page = fake_pages(page_count - 1)
+            complete = await extractor._extract_with_kome_ai("komeVideo")
+            complete_requests, complete_in_flight = sorted(requested), max_in_flight
+
+            requested.clear()
+            extractor._fetch_kome_ai_page = fake_pages(page_count - 1, failing_page=3)
+            failed = await extractor._extract_with_kome_ai("komeVideo")
+
+        with patched(youtube_transcript_service, KOME_AI_PAGE_CONCURRENCY=concurrency, KOME_AI_MAX_PAGES=4):
+            extractor._fetch_kome_ai_page = fake_pages(None)
+            capped = await extractor._extract_with_kome_ai("komeVideo")
+        await extractor.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "KOME.AI PAGINATION RESULTS",
+        {
+            f"All {page_count} pages stitched in order": complete == expected and not complete.partial,
+            "Each page requested once": complete_requests == list(range(page_count)),
+            f"Pages fetched concurrently (max {complete_in_flight} in flight)": 1 < complete_in_flight <= concurrency,
+            "Failed page returns the pages before it, partial": failed == "page 0\npage 1\npage 2" and failed.partial,
+            "Page cap returns the first pages, partial": capped == "page 0\npage 1\npage 2\npage 3" and capped.partial,
+        },
+        "Long transcripts are fetched page by page!",
+        "Kome.ai pagination is not working as expected",
+    )
+
+
+async def test_youtube_batch(concurrency: int = 2, max_videos: int = 5) -> bool:
+    """
+    Test the YouTube batch mode.
+    Every link of a message is taken in order without duplicates, playlist pages
+    are expanded into their videos (watch links with a list stay single videos),
+    and the batch is capped, extracted ``concurrency`` videos at a time and
+    delivered as one archive in batch order without the failed videos.
+    """
+    import importlib
+    import io
+    import zipfile
+    from types import SimpleNamespace
+    # The handler packages re-export their functions, hiding the module behind the same name
+    batch_module = importlib.import_module("bot.handlers.media.youtube_batch_handler")
+    from bot.utils.transcription_utils import extract_video_ids, extract_playlist_id
+    from bot.utils.transcript_segments import Transcript
+
+    print_banner(f"📚 TESTING YOUTUBE BATCH ({concurrency} at a time, up to {max_videos} videos)")
+
+    text = (
+        "https://youtu.be/AAAAAAAAAAA y https://www.youtube.com/watch?v=BBBBBBBBBBB "
+        "otra vez https://youtu.be/AAAAAAAAAAA y https://www.youtube.com/shorts/CCCCCCCCCCC"
+    )
+    links = extract_video_ids(text)
+    playlist_link = "https://www.youtube.com/playlist?list=PLtest123"
+    watch_link = "https://www.youtube.com/watch?v=DDDDDDDDDDD&list=PLwatch456"
+    playlist_ids = (
+        extract_playlist_id(playlist_link),
+        extract_playlist_id(watch_link),
+        extract_playlist_id(watch_link, include_watch_urls=True),
+    )
+
+    # Playlist page parsing through the shared request path
+    page = "".join(
+        f'"playlistVideoRenderer":{{"videoId":"{video_id}"' for video_id in ["EEEEEEEEEEE", "FFFFFFFFFFF", "EEEEEEEEEEE", "GGGGGGGGGGG"]
+    )
+
+    class FakeResponse:
+        status = 200
+
+        async def text(self):
+            return page
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+    extractor = YouTubeTranscriptExtractor()
+    extractor._request = lambda method, url, **kwargs: FakeResponse()
+    playlist_videos = await extractor.get_playlist_video_ids("PLtest123", 2)
+    await extractor.close()
+
+    # The whole batch with a fake extractor and chat
+    in_flight = 0
+    max_in_flight = 0
+    extracted: List[str] = []
+
+    class FakeExtractor:
+        async def get_playlist_video_ids(self, playlist_id: str, limit: int) -> List[str]:
+            return ["BBBBBBBBBBB", "EEEEEEEEEEE", "FFFFFFFFFFF", "GGGGGGGGGGG"][:limit]
+
+        async def extract_transcript_with_status(self, video_id: str, status_callback=None, force_refresh=False):
+            nonlocal in_flight, max_in_flight
+            extracted.append(video_id)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                await asyncio.sleep(0.02)
+            finally:
+                in_flight -= 1
+            return None if video_id == "CCCCCCCCCCC" else Transcript(f"transcript of {video_id}")
+
+    sent: List[str] = []
+    archives: Dict[str, str] = {}
+
+    class FakeStatus:
+        text = ""
+
+        async def edit_text(self, text: str) -> None:
+            self.text = text
+
+    status = FakeStatus()
+
+    async def send_message(text: str):
+        sent.append(text)
+        return status
+
+    async def send_document(document, filename: str, caption: str = "") -> None:
+        with zipfile.ZipFile(io.BytesIO(document.read())) as archive:
+            archives.update({name: archive.read(name).decode("utf-8") for name in archive.namelist()})
+
+    chat = SimpleNamespace(id=1, send_message=send_message, send_document=send_document)
+    update = SimpleNamespace(
+        effective_user=SimpleNamespace(id=1), effective_chat=chat, message=SimpleNamespace(chat=chat)
+    )
+    settings = ChatSettings(1, {"enhanced_transcription_enabled": 0, "subtitle_file_enabled": 0})
+
+    async def get_settings():
+        return settings
+
+    async def set_state(state: str):
+        pass
+
+    job = SimpleNamespace(
+        get_settings=get_settings,
+        set_state=set_state,
+        set_media=lambda media: None,
+        transcript_chars=0,
+    )
+
+    logging.disable(logging.INFO)
+    try:
+        with patched(
+            batch_module,
+            youtube_transcript_extractor=FakeExtractor(),
+            YOUTUBE_BATCH_CONCURRENCY=concurrency,
+            YOUTUBE_BATCH_MAX_VIDEOS=max_videos,
+            YOUTUBE_BATCH_ARCHIVE_THRESHOLD=0,
+        ):
+            await batch_module.youtube_batch_handler(
+                update, None, links, update.message, playlist_id="PLtest123", job=job
+            )
+    finally:
+        logging.disable(logging.NOTSET)
+
+    batch = ["AAAAAAAAAAA", "BBBBBBBBBBB", "CCCCCCCCCCC", "EEEEEEEEEEE", "FFFFFFFFFFF"]
+    expected_archive = {
+        f"{number}_{video_id}.txt": f"transcript of {video_id}"
+        for number, video_id in enumerate(batch, 1)
+        if video_id != "CCCCCCCCCCC"
+    }
+
+    return report_results(
+        "YOUTUBE BATCH RESULTS",
+        {
+            f"Links taken in order without duplicates: {', '.join(links)}": links == ["AAAAAAAAAAA", "BBBBBBBBBBB", "CCCCCCCCCCC"],
+            "Playlist pages expanded, watch links stay single videos": playlist_ids == ("PLtest123", None, "PLwatch456"),
+            "Playlist page parsed without duplicates, up to the limit": playlist_videos == ["EEEEEEEEEEE", "FFFFFFFFFFF"],
+            f"Batch capped at {max_videos} videos, linked ones first": sorted(extracted) == sorted(batch)
+            and any("omitidos" in message for message in sent),
+            f"Videos extracted concurrently (max {max_in_flight} in flight)": 1 < max_in_flight <= concurrency,
+            "Archive in batch order without the failed video": archives == expected_archive,
+            "One status message shows the final state": "completado" in status.text and "❌ 1" in status.text,
+        },
+        "Links and playlists are transcribed as one batch!",
+        "YouTube batches are not working as expected",
+    )
+
+
+def test_transcript_formats() -> bool:
+    """
+    Test the export formats and the storage encoding of timed transcripts.
+    A transcript with known timings must be written as the exact SRT, WebVTT
+    and JSON expected, and come back from ``loads(dumps(...))`` with its text,
+    timings and separator; untimed transcripts must stay plain UTF-8.
+    """
+    import io
+    import json
+    from bot.utils.transcript_segments import (
+        Transcript, TranscriptBuilder, dumps, join_segments, loads, write_json, write_srt, write_vtt,
+    )
+
+    print_banner("🎞️  TESTING TRANSCRIPT EXPORT FORMATS")
+
+    builder = TranscriptBuilder()
+    builder.add("Hola, ¿qué tal?", 0.0, 1.5)
+    builder.add('Dijo "adiós"', 61.25, 2.0)
+    builder.add("Una hora después", 3600.0, 0.0004)
+    transcript = builder.build()
+
+    def written(writer) -> str:
+        output = io.StringIO()
+        writer(transcript, output)
+        return output.getvalue()
+
+    expected_srt = (
+        "1\n00:00:00,000 --> 00:00:01,500\nHola, ¿qué tal?\n\n"
+        '2\n00:01:01,250 --> 00:01:03,250\nDijo "adiós"\n\n'
+        "3\n01:00:00,000 --> 01:00:00,000\nUna hora después\n\n"
+    )
+    expected_vtt = (
+        "WEBVTT\n\n"
+        "00:00:00.000 --> 00:00:01.500\nHola, ¿qué tal?\n\n"
+        '00:01:01.250 --> 00:01:03.250\nDijo "adiós"\n\n'
+        "01:00:00.000 --> 01:00:00.000\nUna hora después\n\n"
+    )
+    srt, vtt = written(write_srt), written(write_vtt)
+    try:
+        exported = json.loads(written(write_json))
+    except ValueError:
+        exported = None
+    expected_json = {
+        "segments": [
+            {"start": 0.0, "duration": 1.5, "text": "Hola, ¿qué tal?"},
+            {"start": 61.25, "duration": 2.0, "text": 'Dijo "adiós"'},
+            {"start": 3600.0, "duration": 0.0, "text": "Una hora después"},
+        ]
+    }
+
+    restored = loads(dumps(transcript))
+    round_trip = (
+        restored == transcript
+        and isinstance(restored, Transcript)
+        and list(restored.starts) == [0.0, 61.25, 3600.0]
+        and list(restored.durations) == list(transcript.durations)
+        and list(restored.offsets) == list(transcript.offsets)
+        and list(restored.iter_segments()) == list(transcript.iter_segments())
+    )
+    lines = loads(dumps(join_segments(["uno", "dos"], [1.0, 2.0], [1.0, 1.0], separator="\n")))
+    separator_kept = lines == "uno\ndos" and lines.separator == "\n" and lines.segment_text(1) == "dos"
+    plain = dumps(Transcript("sin tiempos"))
+    untimed = plain == "sin tiempos".encode("utf-8") and not loads(plain).has_timestamps
+
+    return report_results(
+        "EXPORT FORMAT RESULTS",
+        {
+            "SRT cues and timestamps": srt == expected_srt,
+            "WebVTT header, cues and timestamps": vtt == expected_vtt,
+            "JSON segments": exported == expected_json,
+            "Stored transcript keeps text and timings": round_trip,
+            "Stored transcript keeps its separator": separator_kept,
+            "Untimed transcript stored as plain text": untimed,
+        },
+        "Transcripts are exported and stored exactly!",
+        "Transcript export or storage is not exact",
+    )
+
+
+async def test_transcript_cache(entries: int = 6, entry_bytes: int = 20_000) -> bool:
+    """
+    Test the two cache tiers and the pruning of the SQLite tier.
+    Transcripts written by one cache must be read back from disk by another with
+    their timings; writes within the prune interval must not prune, and a prune
+    must bring the SQLite tier back within its byte budget.
+    """
+    import random
+    import sqlite3
+    import string
+    import tempfile
+    from array import array
+    from bot.utils.transcript_segments import Transcript
+
+    print_banner(f"🗄️  TESTING TRANSCRIPT CACHE ({entries} entries)")
+
+    budget = entry_bytes * entries // 2
+    rng = random.Random(1)
+
+    def make_transcript(number: int) -> Transcript:
+        # Random letters barely compress, so the entries overflow the disk budget
+        text = "".join(rng.choice(string.ascii_letters) for _ in range(entry_bytes))
+        return Transcript(text, array("d", [0.0, 1.5]), array("d", [1.5, 2.0]), array("I", [0, 10, entry_bytes + 1]))
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database(str(Path(directory) / "cache.db"))
+            prunes = []
+            prune_transcript_cache = database.prune_transcript_cache
+
+            def counted_prune(*args):
+                prunes.append(args)
+                return prune_transcript_cache(*args)
+
+            with patched(transcript_cache_module, db=database), patched(database, prune_transcript_cache=counted_prune):
+                writer = TranscriptCache(disk_max_bytes=budget, prune_interval=3600)
+                transcripts = [make_transcript(number) for number in range(entries)]
+                for number, transcript in enumerate(transcripts):
+                    await writer.put(f"video{number}", "es", transcript)
+                throttled = len(prunes) == 1
+
+                reader = TranscriptCache(disk_max_bytes=budget)
+                cached = await reader.get(f"video{entries - 1}", "es")
+                round_trip = (
+                    cached == transcripts[-1] and list(cached.starts) == [0.0, 1.5]
+                    and list(cached.offsets) == [0, 10, entry_bytes + 1] and reader.disk_hits == 1
+                )
+                memory_hit = await reader.get(f"video{entries - 1}", "es") is cached and reader.memory_hits == 1
+                missing = await reader.get("unknown", "es") is None and reader.misses == 1
+
+                # Past the interval, the next write prunes the SQLite tier back within budget
+                writer._pruned_at -= writer.prune_interval
+                await writer.put("latest", "es", make_transcript(entries))
+                with sqlite3.connect(database.db_path) as conn:
+                    stored, stored_bytes = conn.execute("SELECT COUNT(*), SUM(size) FROM transcript_cache").fetchone()
+                conn.close()
+                pruned = len(prunes) == 2 and stored_bytes <= budget and stored < entries + 1
+                latest_kept = await TranscriptCache().get("latest", "es") is not None
+            database.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "TRANSCRIPT CACHE RESULTS",
+        {
+            "Disk tier returns text and timings": round_trip,
+            "Repeat lookup served from memory": memory_hit,
+            "Unknown video is a miss": missing,
+            f"One prune for {entries} writes within the interval": throttled,
+            f"Prune keeps the disk tier within budget ({stored} entries, {stored_bytes:,} bytes)": pruned,
+            "Most recent entry survives the prune": latest_kept,
+        },
+        "Transcript cache works!",
+        "Transcript cache is not working as expected",
+    )
+
+
+async def test_event_loop_responsiveness():
+    """
+    Test that the youtube_transcript_api strategies do not block the event loop.
+    A fake API client sleeps like a slow HTTP round trip while a heartbeat
+    coroutine measures how late the loop wakes it up.
+    """
+    print_banner("🔄 TESTING EVENT LOOP RESPONSIVENESS")
+
+    blocking_delay = 1.0
+    heartbeat_interval = 0.05
+
+    class FakeTranscript:
+        language_code = 'en'
+
+        def fetch(self):
+            time.sleep(blocking_delay / 2)
+            return [type('Snippet', (), {'text': 'hello'})(), type('Snippet', (), {'text': 'world'})()]
+
+    class FakeTranscriptList:
+        def find_transcript(self, languages):
+            return FakeTranscript()
+
+        def __iter__(self):
+            return iter([FakeTranscript()])
+
+    class FakeBlockingApi:
+        def list(self, video_id):
+            time.sleep(blocking_delay / 2)
+            return FakeTranscriptList()
+
+    extractor = YouTubeTranscriptExtractor()
+    extractor._ytt_apis = {True: FakeBlockingApi(), False: FakeBlockingApi()}
+
+    max_lag = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal max_lag
+        while running:
+            expected = time.monotonic() + heartbeat_interval
+            await asyncio.sleep(heartbeat_interval)
+            max_lag = max(max_lag, time.monotonic() - expected)
+
+    monitor = asyncio.create_task(heartbeat())
+    start = time.monotonic()
+    try:
+        results = await asyncio.gather(
+            extractor._extract_with_youtube_transcript_api_proxy('dQw4w9WgXcQ'),
+            extractor._extract_with_youtube_transcript_api_direct('dQw4w9WgXcQ'),
+        )
+    finally:
+        running = False
+        await monitor
+        await extractor.close()
+    elapsed = time.monotonic() - start
+
+    results_ok = all(result == 'hello world' for result in results)
+    loop_responsive = max_lag < 0.2
+    ran_in_parallel = elapsed < 2 * blocking_delay
+
+    return report_results(
+        "EVENT LOOP TEST RESULTS",
+        {
+            "Transcripts returned": results_ok,
+            f"Max heartbeat lag: {max_lag * 1000:.0f} ms": loop_responsive,
+            f"Both strategies ran in parallel ({elapsed:.2f}s)": ran_in_parallel,
+        },
+        "Event loop stays responsive!",
+        "Blocking calls reach the event loop",
+    )
+
+
+async def test_job_scheduler_fairness():
+    """
+    Test that short jobs are not held back by long ones.
+    User A queues several long jobs before users B and C queue short ones; with
+    two workers the short jobs must run first, each user's jobs must keep their
+    order, and a long job that has waited long enough must beat a newer short one.
+    """
+    print_banner("⚖️  TESTING JOB SCHEDULER FAIRNESS")
+
+    long_job = 0.3
+    short_job = 0.05
+    finished: Dict[str, float] = {}
+    order: Dict[str, List[int]] = {}
+    scheduler = JobScheduler(workers=2, name="Test scheduler")
+    start = time.monotonic()
+
+    def make_job(user: str, number: int, duration: float):
+        async def job():
+            order.setdefault(user, []).append(number)
+            await asyncio.sleep(duration)
+            finished[f"{user}{number}"] = time.monotonic() - start
+        return job
+
+    for number in range(5):
+        scheduler.submit("A", make_job("A", number, long_job), f"long job {number}", cost=long_job)
+    short_jobs = [
+        scheduler.submit(user, make_job(user, number, short_job), f"short job {number}", cost=short_job)
+        for user in ("B", "C")
+        for number in range(2)
+    ]
+    position, wait = scheduler.estimate_wait(short_jobs[-1])
+
+    await scheduler.start()
+    while scheduler.pending_count() or scheduler.running_count():
+        await asyncio.sleep(0.01)
+    await scheduler.stop()
+    elapsed = time.monotonic() - start
+
+    short_done = max(finished[key] for key in finished if key[0] in "BC")
+    short_first = short_done < long_job
+    ordered = all(numbers == sorted(numbers) for numbers in order.values())
+    all_done = len(finished) == 9
+    estimate_ok = position == 4 and 0 < wait < long_job
+
+    # Aging: a long job that waited longer than its cost goes before a newer short one
+    started = []
+    aging = JobScheduler(workers=1, aging_rate=1.0, name="Aging scheduler")
+
+    async def record(name: str):
+        started.append(name)
+
+    aging.submit("L", lambda: record("long"), "long job", cost=0.2)
+    await asyncio.sleep(0.3)
+    aging.submit("S", lambda: record("short"), "short job", cost=0.01)
+    await aging.start()
+    while aging.pending_count() or aging.running_count():
+        await asyncio.sleep(0.01)
+    await aging.stop()
+    aging_ok = started == ["long", "short"]
+
+    return report_results(
+        "SCHEDULER TEST RESULTS",
+        {
+            f"All jobs finished ({elapsed:.2f}s)": all_done,
+            f"Short jobs done after {short_done:.2f}s (A's backlog: {finished.get('A4', 0):.2f}s)": short_first,
+            "Per-user order preserved": ordered,
+            f"Queue estimate for the last short job: position {position}, ~{wait:.2f}s": estimate_ok,
+            "Aged long job runs before newer short job": aging_ok,
+        },
+        "Short jobs first, long jobs never starved!",
+        "Scheduling is not fair",
+    )
+
+
+async def test_job_admission():
+    """
+    Test that a bounded scheduler rejects jobs it cannot take.
+    Each limit is checked on its own scheduler: a full queue, a user with too many
+    jobs and a download budget; a job resumed after a restart skips the limits, and
+    a user is admitted again once one of their jobs has finished.
+    """
+    print_banner("🚦 TESTING JOB ADMISSION LIMITS")
+
+    async def noop():
+        pass
+
+    def rejection(scheduler: JobScheduler, key: str, size: int = 0) -> str:
+        try:
+            scheduler.submit(key, noop, "extra job", size=size)
+        except JobRejectedError as e:
+            return e.reason
+        return ""
+
+    # Unbounded by default
+    unbounded = JobScheduler(workers=1, name="Unbounded scheduler")
+    for number in range(20):
+        unbounded.submit("A", noop, f"job {number}", size=10**9)
+    unbounded_ok = unbounded.pending_count() == 20
+
+    queue = JobScheduler(workers=1, max_pending=3, name="Queue scheduler")
+    for user in "ABC":
+        queue.submit(user, noop, "job")
+    queue_full = rejection(queue, "D") == JobRejectedError.QUEUE_FULL
+
+    per_user = JobScheduler(workers=1, max_per_user=2, name="Per-user scheduler")
+    per_user.submit("A", noop, "job 1")
+    per_user.submit("A", noop, "job 2")
+    user_limit = rejection(per_user, "A") == JobRejectedError.USER_LIMIT
+    other_user = rejection(per_user, "B") == ""
+    resumed = per_user.submit("A", noop, "resumed job", check_admission=False).state == "pending"
+
+    budget = JobScheduler(workers=1, max_bytes=100, name="Budget scheduler")
+    budget.submit("A", noop, "job", size=60)
+    byte_budget = rejection(budget, "B", size=50) == JobRejectedError.BYTE_BUDGET
+    fits_budget = rejection(budget, "B", size=40) == ""
+
+    # A finished job frees its user's slot and its bytes
+    await per_user.start()
+    await budget.start()
+    while per_user.pending_count() or per_user.running_count() or budget.pending_count() or budget.running_count():
+        await asyncio.sleep(0.01)
+    readmitted = rejection(per_user, "A") == "" and rejection(budget, "C", size=100) == ""
+    await per_user.stop()
+    await budget.stop()
+    await unbounded.stop()
+    await queue.stop()
+
+    return report_results(
+        "ADMISSION TEST RESULTS",
+        {
+            "No limits unless configured": unbounded_ok,
+            "Full queue rejects new jobs": queue_full,
+            "User over the limit is rejected": user_limit,
+            "Other users are still admitted": other_user,
+            "Resumed job skips the limits": resumed,
+            "Download over the budget is rejected": byte_budget,
+            "Download within the budget is admitted": fits_budget,
+            "Finished jobs free their slot and bytes": readmitted,
+        },
+        "Admission limits enforced!",
+        "Admission limits not enforced",
+    )
+
+
+async def test_stage_pools():
+    """
+    Test that stage pools bound their stage without holding back the others.
+    Ten CPU-like jobs share a pool of two while ten network-like jobs use their
+    own pool of eight; the network jobs must not wait behind the CPU ones, and
+    the CPU pool must report itself fully used.
+    """
+    print_banner("🧵 TESTING STAGE POOLS")
+
+    cpu_pool = StagePool("cpu", 2)
+    network_pool = StagePool("network", 8)
+    job_time = 0.1
+    max_active = {"cpu": 0, "network": 0}
+    network_done = 0.0
+    start = time.monotonic()
+
+    async def run(pool: StagePool):
+        nonlocal network_done
+        async with pool:
+            max_active[pool.name] = max(max_active[pool.name], pool.active)
+            await asyncio.sleep(job_time)
+        if pool is network_pool:
+            network_done = max(network_done, time.monotonic() - start)
+
+    await asyncio.gather(*(run(cpu_pool) for _ in range(10)), *(run(network_pool) for _ in range(10)))
+    elapsed = time.monotonic() - start
+    cpu_stats = cpu_pool.get_stats()
+    network_stats = network_pool.get_stats()
+
+    bounded = max_active["cpu"] == 2 and max_active["network"] == 8
+    independent = network_done < 3 * job_time
+    cpu_busy = cpu_stats["utilisation"] > 0.9 and cpu_stats["avg_wait"] > 0
+
+    return report_results(
+        f"STAGE POOL RESULTS ({elapsed:.2f}s)",
+        {
+            f"Concurrency bounded (cpu {max_active['cpu']}/2, network {max_active['network']}/8)": bounded,
+            f"Network jobs done after {network_done:.2f}s, not behind CPU jobs": independent,
+            f"Utilisation reported: cpu {cpu_stats['utilisation']:.0%} (avg wait {cpu_stats['avg_wait']:.2f}s), "
+            f"network {network_stats['utilisation']:.0%}": cpu_busy,
+        },
+        "Each stage has its own limit!",
+        "Stage pools do not isolate the stages",
+    )
+
+
+async def test_job_persistence():
+    """
+    Test that jobs survive a restart and are not run twice.
+    A job is interrupted after its download, like a shutdown in the middle of a
+    transcription: it must stay unfinished with its downloaded file, come back
+    from a fresh store over the same database, and be recognised by update ID.
+    Saving the stages of a job over a slow database must not block the event loop.
+    """
+    import tempfile
+
+    print_banner("💾 TESTING PERSISTENT JOBS")
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(str(Path(directory) / "jobs.db"))
+        store = JobStore(database, work_dir=str(Path(directory) / "work"))
+        record = store.create(1001, 42, 42, "message", '{"update_id": 1001}')
+        duplicate = store.create(1001, 42, 42, "message", '{"update_id": 1001}')
+
+        async def interrupted_job():
+            await record.set_state("downloading")
+            path = record.work_path("download.ogg")
+            Path(path).write_bytes(b"audio")
+            await record.save_download(path)
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(store.run(record, interrupted_job))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        # A new store over the same database, as after a restart
+        restarted = JobStore(database, work_dir=store.work_dir)
+        unfinished = restarted.unfinished()
+        resumed = unfinished[0] if len(unfinished) == 1 else None
+        kept = bool(resumed) and resumed.state == "transcribing" and resumed.has_download() and resumed.attempts == 1
+
+        async def finish_job():
+            await resumed.save_transcript("hola mundo")
+
+        if resumed:
+            await restarted.run(resumed, finish_job)
+        finished = bool(resumed) and not restarted.unfinished() and not Path(store.work_dir, "1001").exists()
+
+        # Every stage of a job saved over a slow database, while a heartbeat measures the loop
+        write_delay = 0.1
+        update_job = database.update_job
+
+        def slow_update_job(*args, **kwargs):
+            time.sleep(write_delay)
+            return update_job(*args, **kwargs)
+
+        slow = store.create(1002, 42, 42, "message", '{"update_id": 1002}')
+        max_lag = 0.0
+        running = True
+
+        async def heartbeat():
+            nonlocal max_lag
+            while running:
+                expected = time.monotonic() + 0.01
+                await asyncio.sleep(0.01)
+                max_lag = max(max_lag, time.monotonic() - expected)
+
+        async def full_job():
+            await slow.set_state("downloading")
+            path = slow.work_path("download.ogg")
+            Path(path).write_bytes(b"audio" * 1000)
+            await slow.save_download(path)
+            await slow.save_transcript("hola mundo " * 10000)
+            await slow.save_result("Hola mundo.")
+
+        with patched(database, update_job=slow_update_job):
+            monitor = asyncio.create_task(heartbeat())
+            await store.run(slow, full_job)
+            running = False
+            await monitor
+        loop_free = max_lag < write_delay / 2 and not Path(store.work_dir, "1002").exists()
+        database.close()
+
+    return report_results(
+        "PERSISTENT JOB RESULTS",
+        {
+            "Duplicate update rejected": duplicate is None,
+            "Interrupted job kept with its download": kept,
+            "Resumed job finished and cleaned up": finished,
+            f"Slow job writes kept off the event loop (max lag {max_lag * 1000:.0f} ms)": loop_free,
+        },
+        "Jobs survive restarts!",
+        "Jobs are not persisted correctly",
+    )
+
+
+def _claim_all_jobs(db_path: str, worker_id: str) -> List[int]:
+    """Claim and finish jobs until the broker is empty (runs in a separate process)."""
+    database = Database(db_path)
+    claimed = []
+    while True:
+        row = database.claim_job(worker_id)
+        if not row:
+            return claimed
+        claimed.append(row["update_id"])
+        database.update_job(row["update_id"], state="done")
+
+
+def test_job_broker(job_count: int = 200, processes: int = 4) -> bool:
+    """
+    Test the job broker shared by worker processes.
+    Several processes claim jobs from the same database at once: every job must be
+    claimed exactly once. Then claim order (shortest first, one job per user) and
+    the requeueing of a stopped worker's jobs are checked.
+    """
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    print_banner(f"📮 TESTING JOB BROKER ({job_count} jobs, {processes} worker processes)")
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = str(Path(directory) / "broker.db")
+            database = Database(db_path)
+            store = JobStore(database, work_dir=str(Path(directory) / "work"))
+            broker = JobBroker(database, store, max_pending=job_count, max_per_user=job_count)
+            for update_id in range(job_count):
+                record = store.create(update_id, update_id % 10, 1, "message", "{}")
+                broker.submit(record, cost=update_id % 7)
+
+            with ProcessPoolExecutor(processes) as executor:
+                results = list(executor.map(_claim_all_jobs, [db_path] * processes, [f"w{n}" for n in range(processes)]))
+            claims = [update_id for claimed in results for update_id in claimed]
+            exactly_once = sorted(claims) == list(range(job_count))
+
+            # Shortest job first, and a user's second job waits for the first one
+            database = Database(str(Path(directory) / "order.db"))
+            store = JobStore(database, work_dir=str(Path(directory) / "work"))
+            broker = JobBroker(database, store)
+            for update_id, user, cost in ((1, "A", 100), (2, "A", 1), (3, "B", 50)):
+                broker.submit(store.create(update_id, user, 1, "message", "{}"), cost=cost)
+            broker.heartbeat("w1", 2)
+            first, second, third = broker.claim("w1"), broker.claim("w1"), broker.claim("w1")
+            ordered = (first.update_id, second.update_id, third) == (2, 3, None)
+
+            # A stopping worker's unfinished jobs go back to the queue
+            broker.release("w1")
+            requeued = broker.claim("w2")
+            released = requeued is not None and requeued.update_id == 2
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "JOB BROKER RESULTS",
+        {
+            f"{len(claims)} claims by {processes} processes ({', '.join(str(len(c)) for c in results)}), "
+            f"each job once": exactly_once,
+            "Shortest first, one job per user": ordered,
+            "Jobs of a stopped worker requeued": released,
+        },
+        "Workers share the queue safely!",
+        "Job broker claims are not safe",
+    )
+
+
+async def test_database_access(writes: int = 2000, queries: int = 500) -> bool:
+    """
+    Test the database thread: WAL mode, batched strategy writes and awaited queries.
+    Batched writes must return without waiting for a commit and all be counted;
+    awaited queries must give the same answers as direct calls while the event
+    loop keeps running.
+    """
+    import sqlite3
+    import tempfile
+
+    print_banner(f"🗄️  TESTING DATABASE ACCESS ({writes} batched writes, {queries} awaited queries)")
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database(str(Path(directory) / "access.db"))
+            with sqlite3.connect(database.db_path) as conn:
+                wal = conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+            start = time.perf_counter()
+            for n in range(writes):
+                database.record_strategy_result("bench", n % 2 == 0, 1.0, 0.1)
+            write_time = time.perf_counter() - start
+            counted = database.get_strategy_stats().get("bench", {}).get("attempts") == writes
+
+            for n in range(0, queries, 2):
+                database.add_authorized_user(str(n))
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            ticking = asyncio.create_task(ticker())
+            start = time.perf_counter()
+            answers = await asyncio.gather(
+                *(database.run(database.is_user_authorized, str(n)) for n in range(queries))
+            )
+            query_time = time.perf_counter() - start
+            ticking.cancel()
+            correct = answers == [n % 2 == 0 for n in range(queries)]
+            database.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "DATABASE ACCESS RESULTS",
+        {
+            "WAL journal mode": wal,
+            f"{writes} batched writes queued in {write_time * 1000:.1f}ms, all counted": counted,
+            f"{queries} awaited queries in {query_time * 1000:.1f}ms, correct": correct,
+            f"Event loop ran {ticks} times meanwhile": ticks > 0,
+        },
+        "Database access does not block the event loop!",
+        "Database access is not working as expected",
+    )
+
+
+async def test_user_index(messages: int = 1000) -> bool:
+    """
+    Test admission checks through the in-memory user index.
+    Authorized users (including one registered before being authorized) must be
+    admitted, unknown users registered once and rejected, and repeated checks
+    answered without querying the database.
+    """
+    import tempfile
+
+    print_banner(f"👥 TESTING USER INDEX ({messages} admission checks)")
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database(str(Path(directory) / "users.db"))
+            database.add_user("3")
+            index = UserIndex(database)
+            index.authorize(["1", "3"])
+
+            queries = 0
+            run = database.run
+
+            async def counting_run(func, *args, **kwargs):
+                nonlocal queries
+                queries += 1
+                return await run(func, *args, **kwargs)
+
+            database.run = counting_run
+            start = time.perf_counter()
+            answers = [await index.admit(n % 4) for n in range(messages)]
+            elapsed = time.perf_counter() - start
+            registered = database.get_users() == {"0": False, "1": True, "2": False, "3": True}
+            database.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    correct = answers == [n % 4 in (1, 3) for n in range(messages)]
+    # One load of the index plus one upsert per new user
+    few_queries = queries == 3
+
+    return report_results(
+        "USER INDEX RESULTS",
+        {
+            "Authorized users admitted, others rejected": correct,
+            "New users registered once": registered,
+            f"{messages} checks in {elapsed * 1000:.1f}ms with {queries} queries": few_queries,
+        },
+        "Admission checks are served from memory!",
+        "User admission is not working as expected",
+    )
+
+
+async def test_chat_settings() -> bool:
+    """
+    Test per-chat settings and the settings snapshot kept by each job.
+    A chat's override must not affect other chats, all settings of a chat must
+    come from one query, and a job must keep the settings it was accepted with.
+    Reading a global setting must not query the database; the background
+    refresh must pick up a change made by another process. A job saved without
+    a snapshot must fall back to the chat's current settings.
+    """
+    import json
+    import tempfile
+
+    print_banner("⚙️  TESTING PER-CHAT SETTINGS")
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database(str(Path(directory) / "settings.db"))
+            database.set_chat_setting(1, "output_text_file_enabled", True)
+            database.set_chat_setting(1, "transcription_speed", 3)
+            first, second = database.get_chat_settings(1), database.get_chat_settings(2)
+            isolated = (
+                first["output_text_file_enabled"] == 1 and first["transcription_speed"] == 3
+                and second["output_text_file_enabled"] == 0 and second["transcription_speed"] == 1
+                and set(first) == set(database.get_all_settings())
+            )
+
+            # The job keeps its snapshot, even after the chat changes its settings
+            store = JobStore(database, work_dir=str(Path(directory) / "work"))
+            store.create(500, 1, 1, "message", json.dumps({"update_id": 500}), ChatSettings(1, first))
+            database.set_chat_setting(1, "transcription_speed", 2)
+            restored = await store.unfinished()[0].get_settings()
+            kept = restored.transcription_speed == 3 and restored.output_text_file_enabled
+
+            # Global settings: served from memory, reloaded by the background task
+            queries = []
+            get_all_settings = database.get_all_settings
+
+            def counted_get_all_settings():
+                queries.append(1)
+                return get_all_settings()
+
+            with patched(config_module, db=database), patched(database, get_all_settings=counted_get_all_settings):
+                config = config_module.BotConfig()
+                # Another process changes the global speed
+                database.set_int_setting("transcription_speed", 2)
+                reads = [config.transcription_speed for _ in range(1000)]
+                memory_only = reads == [1] * 1000 and len(queries) == 1
+                refresh = asyncio.create_task(config.refresh_settings(interval=0.01))
+                await asyncio.sleep(0.05)
+                refresh.cancel()
+                await asyncio.gather(refresh, return_exceptions=True)
+                refreshed = config.transcription_speed == 2
+
+            # A job saved without a snapshot resolves the chat's current settings on the database thread
+            with patched(config_module, db=database), patched(job_store_module, db=database):
+                store.create(501, 1, 1, "message", json.dumps({"update_id": 501}))
+                legacy = next(record for record in store.unfinished() if record.update_id == 501)
+                fallback = await legacy.get_settings()
+                current_chat = fallback.transcription_speed == 2 and fallback.output_text_file_enabled
+            database.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "PER-CHAT SETTINGS RESULTS",
+        {
+            "Chat override leaves other chats on the defaults": isolated,
+            "Job keeps the settings it was accepted with": kept,
+            "Job without a snapshot uses the chat's current settings": current_chat,
+            "Global settings are read from memory only": memory_only,
+            "Background refresh picks up other processes' changes": refreshed,
+        },
+        "Settings are per chat and fixed per job!",
+        "Per-chat settings are not working as expected",
+    )
+
+
+async def test_migrations(events: int = 2000) -> bool:
+    """
+    Test the schema migrations, the job history and the batched usage counters.
+    A database created before migrations existed must be brought to the latest
+    version without losing its jobs, version 1 must be the original schema and
+    every migration must be safe to apply again; usage events must be summed in memory and
+    written as one row per user and day; finished jobs must land in the indexed
+    job history with their stage durations.
+    """
+    import json
+    import sqlite3
+    import tempfile
+
+    print_banner(f"🧱 TESTING MIGRATIONS, JOB HISTORY AND USAGE ({events} usage events)")
+
+    logging.disable(logging.INFO)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = str(Path(directory) / "migrations.db")
+            # Schema of a database created before versioned migrations
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(
+                    "CREATE TABLE jobs (update_id INTEGER PRIMARY KEY, user_id TEXT, chat_id INTEGER, kind TEXT, "
+                    "payload TEXT, state TEXT, download_path TEXT, transcript BLOB, result TEXT, error TEXT, "
+                    "attempts INTEGER DEFAULT 0, created_at REAL, updated_at REAL)"
+                )
+                conn.execute(
+                    "INSERT INTO jobs (update_id, user_id, chat_id, kind, payload, state, created_at, updated_at) "
+                    "VALUES (1, '7', 7, 'message', '{}', 'queued', 0, 0)"
+                )
+            conn.close()
+
+            database = Database(db_path)
+            Database(db_path).close()  # a second start applies nothing
+            with sqlite3.connect(db_path) as conn:
+                versions = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+                plan = " ".join(
+                    str(row[-1]) for row in conn.execute(
+                        "EXPLAIN QUERY PLAN SELECT * FROM job_history WHERE user_id = '7' AND finished_at >= 0"
+                    )
+                )
+            conn.close()
+
+            # Version 1 creates only the original tables; every migration can run twice
+            with sqlite3.connect(":memory:") as conn:
+                cursor = conn.cursor()
+                MIGRATIONS[0][2](cursor)
+                tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                baseline = tables == {"settings", "users"}
+                try:
+                    for _ in range(2):
+                        for _, _, migrate in MIGRATIONS:
+                            migrate(cursor)
+                    idempotent = True
+                except sqlite3.Error:
+                    idempotent = False
+            conn.close()
+            migrated = (
+                versions == [version for version, _, _ in MIGRATIONS]
+                and {"priority", "worker", "settings"} <= columns
+                and [row["update_id"] for row in database.get_unfinished_jobs()] == [1]
+                and "idx_job_history_user_finished_at" in plan
+            )
+
+            start = time.perf_counter()
+            for n in range(events):
+                database.add_usage(str(n % 2), audio_seconds=1.5, characters=10, openai_tokens=3)
+            usage_time = time.perf_counter() - start
+            with sqlite3.connect(db_path) as conn:
+                rows_before_flush = conn.execute("SELECT COUNT(*) FROM usage_counters").fetchone()[0]
+            conn.close()
+            usage = database.get_usage("2000-01-01")
+            half = events // 2
+            batched = rows_before_flush == 0 and usage == {
+                user_id: {"jobs": 0, "audio_seconds": 1.5 * half, "characters": 10 * half, "openai_tokens": 3 * half}
+                for user_id in ("0", "1")
+            }
+
+            store = JobStore(database, work_dir=str(Path(directory) / "work"))
+            record = store.create(2, 7, 7, "message", json.dumps({"update_id": 2}))
+
+            async def job():
+                record.set_media("voice", 2048, 12.0)
+                await record.set_state("downloading")
+                await record.save_download(record.work_path("download.ogg"))
+                await record.save_transcript("hola mundo")
+                await record.set_state("delivering")
+
+            await store.run(record, lambda: job())
+            history = database.get_job_history(0, user_id="7")
+            recorded = (
+                len(history) == 1
+                and history[0]["outcome"] == "done"
+                and history[0]["media_type"] == "voice"
+                and history[0]["transcript_chars"] == 10
+                and history[0]["queued_seconds"] is not None
+                and history[0]["transcribe_seconds"] is not None
+                and database.get_usage("2000-01-01", "7")["7"]["jobs"] == 1
+            )
+            database.close()
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return report_results(
+        "MIGRATIONS, JOB HISTORY AND USAGE RESULTS",
+        {
+            f"Old database migrated to version {len(MIGRATIONS)}, jobs kept": migrated,
+            "Version 1 is the original schema": baseline,
+            "Migrations can be applied again": idempotent,
+            f"{events} usage events counted in {usage_time * 1000:.1f}ms, written in one batch": batched,
+            "Finished job recorded with its stage durations": recorded,
+        },
+        "Schema, job history and usage counters are working!",
+        "Migrations, job history or usage counters are not working as expected",
+    )
+
+
+def run_normalization_benchmark(cue_count: int = 50000, repeats: int = 3) -> bool:
+    """
+    Micro-benchmark of the transcript normalizer over a large synthetic caption file.
+    Prints its timings next to the per-strategy cleanup code it replaced (best of
+    ``repeats`` runs, for reference only) and checks the output.
+    """
+    import html
+    from bot.utils.transcript_normalizer import normalize_caption_blob, normalize_segments
+
+    print_banner(f"⏱️  TRANSCRIPT NORMALIZATION BENCHMARK ({cue_count:,} cues)")
+
+    def timestamp(seconds: float) -> str:
+        hours, rest = divmod(seconds, 3600)
+        minutes, secs = divmod(rest, 60)
+        return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+    # Rolling auto-captions: every cue repeats the previous line before adding a new one
+    words = ["we're", "going", "to", "talk", "about", "caching", "&amp;", "latency", "today", "it&#39;s"]
+    lines = [" ".join(words[(i + j) % len(words)] for j in range(6)) + f" {i}" for i in range(cue_count + 1)]
+    vtt_parts = ["WEBVTT", "Kind: captions", "Language: en", ""]
+    for i in range(cue_count):
+        vtt_parts.append(str(i + 1))
+        vtt_parts.append(f"{timestamp(i * 2.0)} --> {timestamp(i * 2.0 + 2.0)}")
+        vtt_parts.append(lines[i])
+        vtt_parts.append(lines[i + 1])
+        vtt_parts.append("")
+    blob = "\n".join(vtt_parts)
+    segments = [{"f": line, "text": line} for line in lines]
+
+    def legacy_blob(content: str) -> str:
+        cleaned = re.sub(r'^\d{2}:\d{2}:\d{2}\.\d{3} --> \d{2}:\d{2}:\d{2}\.\d{3}$', '', content, flags=re.MULTILINE)
+        cleaned = re.sub(r'^\d+$', '', cleaned, flags=re.MULTILINE)
+        return '\n'.join(line.strip() for line in cleaned.split('\n') if line.strip())
+
+    def legacy_segments(items) -> str:
+        text_segments = []
+        for item in items:
+            text = item.get('f', '').strip()
+            if text:
+                text_segments.append(html.unescape(text))
+        return ' '.join(text_segments)
+
+    def best_of(func, arg) -> tuple:
+        best, result = float("inf"), None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func(arg)
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    cases = [
+        ("VTT blob (legacy SaveSubs)", legacy_blob, blob),
+        ("VTT blob (normalizer)", normalize_caption_blob, blob),
+        ("Segments (legacy Anthiago)", legacy_segments, segments),
+        ("Segments (normalizer)", lambda items: normalize_segments(items, key='f'), segments),
+    ]
+
+    outputs = {}
+    timings = {}
+    print(f"   Input: {len(blob) / 1024 / 1024:.1f} MB of VTT, {len(segments):,} segments")
+    for name, func, arg in cases:
+        elapsed, result = best_of(func, arg)
+        outputs[name] = result
+        timings[name] = elapsed
+        print(f"   {name:<28} {elapsed * 1000:8.1f} ms  -> {len(result):>10,} chars")
+    # Timings are reported, not checked: they vary with the machine and its load
+    for kind, legacy in (("VTT blob", "legacy SaveSubs"), ("Segments", "legacy Anthiago")):
+        ratio = timings[f"{kind} (normalizer)"] / timings[f"{kind} ({legacy})"]
+        print(f"   {kind}: normalizer takes {ratio:.2f}x the time of the legacy cleanup")
+
+    # A cue with several lines is one segment, so the written cues never overlap
+    multi_line = normalize_caption_blob(
+        "1\n00:00:01,000 --> 00:00:03,000\nfirst line\nsecond line\n\n"
+        "2\n00:00:03,000 --> 00:00:05,000\nthird line\n"
+    )
+    segments_written = list(multi_line.iter_segments())
+
+    normalized = outputs["VTT blob (normalizer)"]
+    checks = {
+        "No timing lines left": "-->" not in normalized,
+        "No VTT header left": "WEBVTT" not in normalized,
+        "Entities unescaped": "&amp;" not in normalized and "&#39;" not in normalized,
+        "Rolling duplicates collapsed (one segment per cue)": normalized.segment_count == cue_count,
+        "Multi-line cue kept as one segment": (
+            segments_written == [(1.0, 2.0, "first line second line"), (3.0, 2.0, "third line")]
+        ),
+        "Segment text preserved": outputs["Segments (normalizer)"].split(" ")[:3] == lines[0].split(" ")[:3],
+    }
+    return report_results(
+        "NORMALIZATION CHECKS",
+        checks,
+        "Normalizer output is clean!",
+        "Normalizer output is not clean",
+    )
+
+
 async def main():
     """Run comprehensive YouTube URL and strategy testing."""
 
@@ -672,7 +2427,10 @@ async def main():
     print()
 
     tester = YouTubeURLTester()
-    await tester.run_comprehensive_test()
+    try:
+        await tester.run_comprehensive_test()
+    finally:
+        await tester.extractor.close()
 
     end_time = time.time()
     duration = end_time - start_time
@@ -792,7 +2550,10 @@ async def quick_test():
 
             logger.info(f"📂 Category {category} completed. Progress: {category_num}/{len(TEST_URLS)}")
 
-    await quick_run()
+    try:
+        await quick_run()
+    finally:
+        await tester.extractor.close()
 
     end_time = time.time()
     duration = end_time - start_time
@@ -811,10 +2572,98 @@ if __name__ == "__main__":
     elif len(sys.argv) > 1 and sys.argv[1] == "clean":
         print("Running CLEAN MESSAGING TESTS...")
         asyncio.run(run_clean_messaging_tests())
+    elif len(sys.argv) > 1 and sys.argv[1] == "bench":
+        print("Running TRANSCRIPT NORMALIZATION BENCHMARK...")
+        sys.exit(0 if run_normalization_benchmark() else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "hedge":
+        print("Running HEDGED STRATEGY RACE TEST...")
+        sys.exit(0 if asyncio.run(test_hedged_strategies()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "ranking":
+        print("Running STRATEGY RANKING TEST...")
+        sys.exit(0 if asyncio.run(test_strategy_ranking()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "deadline":
+        print("Running STRATEGY TIMEOUT AND DEADLINE TEST...")
+        sys.exit(0 if asyncio.run(test_strategy_deadline()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "negative":
+        print("Running NEGATIVE CACHE TEST...")
+        sys.exit(0 if asyncio.run(test_negative_cache()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "flight":
+        print("Running SINGLE FLIGHT TEST...")
+        sys.exit(0 if asyncio.run(test_single_flight()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "breaker":
+        print("Running CIRCUIT BREAKER TEST...")
+        sys.exit(0 if test_circuit_breaker() else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "ratelimit":
+        print("Running RATE LIMITER TEST...")
+        sys.exit(0 if asyncio.run(test_rate_limiter()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "kome":
+        print("Running KOME.AI PAGINATION TEST...")
+        sys.exit(0 if asyncio.run(test_kome_pagination()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "batch":
+        print("Running YOUTUBE BATCH TEST...")
+        sys.exit(0 if asyncio.run(test_youtube_batch()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "formats":
+        print("Running TRANSCRIPT EXPORT FORMAT TEST...")
+        sys.exit(0 if test_transcript_formats() else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "cache":
+        print("Running TRANSCRIPT CACHE TEST...")
+        sys.exit(0 if asyncio.run(test_transcript_cache()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "loop":
+        print("Running EVENT LOOP RESPONSIVENESS TEST...")
+        sys.exit(0 if asyncio.run(test_event_loop_responsiveness()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "pools":
+        print("Running STAGE POOL TEST...")
+        sys.exit(0 if asyncio.run(test_stage_pools()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "scheduler":
+        print("Running JOB SCHEDULER FAIRNESS TEST...")
+        sys.exit(0 if asyncio.run(test_job_scheduler_fairness()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "admission":
+        print("Running JOB ADMISSION TEST...")
+        sys.exit(0 if asyncio.run(test_job_admission()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "broker":
+        print("Running JOB BROKER TEST...")
+        sys.exit(0 if test_job_broker() else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "database":
+        print("Running DATABASE ACCESS TEST...")
+        sys.exit(0 if asyncio.run(test_database_access()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "users":
+        print("Running USER INDEX TEST...")
+        sys.exit(0 if asyncio.run(test_user_index()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "settings":
+        print("Running PER-CHAT SETTINGS TEST...")
+        sys.exit(0 if asyncio.run(test_chat_settings()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "migrations":
+        print("Running MIGRATIONS, JOB HISTORY AND USAGE TEST...")
+        sys.exit(0 if asyncio.run(test_migrations()) else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == "jobs":
+        print("Running PERSISTENT JOB TEST...")
+        sys.exit(0 if asyncio.run(test_job_persistence()) else 1)
     else:
         print("Running FULL COMPREHENSIVE test...")
         print("Usage modes:")
         print("  python comprehensive_test.py        - Full test (all URLs)")
         print("  python comprehensive_test.py quick  - Quick test (5 URLs)")
         print("  python comprehensive_test.py clean  - Clean messaging tests")
+        print("  python comprehensive_test.py hedge  - Hedged strategy race test")
+        print("  python comprehensive_test.py ranking - Strategy ranking from recorded statistics test")
+        print("  python comprehensive_test.py deadline - Strategy timeouts (p95) and extraction deadline test")
+        print("  python comprehensive_test.py negative - Negative cache (videos without transcript) test")
+        print("  python comprehensive_test.py flight - Single flight (request coalescing) test")
+        print("  python comprehensive_test.py breaker - Circuit breaker state machine test")
+        print("  python comprehensive_test.py ratelimit - Per-host token bucket test")
+        print("  python comprehensive_test.py kome   - Kome.ai pagination test")
+        print("  python comprehensive_test.py batch  - YouTube batch (links and playlists) test")
+        print("  python comprehensive_test.py formats - Transcript SRT/VTT/JSON export and storage test")
+        print("  python comprehensive_test.py cache  - Transcript cache (tiers and pruning) test")
+        print("  python comprehensive_test.py loop   - Event loop responsiveness test")
+        print("  python comprehensive_test.py bench  - Transcript normalization benchmark")
+        print("  python comprehensive_test.py scheduler - Job scheduler fairness test")
+        print("  python comprehensive_test.py admission - Job admission limits test")
+        print("  python comprehensive_test.py pools  - Stage concurrency pool test")
+        print("  python comprehensive_test.py jobs   - Persistent job (restart) test")
+        print("  python comprehensive_test.py broker - Job broker (worker processes) test")
+        print("  python comprehensive_test.py database - Database thread and batched writes test")
+        print("  python comprehensive_test.py users  - User index (admission check) test")
+        print("  python comprehensive_test.py settings - Per-chat settings and job snapshot test")
+        print("  python comprehensive_test.py migrations - Schema migrations, job history and usage counters test")
         asyncio.run(main())